@@ -1,34 +1,45 @@
+from collections.abc import Mapping
 from datetime import datetime, timezone, timedelta
-import json
 from flask import (
     Flask, flash, jsonify, redirect, render_template,
     request, Response, send_from_directory, session, url_for, g,
 )
+from flask.json.provider import DefaultJSONProvider
 import logging
 import os
-import sqlite3
 import time
 import traceback
 from threading import Lock
 from werkzeug.exceptions import HTTPException
 
-from modules.aggregate_data import merge_team_and_global, filter_and_sort_players, sort_table_data
-from modules.http_client import HTTP
+from modules.aggregate_data import (
+    merge_team_and_global, filter_and_sort_players, paginate_players, project_players, sort_table_data,
+)
+from modules.http_client import HTTP, limiter_metrics
 from modules.utils import (
     validate_team_id, get_max_users, get_static_data, get_current_gw,
-    init_last_event_updated, ordinalformat,
-    thousands, millions, territory_icon, get_event_status_state, resolve_current_gw,
+    init_last_event_updated, ordinalformat, get_player_blob,
+    thousands, millions, territory_icon, resolve_current_gw,
 )
 from modules.fetch_mini_leagues import (build_manager,
-                                        get_league_name, get_live_points, get_team_ids_from_league, get_team_mini_league_breakdown,
+                                        get_league_name, get_team_mini_league_breakdown,
                                         append_current_manager, enrich_points_behind,
                                         )
 from modules.fetch_teams_table import aggregate_team_stats
-from modules.fetch_all_tables import populate_player_info_all_with_live_data, build_player_info
+from modules.fetch_all_tables import build_player_info
 from modules.fetch_manager_data import get_manager_data, get_manager_history
 from modules.fetch_fixtures import ensure_fixtures_for_gw
 from modules.fixtures_utils import build_team_fixture_cache, attach_upcoming_to_rows, add_fixture_metrics_to_blob
-from modules.live_cache import get_live_elements
+from modules.live_cache import get_live_gameweeks
+from modules.cache_builders import (
+    is_fresh, load_team_blob, rebuild_league_breakdown, rebuild_league_summary, rebuild_team_blob,
+    revalidate_league_cache,
+)
+from modules import (
+    bootstrap_cache, codec, compression, db, event_watch, player_index, prewarm, response_cache,
+    retention,
+)
+from modules.db import get_db
 
 # Ensuring Data Integrity: By controlling access to shared data, locks help maintain the integrity and consistency of your application's data.
 _warmup_lock = Lock()
@@ -42,9 +53,22 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)-8s %(name)s: %(message)s",
 )
 
+class _JSONProvider(DefaultJSONProvider):
+    """Serialises read-only Mapping views (aggregate_data.OverlayRow) as objects."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+
 app = Flask(__name__)
+app.json = _JSONProvider(app)
 app.secret_key = os.environ.get("FLASK_SECRET", "dev-secret-for-local")
 app.config["TEMPLATES_AUTO_RELOAD"] = True
+db.init_app(app)  # releases the request's pooled SQLite connection at teardown
+compression.init_app(app)  # gzip/br responses, precompressed + hashed static assets
 
 # Keep Flask/Werkzeug in sync with our chosen level
 app.logger.setLevel(LOG_LEVEL)
@@ -112,6 +136,10 @@ def before_every_request():
 
     t0 = time.perf_counter()
     try:
+        # Background cache pre-warmer (one thread per process; no-op once started)
+        prewarm.start(app)
+        event_watch.start()
+
         # ── 0) Warmup once per process ─────────────────────────────
         if not app.config.get("_WARMED_UP", False):
             with _warmup_lock:
@@ -141,10 +169,13 @@ def before_every_request():
         g.team_id = url_tid if url_tid is not None else session.get("team_id")
 
         # ── 3) Event-status snapshot (single source of truth) ──────
-        st = get_event_status_state()
+        # Shared across workers (modules/event_watch.py); polls FPL only if
+        # no watcher has refreshed it lately
+        st = event_watch.current(get_db().cursor())
         g.current_gw = st.get("gw")
         g.is_live = st.get("is_live")
         g.event_last_update = st.get("last_update")
+        g.event_gen = st.get("generation")
         g.is_updating = bool(st.get("maintenance"))
         g.fpl_status_msg = st.get(
             "message") or "The game is being updated and will be available soon."
@@ -313,6 +344,12 @@ def debug_gw():
     return jsonify(current_gw=g.current_gw, session_gw=session.get("current_gw"))
 
 
+@app.route("/debug/upstream")
+def debug_upstream():
+    # Per-endpoint-class limiter queue waits and 429s (this worker only)
+    return jsonify(limiter_metrics())
+
+
 @app.get("/dev/maintenance/on")
 def dev_maint_on():
     if not app.debug:
@@ -537,7 +574,23 @@ def talisman():
                            current_page='talisman')
 
 
+def _team_demand():
+    team_id = request.args.get("team_id", type=int)
+    if team_id is not None:
+        prewarm.record_demand("team", team_id)
+
+
+def _league_demand(kind: str):
+    def record():
+        league_id = request.args.get("league_id", type=int)
+        max_show = request.args.get("max_show", type=int)
+        if league_id is not None:
+            prewarm.record_demand(kind, f"{league_id}:{max_show if max_show and max_show > 0 else 10}")
+    return record
+
+
 @app.route("/get-sorted-players")
+@response_cache.cached(on_hit=_team_demand)
 def get_sorted_players():
     app.logger.debug("Received minutes filter: %s–%s", request.args.get(
         "min_minutes"), request.args.get("max_minutes"))
@@ -552,13 +605,8 @@ def get_sorted_players():
 
     app.logger.debug("current_gw=%s", current_gw)
 
-    # --- helpers (define BEFORE use) ---
-    def _load_static_blob(row_tuple):
-        data_str, _last = row_tuple
-        return {int(pid): blob for pid, blob in json.loads(data_str).items()}
-
     # --- DB ---
-    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    conn = get_db()
     cur = conn.cursor()
 
     # Ensure fixtures cache exists
@@ -567,117 +615,60 @@ def get_sorted_players():
         g.fixtures_cache = build_team_fixture_cache(
             cur, from_event=current_gw, lookahead=5)
 
-    # Ensure bootstrap (for team mapping)
-    cur.execute("SELECT data FROM static_data WHERE key='bootstrap'")
-    boot = cur.fetchone()
-    if boot:
-        static_data = json.loads(boot[0])
-    else:
-        static_data = {"teams": [], "elements": []}
+    # Ensure bootstrap (for team mapping): process cache, else the DB row
+    boot = bootstrap_cache.current()
+    if boot is None:
+        cur.execute(
+            "SELECT data, last_fetched FROM static_data WHERE key='bootstrap'")
+        row = cur.fetchone()
+        if row:
+            boot = bootstrap_cache.publish_raw(
+                row[0], datetime.fromisoformat(row[1]))
+    static_data = boot.data if boot else {"teams": [], "elements": []}
 
-    # --- Load or build static_player_info snapshot for this GW ---
-    cur.execute(
-        "SELECT data, last_fetched FROM static_player_info WHERE gameweek=?", (current_gw,))
-    row = cur.fetchone()
+    # --- static_player_info for this GW: process memory, else the snapshot ---
+    gw_key = current_gw if isinstance(current_gw, int) and current_gw >= 1 else -1
+    shared_blob = get_player_blob(gw_key, g.event_last_update, cur)
 
-    if not row:
-        app.logger.warning(
-            "[static] no static_player_info for gw=%s → building snapshot", current_gw)
-        _ = get_static_data(
+    if shared_blob is None:
+        app.logger.debug(
+            "[static] static_player_info missing/stale for gw=%s → rebuilding", current_gw)
+        static_data = get_static_data(
             current_gw=current_gw,
             event_updated_iso=(g.event_last_update.isoformat()
                                if g.event_last_update else None),
             force_refresh=True,
             hydrate_fixtures=True,
             fixtures_lookahead=5,
-        )
-        cur.execute(
-            "SELECT data, last_fetched FROM static_player_info WHERE gameweek=?", (current_gw,))
-        row = cur.fetchone()
+        ) or static_data
+        shared_blob = get_player_blob(gw_key)
 
-    # If still missing, build in-memory; else load snapshot
-    if not row:
+    # If still missing, build in-memory. The shared blob is read-only: the
+    # indexed path copies only the rows it returns, the others copy it all
+    if shared_blob is None:
         app.logger.error(
-            "[static] snapshot still missing; using in-memory build")
+            "[static] static_player_info still missing; using in-memory build")
         static_blob = build_player_info(
             static_data, fixtures_cache=g.fixtures_cache, fixtures_lookahead=5)
     else:
-        static_blob = _load_static_blob(row)
-        # Staleness check
-        last_fetched = row[1]
-        if g.event_last_update and datetime.fromisoformat(last_fetched) < g.event_last_update:
-            app.logger.debug("static_player_info stale → refreshing")
-            _ = get_static_data(
-                current_gw=current_gw,
-                event_updated_iso=g.event_last_update.isoformat(),
-                hydrate_fixtures=True,
-                fixtures_lookahead=5,
-                force_refresh=True,
-            )
-            cur.execute(
-                "SELECT data, last_fetched FROM static_player_info WHERE gameweek=?", (current_gw,))
-            row = cur.fetchone()
-            static_blob = _load_static_blob(row)
+        static_blob = shared_blob
 
     # --- Team blob: guard when team_id is None ---
     if team_id is None:
         app.logger.debug("No team_id provided → skipping team_player_info")
         team_blob = {}
     else:
-        cur.execute(
-            "SELECT data, last_fetched FROM team_player_info WHERE team_id=? AND gameweek=?", (team_id, current_gw))
-        row = cur.fetchone()
-        if row:
-            data, last_fetched = row
-            if not g.event_last_update or datetime.fromisoformat(last_fetched) >= g.event_last_update:
-                team_blob = {int(pid): blob for pid,
-                             blob in json.loads(data).items()}
-            else:
-                app.logger.debug(
-                    "Cached team_player_info stale → refreshing from live")
-                team_blob = populate_player_info_all_with_live_data(
-                    team_id, static_blob, static_data)
-                cur.execute(
-                    """INSERT OR REPLACE INTO team_player_info (team_id, gameweek, data, last_fetched)
-                       VALUES (?, ?, ?, ?)""",
-                    (team_id, current_gw, json.dumps(team_blob),
-                     datetime.now(timezone.utc).isoformat()),
-                )
-                conn.commit()
-        else:
-            app.logger.debug("No team_player_info row → fetching fresh")
-            team_blob = populate_player_info_all_with_live_data(
-                team_id, static_blob, static_data)
-            cur.execute(
-                """INSERT OR REPLACE INTO team_player_info (team_id, gameweek, data, last_fetched)
-                   VALUES (?, ?, ?, ?)""",
-                (team_id, current_gw, json.dumps(team_blob),
-                 datetime.now(timezone.utc).isoformat()),
-            )
-            conn.commit()
+        prewarm.record_demand("team", team_id)
+        team_blob = load_team_blob(cur, team_id, current_gw, g.event_gen)
+        if team_blob is None:
+            app.logger.debug(
+                "team_player_info missing/stale → refreshing from live")
+            team_blob = rebuild_team_blob(
+                conn, team_id, current_gw, static_blob, static_data, g.event_gen)
 
     app.logger.debug("Final team_blob length=%s", len(team_blob))
-    conn.close()
-
-    # --- Stamp fixture metrics NOW (upstream of sorting) ---
-    add_fixture_metrics_to_blob(
-        static_blob, static_data, g.fixtures_cache, lookahead=5)
 
     # --- Tables ---
-    if table == "talisman":
-        players, _, is_truncated, price_range = filter_and_sort_players(
-            static_blob, {}, request.args)
-        seen, talisman_list = set(), []
-        for p in players:
-            if p["team_code"] not in seen:
-                seen.add(p["team_code"])
-                talisman_list.append(p)
-        attach_upcoming_to_rows(
-            talisman_list, g.fixtures_cache, static_data, lookahead=5)
-        images = [{"photo": p["photo"], "team_code": p["team_code"]}
-                  for p in talisman_list[:5]]
-        return jsonify(players=talisman_list, players_images=images, is_truncated=False, manager=g.manager, price_range=price_range)
-
     if table == "teams":
         merged = merge_team_and_global(static_blob, team_blob)
         stats = aggregate_team_stats(merged)
@@ -696,26 +687,71 @@ def get_sorted_players():
                     break
         return jsonify(players=sorted_stats, players_images=top5, manager=g.manager)
 
+    # --- Indexed path: pre-sorted orders + filter bitsets over the shared blob ---
+    if player_index.can_serve(request.args):
+        index = player_index.index_for(static_blob)
+        pids, price_range, is_truncated = player_index.sorted_player_ids(
+            index, team_blob, request.args)
+        if table == "talisman":
+            seen, top = set(), []
+            for pid in pids:
+                team_code = static_blob[pid].get("team_code")
+                if team_code not in seen:
+                    seen.add(team_code)
+                    top.append(pid)
+            talisman_list = player_index.player_rows(index, {}, top, table)
+            attach_upcoming_to_rows(
+                talisman_list, g.fixtures_cache, static_data, lookahead=5)
+            images = [{"photo": p["photo"], "team_code": p["team_code"]}
+                      for p in talisman_list[:5]]
+            return jsonify(players=talisman_list, players_images=images, is_truncated=False, manager=g.manager, price_range=price_range)
+
+        images = [{"photo": static_blob[pid].get("photo"), "team_code": static_blob[pid].get("team_code")}
+                  for pid in pids[:5]]
+        pids, total, page, page_size = paginate_players(pids, request.args)
+        players = player_index.player_rows(index, team_blob, pids, table)
+        attach_upcoming_to_rows(players, g.fixtures_cache,
+                                static_data, lookahead=5)
+        players = project_players(players, request.args)
+        return jsonify(players=players, players_images=images, is_truncated=is_truncated, manager=g.manager, price_range=price_range,
+                       total=total, page=page, page_size=page_size)
+
+    # --- Stamp fixture metrics NOW (upstream of sorting) onto overlay rows ---
+    static_blob = merge_team_and_global(static_blob, {})
+    add_fixture_metrics_to_blob(
+        static_blob, static_data, g.fixtures_cache, lookahead=5)
+
+    if table == "talisman":
+        players, _, is_truncated, price_range = filter_and_sort_players(
+            static_blob, {}, request.args)
+        seen, talisman_list = set(), []
+        for p in players:
+            if p["team_code"] not in seen:
+                seen.add(p["team_code"])
+                talisman_list.append(p)
+        attach_upcoming_to_rows(
+            talisman_list, g.fixtures_cache, static_data, lookahead=5)
+        images = [{"photo": p["photo"], "team_code": p["team_code"]}
+                  for p in talisman_list[:5]]
+        return jsonify(players=talisman_list, players_images=images, is_truncated=False, manager=g.manager, price_range=price_range)
+
     # Default tables
     app.logger.info("GW=%s, mins=%s–%s", g.current_gw, request.args.get(
         "min_minutes"), request.args.get("max_minutes"))
     players, images, is_truncated, price_range = filter_and_sort_players(
         static_blob, team_blob, request.args)
+    # Only the requested page and columns go over the wire
+    players, total, page, page_size = paginate_players(players, request.args)
     attach_upcoming_to_rows(players, g.fixtures_cache,
                             static_data, lookahead=5)
-    return jsonify(players=players, players_images=images, is_truncated=is_truncated, manager=g.manager, price_range=price_range)
+    players = project_players(players, request.args)
+    return jsonify(players=players, players_images=images, is_truncated=is_truncated, manager=g.manager, price_range=price_range,
+                   total=total, page=page, page_size=page_size)
 
 
-def _is_fresh(last_iso: str) -> bool:
-    """Fresh if cache timestamp >= g.event_last_update (static ignored)."""
-    try:
-        last = datetime.fromisoformat(last_iso)
-    except Exception:
-        return False
-    ev = getattr(g, "event_last_update", None)
-    if ev and last < ev:
-        return False
-    return True
+def _is_fresh(row_gen: int | None) -> bool:
+    """Fresh if the row was built for g.event_gen or later (static ignored)."""
+    return is_fresh(row_gen, getattr(g, "event_gen", None))
 
 # --- MINI LEAGUES PAGE ---
 
@@ -751,6 +787,7 @@ def mini_leagues(league_id):
 
 
 @app.get("/get-sorted-mini-league-summary")
+@response_cache.cached(on_hit=_league_demand("summary"))
 def get_sorted_mini_league_summary():
     league_id = request.args.get("league_id", type=int)
     max_show = request.args.get("max_show", type=int)
@@ -775,7 +812,7 @@ def get_sorted_mini_league_summary():
         if not team_id:
             team_id = session.get("team_id")
 
-    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    conn = get_db()
     cur = conn.cursor()
 
     # One-time static
@@ -788,46 +825,47 @@ def get_sorted_mini_league_summary():
     current_gw = getattr(g, "current_gw", None) or next(
         (e["id"] for e in static_data.get("events", []) if e.get("is_current")), None)
     if not current_gw:
-        conn.close()
         return jsonify({"error": "No current gameweek"}), 500
 
     # Cache read
+    prewarm.record_demand("summary", f"{league_id}:{max_show}")
     cur.execute("""
-        SELECT data, last_fetched
+        SELECT data, event_gen
         FROM mini_league_summary_cache
         WHERE league_id = ? AND gameweek = ? AND max_show = ?
     """, (league_id, current_gw, max_show))
     row = cur.fetchone()
+    if row:
+        retention.touch("mini_league_summary_cache", league_id, current_gw, max_show)
 
     use_cache = bool(row and not refresh and _is_fresh(row[1]))
+    # Stale-while-revalidate: serve the old rows now, rebuild in the background
+    stale = bool(row and not refresh and not use_cache)
     if use_cache:
-        managers = json.loads(row[0])
+        managers = codec.decode(row[0])
         app.logger.debug(
             "[mini_summary] cache HIT (gw=%s, league=%s, max_show=%s)", current_gw, league_id, max_show)
-    else:
+    elif stale:
+        g.response_cacheable = False  # the rebuilt rows must be picked up next time
+        managers = codec.decode(row[0])
+        queued = revalidate_league_cache(
+            app, "summary", league_id, current_gw, max_show, static_data,
+            getattr(g, "event_gen", None))
         app.logger.debug(
-            "[mini_summary] rebuilding league=%s gw=%s max_show=%s", league_id, current_gw, max_show)
+            "[mini_summary] cache STALE (gw=%s, league=%s, max_show=%s) → serving, revalidate queued=%s",
+            current_gw, league_id, max_show, queued)
+    else:
         try:
-            live_map = get_live_points(current_gw, cur)
-            managers = get_team_ids_from_league(
-                league_id, max_show,
-                static_data=static_data,
-                current_gw=current_gw,
-                live_points_by_element=live_map,
-                cur=cur,
-                skip_history=False,
-            )
-            cur.execute("""
-                INSERT OR REPLACE INTO mini_league_summary_cache
-                (league_id, gameweek, max_show, data, last_fetched)
-                VALUES (?, ?, ?, ?, ?)
-            """, (league_id, current_gw, max_show, json.dumps(managers), datetime.now(timezone.utc).isoformat()))
-            conn.commit()
+            # Concurrent misses for the same cohort share one rebuild; each
+            # caller decodes its own copy of the payload
+            managers = codec.decode(rebuild_league_summary(
+                conn, league_id, current_gw, max_show, static_data,
+                event_gen=getattr(g, "event_gen", None), refresh=refresh))
         except Exception as e:
             app.logger.error("[mini_summary] rebuild failed: %s", e)
-            managers = json.loads(row[0]) if row else []
+            g.response_cacheable = False
+            managers = codec.decode(row[0]) if row else []
 
-    conn.close()
 
     # Append current team if missing (do NOT write to cache)
     if team_id and not any(int(m.get("entry", -1)) == int(team_id) for m in managers):
@@ -851,11 +889,17 @@ def get_sorted_mini_league_summary():
             sort_by) is not None else (-1 if sort_by == "summary_event_points" else "")),
         reverse=(order == "desc"),
     )
-    return jsonify(players=managers, manager=getattr(g, "manager", None))
+    return jsonify(
+        players=managers,
+        manager=getattr(g, "manager", None),
+        meta={"league_id": league_id, "max_show": max_show,
+              "used_cache": use_cache, "stale": stale},
+    )
 
 
 # ---- /get-sorted-mini-league-breakdown --------------------------------------
 @app.get("/get-sorted-mini-league-breakdown")
+@response_cache.cached(on_hit=_league_demand("breakdown"))
 def get_sorted_mini_league_breakdown():
     league_id = request.args.get("league_id", type=int)
     max_show = request.args.get("max_show", default=10, type=int)
@@ -881,7 +925,7 @@ def get_sorted_mini_league_breakdown():
             team_id = session.get("team_id")
     team_id = int(team_id) if team_id else None
 
-    conn = sqlite3.connect(DATABASE, check_same_thread=False)
+    conn = get_db()
     cur = conn.cursor()
 
     # Static + current GW
@@ -895,65 +939,48 @@ def get_sorted_mini_league_breakdown():
         current_gw = next((e["id"] for e in static_data.get(
             "events", []) if e.get("is_current")), None)
     if not current_gw:
-        conn.close()
         return jsonify({"error": "No current gameweek"}), 500
 
     # Cache read
+    prewarm.record_demand("breakdown", f"{league_id}:{max_show}")
     cur.execute("""
-        SELECT data, last_fetched
+        SELECT data, event_gen
         FROM mini_league_breakdown_cache
         WHERE league_id = ? AND gameweek = ? AND max_show = ?
     """, (league_id, current_gw, max_show))
     row = cur.fetchone()
+    if row:
+        retention.touch("mini_league_breakdown_cache", league_id, current_gw, max_show)
 
     use_cache = bool(row and not refresh and _is_fresh(row[1]))
+    # Stale-while-revalidate: serve the old rows now, rebuild in the background
+    stale = bool(row and not refresh and not use_cache)
     rows = []
+    live_data_map = None
 
     if use_cache:
-        rows = json.loads(row[0])
+        rows = codec.decode(row[0])
         app.logger.debug(
             "[mini_breakdown] cache HIT (gw=%s, league=%s, max_show=%s)", current_gw, league_id, max_show)
-    else:
+    elif stale:
+        g.response_cacheable = False  # the rebuilt rows must be picked up next time
+        rows = codec.decode(row[0])
+        queued = revalidate_league_cache(
+            app, "breakdown", league_id, current_gw, max_show, static_data,
+            getattr(g, "event_gen", None))
         app.logger.debug(
-            "[mini_breakdown] rebuilding league=%s gw=%s max_show=%s", league_id, current_gw, max_show)
+            "[mini_breakdown] cache STALE (gw=%s, league=%s, max_show=%s) → serving, revalidate queued=%s",
+            current_gw, league_id, max_show, queued)
+    else:
         try:
-            # Top-N managers
-            managers = get_team_ids_from_league(
-                league_id, max_show,
-                static_data=static_data,
-                current_gw=current_gw
-            )
-
-            # Prefetch live once per GW
-            live_data_map = {}
-            for gw in range(1, current_gw + 1):
-                try:
-                    live_data_map[gw] = get_live_elements(cur, gw, FPL_API)
-                except Exception as e:
-                    app.logger.warning(
-                        "[mini_breakdown] live fetch fail gw=%s: %s", gw, e)
-                    live_data_map[gw] = []
-
-            # Build per-manager breakdown rows
-            for m in managers:
-                try:
-                    summary = get_team_mini_league_breakdown(
-                        m["entry"], static_data, live_data_map)
-                    rows.append({**m, **summary, "team_id": m["entry"]})
-                except Exception as e:
-                    app.logger.warning(
-                        "[mini_breakdown] summary build failed for %s: %s", m.get("entry"), e)
-
-            # Cache the generic top-N (without 'me')
-            cur.execute("""
-                INSERT OR REPLACE INTO mini_league_breakdown_cache
-                (league_id, gameweek, max_show, data, last_fetched)
-                VALUES (?, ?, ?, ?, ?)
-            """, (league_id, current_gw, max_show, json.dumps(rows), datetime.now(timezone.utc).isoformat()))
-            conn.commit()
+            # Concurrent misses for the same cohort share one rebuild
+            rows = codec.decode(rebuild_league_breakdown(
+                conn, league_id, current_gw, max_show, static_data,
+                event_gen=getattr(g, "event_gen", None), refresh=refresh))
         except Exception as e:
             app.logger.error("[mini_breakdown] rebuild failed: %s", e)
-            rows = json.loads(row[0]) if row else []
+            g.response_cacheable = False
+            rows = codec.decode(row[0]) if row else []
 
     # ---- ensure current team is present (post-cache), and report what happened
     def _have_me(rws, me_id: int) -> bool:
@@ -986,20 +1013,14 @@ def get_sorted_mini_league_breakdown():
                     static_data=static_data, skip_history=True
                 )
 
-                # Ensure live_data_map exists (for cache-HIT path)
-                try:
-                    live_data_map  # noqa: F401
-                except NameError:
-                    live_data_map = {}
-                    for gw in range(1, current_gw + 1):
-                        try:
-                            live_data_map[gw] = get_live_elements(
-                                cur, gw, FPL_API)
-                        except Exception:
-                            live_data_map[gw] = []
+                # Live data comes from the shared per-GW store (memory hit
+                # right after a rebuild)
+                if live_data_map is None:
+                    live_data_map = get_live_gameweeks(
+                        cur, range(1, current_gw + 1), FPL_API, current_gw=current_gw)
 
                 summary_me = get_team_mini_league_breakdown(
-                    team_id, static_data, live_data_map)
+                    team_id, static_data, live_data_map, cur=cur)
                 rows.append({**m_base, **summary_me, "team_id": team_id})
                 appended = True
                 app.logger.debug(
@@ -1011,7 +1032,6 @@ def get_sorted_mini_league_breakdown():
             app.logger.warning(
                 "[mini_breakdown] append current team failed: %s", e)
 
-    conn.close()
 
     # Add alias for client (and any cached rows lacking team_id)
     for r in rows:
@@ -1031,6 +1051,7 @@ def get_sorted_mini_league_breakdown():
             "league_id": league_id,
             "max_show": max_show,
             "used_cache": use_cache,
+            "stale": stale,
             "team_id": team_id,
             "present_before": present_before,
             "appended": appended,
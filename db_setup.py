@@ -1,5 +1,9 @@
 import sqlite3
 
+from modules.codec import migrate_table
+from modules.event_watch import SCHEMA_SQL as EVENT_STATUS_SCHEMA_SQL, ensure_gen_columns
+from modules.retention import ensure_access_columns
+
 DB = "page_views.db"
 
 conn = sqlite3.connect(DB, check_same_thread=False)
@@ -10,6 +14,9 @@ cur.execute("PRAGMA journal_mode=WAL;")
 cur.execute("PRAGMA synchronous=NORMAL;")
 cur.execute("PRAGMA busy_timeout=10000;")
 cur.execute("PRAGMA foreign_keys=ON;")
+# Only takes effect on a new file; `python db_stats.py --vacuum` converts an
+# existing one (see modules/retention.py)
+cur.execute("PRAGMA auto_vacuum=INCREMENTAL;")
 
 # --- Tables ---
 
@@ -39,14 +46,90 @@ CREATE TABLE IF NOT EXISTS team_player_info (
 )
 """)
 
+# Per-team, per-GW partial aggregates (see fetch_all_tables.team_gw_vectors);
+# finished GWs are folded in as-is, only the live GW is recomputed.
+cur.execute("""
+CREATE TABLE IF NOT EXISTS team_gw_vectors (
+    team_id      INTEGER NOT NULL,
+    gameweek     INTEGER NOT NULL,
+    layout       TEXT NOT NULL,                -- TEAM_VECTOR_LAYOUT at write time
+    finished     INTEGER NOT NULL DEFAULT 0,
+    data         TEXT NOT NULL,                -- {pid: [ints...]}
+    last_fetched TEXT NOT NULL,
+    PRIMARY KEY (team_id, gameweek)
+)
+""")
+
+# Live data per GW (see modules/live_cache.py)
 cur.execute("""
-CREATE TABLE IF NOT EXISTS live_elements_cache (
+CREATE TABLE IF NOT EXISTS live_gameweeks (
     gameweek     INTEGER PRIMARY KEY,
-    data         TEXT NOT NULL,
+    finished     INTEGER NOT NULL DEFAULT 0,   -- 1 = GW over, never refetched
     last_fetched TEXT NOT NULL
 )
 """)
 
+# One row per (gameweek, element, fixture); GW stat totals sit on the
+# element's first fixture row so summing rows per element gives the totals.
+cur.execute("""
+CREATE TABLE IF NOT EXISTS live_element_stats (
+    gameweek                         INTEGER NOT NULL,
+    element_id                       INTEGER NOT NULL,
+    fixture                          INTEGER NOT NULL DEFAULT 0,
+    minutes                          INTEGER NOT NULL DEFAULT 0,
+    goals_scored                     INTEGER NOT NULL DEFAULT 0,
+    assists                          INTEGER NOT NULL DEFAULT 0,
+    clean_sheets                     INTEGER NOT NULL DEFAULT 0,
+    goals_conceded                   INTEGER NOT NULL DEFAULT 0,
+    own_goals                        INTEGER NOT NULL DEFAULT 0,
+    penalties_saved                  INTEGER NOT NULL DEFAULT 0,
+    penalties_missed                 INTEGER NOT NULL DEFAULT 0,
+    yellow_cards                     INTEGER NOT NULL DEFAULT 0,
+    red_cards                        INTEGER NOT NULL DEFAULT 0,
+    saves                            INTEGER NOT NULL DEFAULT 0,
+    bonus                            INTEGER NOT NULL DEFAULT 0,
+    bps                              INTEGER NOT NULL DEFAULT 0,
+    clearances_blocks_interceptions  INTEGER NOT NULL DEFAULT 0,
+    recoveries                       INTEGER NOT NULL DEFAULT 0,
+    tackles                          INTEGER NOT NULL DEFAULT 0,
+    defensive_contribution           INTEGER NOT NULL DEFAULT 0,
+    starts                           INTEGER NOT NULL DEFAULT 0,
+    total_points                     INTEGER NOT NULL DEFAULT 0,
+    in_dreamteam                     INTEGER NOT NULL DEFAULT 0,
+    expected_goals                   INTEGER NOT NULL DEFAULT 0,   -- hundredths
+    expected_assists                 INTEGER NOT NULL DEFAULT 0,   -- hundredths
+    expected_goal_involvements       INTEGER NOT NULL DEFAULT 0,   -- hundredths
+    expected_goals_conceded          INTEGER NOT NULL DEFAULT 0,   -- hundredths
+    -- explain points per identifier, flattened at ingest (live_cache.POINTS_COLUMNS)
+    assists_points                   INTEGER NOT NULL DEFAULT 0,
+    bonus_points                     INTEGER NOT NULL DEFAULT 0,
+    clean_sheets_points              INTEGER NOT NULL DEFAULT 0,
+    defensive_contribution_points    INTEGER NOT NULL DEFAULT 0,
+    goals_scored_points              INTEGER NOT NULL DEFAULT 0,
+    goals_conceded_points            INTEGER NOT NULL DEFAULT 0,
+    minutes_points                   INTEGER NOT NULL DEFAULT 0,
+    own_goals_points                 INTEGER NOT NULL DEFAULT 0,
+    penalties_saved_points           INTEGER NOT NULL DEFAULT 0,
+    penalties_missed_points          INTEGER NOT NULL DEFAULT 0,
+    red_cards_points                 INTEGER NOT NULL DEFAULT 0,
+    saves_points                     INTEGER NOT NULL DEFAULT 0,
+    yellow_cards_points              INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (gameweek, element_id, fixture)
+) WITHOUT ROWID
+""")
+
+# Picks per entry and GW (see modules/picks_cache.py); finished GWs are immutable
+cur.execute("""
+CREATE TABLE IF NOT EXISTS picks (
+    entry_id     INTEGER NOT NULL,
+    gameweek     INTEGER NOT NULL,
+    picks        TEXT NOT NULL,                -- compact [[element, multiplier, position, is_captain], ...]
+    finished     INTEGER NOT NULL DEFAULT 0,   -- 1 = GW over, never refetched
+    last_fetched TEXT NOT NULL,
+    PRIMARY KEY (entry_id, gameweek)
+)
+""")
+
 cur.execute("""
 CREATE TABLE IF NOT EXISTS managers (
     team_id      INTEGER PRIMARY KEY,
@@ -55,11 +138,15 @@ CREATE TABLE IF NOT EXISTS managers (
 )
 """)
 
-# Used by fill_global_points_from_explain()
+# Used by fill_global_points_from_explain(). It used to be keyed by
+# event_updated; being a pure cache, an old-layout table is just rebuilt.
+if {r[1] for r in cur.execute("PRAGMA table_info(global_points_cache)")} - {"gameweek", "finished", "data", "last_fetched"}:
+    cur.execute("DROP TABLE global_points_cache")
 cur.execute("""
 CREATE TABLE IF NOT EXISTS global_points_cache (
-    event_updated TEXT PRIMARY KEY,
-    data          TEXT NOT NULL,
+    gameweek      INTEGER PRIMARY KEY,
+    finished      INTEGER NOT NULL DEFAULT 0,  -- 1 = season totals through this GW (frozen)
+    data          BLOB NOT NULL,               -- 0 = this live GW's own points
     last_fetched  TEXT NOT NULL
 )
 """)
@@ -107,15 +194,42 @@ CREATE TABLE IF NOT EXISTS mini_league_breakdown_cache (
 )
 """)
 
+# Background pre-warmer (see modules/prewarm.py): hourly request counters per
+# cache entry, and the lease that lets a single process do the warming
+cur.execute("""
+CREATE TABLE IF NOT EXISTS prewarm_demand (
+    kind         TEXT NOT NULL,                -- 'summary' | 'breakdown' | 'team'
+    key          TEXT NOT NULL,                -- 'league_id:max_show' or 'team_id'
+    bucket       INTEGER NOT NULL,             -- unix hour
+    hits         INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key, bucket)
+)
+""")
+
+cur.execute("""
+CREATE TABLE IF NOT EXISTS prewarm_lease (
+    name         TEXT PRIMARY KEY,
+    owner        TEXT NOT NULL,
+    expires_at   REAL NOT NULL,                -- unix time
+    warmed_for   TEXT                          -- event-status generation of the last warm
+)
+""")
+
+# Shared event status + generation, written by one watcher (modules/event_watch.py)
+cur.executescript(EVENT_STATUS_SCHEMA_SQL)
+
 # --- Indexes helpful for pruning / freshness checks ---
 cur.execute(
     "CREATE INDEX IF NOT EXISTS idx_static_data_last_fetched             ON static_data(last_fetched)")
 cur.execute("CREATE INDEX IF NOT EXISTS idx_static_player_info_last_fetched      ON static_player_info(last_fetched)")
 cur.execute("CREATE INDEX IF NOT EXISTS idx_team_player_info_last_fetched        ON team_player_info(last_fetched)")
-cur.execute("CREATE INDEX IF NOT EXISTS idx_live_elements_cache_last_fetched     ON live_elements_cache(last_fetched)")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_team_gw_vectors_last_fetched         ON team_gw_vectors(last_fetched)")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_live_gameweeks_last_fetched          ON live_gameweeks(last_fetched)")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_picks_last_fetched                   ON picks(last_fetched)")
 cur.execute(
     "CREATE INDEX IF NOT EXISTS idx_managers_last_fetched                ON managers(last_fetched)")
 cur.execute("CREATE INDEX IF NOT EXISTS idx_global_points_cache_last_fetched     ON global_points_cache(last_fetched)")
+cur.execute("CREATE INDEX IF NOT EXISTS idx_prewarm_demand_bucket                ON prewarm_demand(bucket)")
 
 # New cache indexes
 cur.execute("CREATE INDEX IF NOT EXISTS idx_mls_cache_last_fetched               ON mini_league_summary_cache(last_fetched)")
@@ -130,6 +244,25 @@ cur.execute(
     "CREATE INDEX IF NOT EXISTS idx_fixtures_last_fetched                ON fixtures(last_fetched)")
 
 conn.commit()
+
+# --- Re-encode legacy JSON cache rows with each table's codec (modules/codec.py) ---
+for table, keys, int_keys in (
+    ("static_player_info", ("gameweek",), True),
+    ("team_player_info", ("team_id", "gameweek"), True),
+    ("team_gw_vectors", ("team_id", "gameweek"), True),
+    ("global_points_cache", ("gameweek",), False),
+    ("mini_league_summary_cache", ("league_id", "gameweek", "max_show"), False),
+    ("mini_league_breakdown_cache", ("league_id", "gameweek", "max_show"), False),
+):
+    migrated = migrate_table(conn, table, keys, int_keys=int_keys)
+    if migrated:
+        print(f"Re-encoded {migrated} row(s) in {table}")
+
+# last_accessed columns for LRU eviction (modules/retention.py)
+ensure_access_columns(cur)
+# event_gen columns for generation-based freshness (modules/event_watch.py)
+ensure_gen_columns(cur)
+
 conn.close()
 
 print("Database initialized ✅")
@@ -1,70 +1,291 @@
+"""
+Table sizes and cache retention for the app database.
+
+Stats never read row payloads in full, so they are safe to run against the
+live database (it is opened read-only):
+
+  sizes      dbstat (table and index pages) when SQLite was built with it,
+             else estimated from a row sample, capped by the pages in use
+  row counts sqlite_stat1 (after ANALYZE) when present, else COUNT(*)
+             (--exact always counts)
+  blobs      average size of the cached blob column, from SAMPLE_ROWS rows
+             picked by random rowid seeks
+  reuse      share of sampled cache rows read again since they were written
+             (last_accessed >= last_fetched, see modules/retention.py)
+
+`--json` prints the same numbers as one JSON object for dashboards.
+"""
+import argparse
+import json
+import os
+import random
 import sqlite3
 from pathlib import Path
 
+from modules import retention
+
 DB_PATH = Path("page_views.db")  # change to your DB filename
 
+SAMPLE_ROWS = 200
+MB = 1024 * 1024
+
+
+def open_readonly(db_path) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{Path(db_path).resolve()}?mode=ro", uri=True, timeout=30)
+    conn.execute("PRAGMA query_only=1;")
+    conn.execute("PRAGMA busy_timeout=10000;")
+    return conn
+
+
+def _pragma(cur, name):
+    return cur.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def _schema(cur) -> dict:
+    """{table: {"indexes": [...], "rowid": bool, "columns": [...]}}"""
+    tables = {}
+    for name, sql in cur.execute(
+            "SELECT name, sql FROM sqlite_schema WHERE type='table' ORDER BY name").fetchall():
+        tables[name] = {
+            "indexes": [],
+            "rowid": "WITHOUT ROWID" not in (sql or "").upper(),
+            "columns": [r[1] for r in cur.execute(f'PRAGMA table_info("{name}")')],
+        }
+    for name, tbl in cur.execute(
+            "SELECT name, tbl_name FROM sqlite_schema WHERE type='index'").fetchall():
+        if tbl in tables:
+            tables[tbl]["indexes"].append(name)
+    return tables
+
 
-def estimate_table_size(cur, table):
-    """Estimate table size by summing row lengths (bytes)."""
+def _dbstat_sizes(cur) -> dict | None:
+    """{btree name: (bytes, pages)} from dbstat, or None if it is not compiled in."""
     try:
-        cur.execute(f"SELECT * FROM {table}")
-        rows = cur.fetchall()
-        size = 0
-        for row in rows:
-            size += sum(len(str(col).encode('utf-8'))
-                        for col in row if col is not None)
-        return round(size / (1024 * 1024), 3)
-    except Exception as e:
-        return "n/a"
-
-
-def get_table_stats(db_path):
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+        rows = cur.execute(
+            "SELECT name, pgsize, pageno FROM dbstat WHERE aggregate = TRUE"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        try:  # SQLite < 3.31: no aggregate mode
+            rows = cur.execute(
+                "SELECT name, SUM(pgsize), COUNT(*) FROM dbstat GROUP BY name").fetchall()
+        except sqlite3.OperationalError:
+            return None
+    return {name: (size or 0, pages or 0) for name, size, pages in rows}
+
+
+def _stat1_rows(cur) -> dict:
+    """{table: row count} from sqlite_stat1 (written by ANALYZE)."""
+    try:
+        rows = cur.execute("SELECT tbl, stat FROM sqlite_stat1").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    counts = {}
+    for tbl, stat in rows:
+        try:
+            counts[tbl] = max(counts.get(tbl, 0), int((stat or "0").split()[0]))
+        except ValueError:
+            continue
+    return counts
+
+
+def _blob_column(table: str, columns: list) -> str | None:
+    policy = retention.RETENTION_POLICIES.get(table)
+    if policy and policy.get("size_column") in columns:
+        return policy["size_column"]
+    return "data" if "data" in columns else None
+
+
+def sample_rows(cur, table: str, info: dict, exprs: list, n: int = SAMPLE_ROWS) -> list:
+    """
+    Up to `n` rows of `exprs` from `table`. Rowid tables are sampled with
+    random seeks (O(log N) each); WITHOUT ROWID tables read the first n rows.
+    """
+    select = ", ".join(exprs)
+    if not info["rowid"]:
+        return cur.execute(f'SELECT {select} FROM "{table}" LIMIT ?', (n,)).fetchall()
+    lo, hi = cur.execute(f'SELECT MIN(rowid), MAX(rowid) FROM "{table}"').fetchone()
+    if lo is None:
+        return []
+    if hi - lo < n:
+        return cur.execute(f'SELECT {select} FROM "{table}"').fetchall()
+    seek = f'SELECT {select} FROM "{table}" WHERE rowid >= ? ORDER BY rowid LIMIT 1'
+    return [row for r in random.sample(range(lo, hi + 1), n)
+            for row in cur.execute(seek, (r,)).fetchall()]
+
+
+def estimate_table_size(cur, table, info: dict, rows: int, sample: list | None = None) -> int:
+    """Estimate table bytes as rows × the average sampled row length."""
+    if sample is None:
+        lengths = " + ".join(f'COALESCE(LENGTH(CAST("{c}" AS BLOB)), 0)' for c in info["columns"])
+        sample = [r[0] for r in sample_rows(cur, table, info, [lengths or "0"])]
+    if not sample:
+        return 0
+    return int(rows * sum(sample) / len(sample))
+
+
+def get_db_stats(cur, db_path) -> dict:
+    page_size = _pragma(cur, "page_size")
+    page_count = _pragma(cur, "page_count")
+    freelist = _pragma(cur, "freelist_count")
+    wal = f"{db_path}-wal"
+    return {
+        "path": str(db_path),
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_pages": freelist,
+        "size_bytes": page_count * page_size,
+        "used_bytes": (page_count - freelist) * page_size,
+        "wal_bytes": os.path.getsize(wal) if os.path.exists(wal) else 0,
+        "journal_mode": _pragma(cur, "journal_mode"),
+        "auto_vacuum": {0: "none", 1: "full", 2: "incremental"}.get(_pragma(cur, "auto_vacuum")),
+    }
+
+
+def get_table_stats(db_path, *, exact: bool = False, sample: int = SAMPLE_ROWS):
+    """
+    Per-table stats (see the module docstring) and the total database size in
+    MB. Opens the database read-only.
+    """
+    conn = open_readonly(db_path)
     cur = conn.cursor()
+    try:
+        schema = _schema(cur)
+        dbstat = _dbstat_sizes(cur)
+        stat1 = {} if exact else _stat1_rows(cur)
+        used = (_pragma(cur, "page_count") - _pragma(cur, "freelist_count")) * _pragma(cur, "page_size")
 
-    # Get all tables
-    cur.execute("SELECT name FROM sqlite_schema WHERE type='table'")
-    tables = [row[0] for row in cur.fetchall()]
+        stats = []
+        for table, info in schema.items():
+            if table in stat1:
+                rows, rows_source = stat1[table], "sqlite_stat1"
+            else:
+                rows = cur.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                rows_source = "count"
 
-    stats = []
-    for table in tables:
-        # Row count
-        cur.execute(f"SELECT COUNT(*) FROM {table}")
-        row_count = cur.fetchone()[0]
+            cols = info["columns"]
+            blob_col = _blob_column(table, cols)
+            lengths = " + ".join(f'COALESCE(LENGTH(CAST("{c}" AS BLOB)), 0)' for c in cols) or "0"
+            exprs = [lengths, f'LENGTH("{blob_col}")' if blob_col else "NULL"]
+            reuse = "last_accessed" in cols and "last_fetched" in cols
+            exprs.append("COALESCE(last_accessed >= last_fetched, 0)" if reuse else "NULL")
+            picked = sample_rows(cur, table, info, exprs, sample) if rows else []
 
-        # Try dbstat first
-        size_mb = "n/a"
-        try:
-            cur.execute(f"SELECT SUM(pgsize) FROM dbstat WHERE name='{table}'")
-            size_bytes = cur.fetchone()[0] or 0
-            size_mb = round(size_bytes / (1024*1024), 3)
-        except sqlite3.OperationalError:
-            # Fallback: estimate by row lengths
-            size_mb = estimate_table_size(cur, table)
+            if dbstat is not None:
+                size, pages = dbstat.get(table, (0, 0))
+                index_size = sum(dbstat.get(i, (0, 0))[0] for i in info["indexes"])
+                size_source = "dbstat"
+            else:
+                size = min(used, estimate_table_size(cur, table, info, rows, [r[0] for r in picked]))
+                pages, index_size, size_source = None, None, "sample"
 
-        stats.append({
-            "table": table,
-            "rows": row_count,
-            "size_mb": size_mb
-        })
+            blobs = [r[1] for r in picked if r[1] is not None]
+            reused = [r[2] for r in picked if r[2] is not None] if reuse else []
+            stats.append({
+                "table": table,
+                "rows": rows,
+                "rows_source": rows_source,
+                "size_mb": round(size / MB, 3),
+                "size_source": size_source,
+                "pages": pages,
+                "index_mb": round(index_size / MB, 3) if index_size is not None else None,
+                "indexes": len(info["indexes"]),
+                "blob_column": blob_col,
+                "avg_blob_bytes": int(sum(blobs) / len(blobs)) if blobs else None,
+                "reuse_ratio": round(sum(reused) / len(reused), 3) if reused else None,
+                "sampled": len(picked),
+            })
 
-    # Total DB size
-    cur.execute("PRAGMA page_count")
-    page_count = cur.fetchone()[0]
-    cur.execute("PRAGMA page_size")
-    page_size = cur.fetchone()[0]
-    total_db_size_mb = round((page_count * page_size) / (1024 * 1024), 3)
+        total_db_size_mb = round(_pragma(cur, "page_count") * _pragma(cur, "page_size") / MB, 3)
+        db = get_db_stats(cur, db_path)
+    finally:
+        conn.close()
+    stats.sort(key=lambda s: s["size_mb"], reverse=True)
+    return stats, total_db_size_mb, db
 
-    conn.close()
-    return stats, total_db_size_mb
 
+def _fmt(v, spec=""):
+    return "n/a" if v is None else format(v, spec)
 
-if __name__ == "__main__":
-    stats, total_size = get_table_stats(DB_PATH)
-    print(f"\nTable stats for: {DB_PATH}")
-    print(f"Total DB size: {total_size} MB\n")
-    print(f"{'Table':30} {'Rows':10} {'Size (MB)':10}")
-    print("-" * 55)
+
+def print_stats(db_path, *, exact: bool = False, sample: int = SAMPLE_ROWS,
+                as_json: bool = False, retention_report: dict | None = None):
+    stats, total_size, db = get_table_stats(db_path, exact=exact, sample=sample)
+    if as_json:
+        out = {"db": db, "tables": stats}
+        if retention_report is not None:
+            out["retention"] = retention_report
+        print(json.dumps(out, indent=2))
+        return
+    print(f"\nTable stats for: {db_path}")
+    print(f"Total DB size: {total_size} MB "
+          f"(free pages: {db['freelist_pages']}, WAL: {db['wal_bytes'] / MB:.1f} MB, "
+          f"journal={db['journal_mode']}, auto_vacuum={db['auto_vacuum']})\n")
+    print(f"{'Table':30} {'Rows':>10} {'Size (MB)':>10} {'Idx (MB)':>9} "
+          f"{'Avg blob':>10} {'Reuse':>6}")
+    print("-" * 80)
     for s in stats:
-        print(f"{s['table']:30} {s['rows']:10} {s['size_mb']}")
+        rows = f"{s['rows']}{'~' if s['rows_source'] == 'sqlite_stat1' else ''}"
+        size = f"{s['size_mb']}{'~' if s['size_source'] == 'sample' else ''}"
+        print(f"{s['table']:30} {rows:>10} {size:>10} {_fmt(s['index_mb']):>9} "
+              f"{_fmt(s['avg_blob_bytes']):>10} {_fmt(s['reuse_ratio']):>6}")
+    print("\n~ estimated (sqlite_stat1 row counts / sampled sizes)")
+
+
+def print_retention_report(report):
+    mb = retention.MB
+    print(f"\nRetention ({report['seconds']}s): "
+          f"{report['size_before'] / mb:.1f} MB → {report['size_after'] / mb:.1f} MB in use")
+    print(f"{'Table':30} {'age':>8} {'rows':>8} {'bytes':>8}")
+    print("-" * 58)
+    for table, n in report["tables"].items():
+        print(f"{table:30} {n['age']:8} {n['rows']:8} {n['bytes']:8}")
+    for table, n in report.get("budget_trim", {}).items():
+        print(f"  budget trim: {n} row(s) from {table}")
+    if "vacuum" in report:
+        v = report["vacuum"]
+        print(f"  vacuum: auto_vacuum={v['auto_vacuum']} freed={v['freed_pages']} "
+              f"free={v['free_pages']} page(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default=str(DB_PATH), help="database file")
+    parser.add_argument("--enforce", action="store_true",
+                        help="apply the retention policies (modules/retention.py)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="with --enforce: only count what would be evicted")
+    parser.add_argument("--budget-mb", type=float,
+                        help="size budget for --enforce (default FPL_DB_BUDGET_MB)")
+    parser.add_argument("--vacuum", action="store_true",
+                        help="switch to incremental auto_vacuum and VACUUM (blocks writers)")
+    parser.add_argument("--exact", action="store_true",
+                        help="COUNT(*) every table instead of trusting sqlite_stat1")
+    parser.add_argument("--sample", type=int, default=SAMPLE_ROWS,
+                        help="rows sampled per table for blob sizes")
+    parser.add_argument("--json", action="store_true", help="print stats as JSON")
+    args = parser.parse_args(argv)
+
+    report = None
+    if args.enforce or args.vacuum:
+        conn = sqlite3.connect(args.db, timeout=30)
+        conn.execute("PRAGMA busy_timeout=10000;")
+        try:
+            if args.enforce:
+                budget = int(args.budget_mb * retention.MB) if args.budget_mb else retention.DB_BUDGET_BYTES
+                report = retention.enforce(conn.cursor(), budget=budget, dry_run=args.dry_run)
+                if not args.json:
+                    print_retention_report(report)
+            if args.vacuum:
+                retention.full_vacuum(conn)
+                if not args.json:
+                    print("\nVACUUM done (auto_vacuum=INCREMENTAL)")
+        finally:
+            conn.close()
+
+    print_stats(args.db, exact=args.exact, sample=args.sample,
+                as_json=args.json, retention_report=report)
+
+
+if __name__ == "__main__":
+    main()
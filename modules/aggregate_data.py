@@ -1,38 +1,132 @@
 import logging
+from collections.abc import MutableMapping
 
 logger = logging.getLogger(__name__)
 
+# Fields the client's row renderers read besides the requested columns
+# (badge, name, position, images); see the `render:` columns in the templates
+ROW_FIELDS = ("photo", "team_code", "team_name", "web_name", "element_type")
+MAX_PAGE_SIZE = 500
+
+# Tables that merge the manager's team_* columns in, and show the top 100
+TEAM_TABLES = ("summary", "defence", "offence", "points")
+TEAM_TABLE_LIMIT = 100
+
+DEFAULT_SORT_BY = {
+    "summary": "total_points_team",
+    "defence": "starts_team",
+    "offence": "goals_scored_team",
+    "points": "minutes_points_team",
+    "players": "total_points",
+    "talisman": "total_points",
+    "teams": "total_points",
+}
+FALLBACK_SORT_BY = "goals_scored_team"
+
+# Stamped per request from the fixtures cache (not part of the player blob)
+FIXTURE_SORT_KEYS = {
+    "next3_fdr_sum", "next3_fdr_avg",
+    "next5_fdr_sum", "next5_fdr_avg",
+    "next_ko_ts_utc",
+}
+
+# Sorting on these keeps only rows < 0 (and sorts them the other way round)
+NEGATIVE_COLUMNS = {
+    "points_pm_team", "yellow_cards_points_team", "yellow_cards_points",
+    "red_cards_points_team", "red_cards_points", "penalties_missed_points",
+    "penalties_missed_points_team", "own_goals_points", "own_goals_points_team",
+    "goals_conceded_points", "goals_conceded_points_team",
+}
+# ... these keep every row != 0; any other column keeps rows > 0
+POSITIVE_AND_NEGATIVE_COLUMNS = {
+    "goals_performance_team", "assists_performance_team", "goals_assists_performance_team",
+    "goals_performance", "assists_performance", "goals_assists_performance",
+    "goals_assists_performance_team_vs_total", "total_points",
+    "starts_team", "total_points_team"
+}
+
 # Merging static totals from player_info with team-specific data from team_player_info SQL tables
 
 
-def merge_team_and_global(global_info, team_info):
+class OverlayRow(MutableMapping):
     """
-    Merge global player_info (totals) and team_info (team-specific stats).
-    Ensures all players have all team_* keys even if never owned.
+    A merged player row that copies nothing. Reads look at fields set on the
+    row itself, then the team_* keys (from the sparse team row; 0 for players
+    never owned), then the shared global row. Writes (e.g. fixture metrics)
+    stay on the row, so the shared blob is never touched. jsonify() handles
+    these through the app's JSON provider.
     """
-    merged = {}
 
-    # Collect all possible team-specific keys from team_info (dynamic)
-    team_keys = set()
-    for p in team_info.values():
-        team_keys.update([k for k in p.keys() if k.endswith("_team")])
-
-    for pid, global_player in global_info.items():
-        # Start from the global player data
-        merged_player = global_player.copy()
-
-        # If player is in team_info, merge values, else default zeros
-        if pid in team_info:
-            for key in team_keys:
-                merged_player[key] = team_info[pid].get(key, 0)
-        else:
-            # Default all team-specific keys to 0 for players never owned
-            for key in team_keys:
-                merged_player[key] = 0
+    __slots__ = ("base", "team", "team_keys", "own")
+
+    def __init__(self, base, team=None, team_keys=frozenset()):
+        self.base = base
+        self.team = team
+        self.team_keys = team_keys
+        self.own = None
+
+    def __getitem__(self, key):
+        own = self.own
+        if own is not None and key in own:
+            return own[key]
+        if key in self.team_keys:
+            team = self.team
+            return team.get(key, 0) if team is not None else 0
+        return self.base[key]
+
+    def get(self, key, default=None):
+        own = self.own
+        if own is not None and key in own:
+            return own[key]
+        if key in self.team_keys:
+            team = self.team
+            return team.get(key, 0) if team is not None else 0
+        return self.base.get(key, default)
+
+    def __contains__(self, key):
+        return (self.own is not None and key in self.own) or key in self.team_keys or key in self.base
+
+    def __setitem__(self, key, value):
+        if self.own is None:
+            self.own = {}
+        self.own[key] = value
+
+    def __delitem__(self, key):
+        if self.own is None or key not in self.own:
+            raise KeyError(f"{key!r} is not set on this row (shared fields are read-only)")
+        del self.own[key]
+
+    def __iter__(self):
+        yield from self.base
+        for key in self.team_keys:
+            if key not in self.base:
+                yield key
+        if self.own:
+            for key in self.own:
+                if key not in self.base and key not in self.team_keys:
+                    yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def copy(self) -> dict:
+        return dict(self)
+
+
+def team_keys_of(team_info) -> frozenset:
+    """Every team_* key present in the team blob."""
+    return frozenset(k for p in team_info.values() for k in p if k.endswith("_team"))
 
-        merged[pid] = merged_player
 
-    return merged
+def merge_team_and_global(global_info, team_info):
+    """
+    Merge global player_info (totals) and team_info (team-specific stats).
+    All players have all team_* keys even if never owned. Rows are
+    OverlayRow views over both inputs: nothing is copied.
+    """
+    team_keys = team_keys_of(team_info)
+    return {pid: OverlayRow(row, team_info.get(pid), team_keys)
+            for pid, row in global_info.items()}
 
 
 # Merge global and team-specific player info, then filter and sort players.
@@ -44,26 +138,12 @@ def filter_and_sort_players(global_info, team_info, request_args):
     """
     table = request_args.get("table", "summary")
 
-    if table in ["summary", "defence", "offence", "points"]:
+    if table in TEAM_TABLES:
         player_info = merge_team_and_global(global_info, team_info)
     else:
         player_info = global_info
 
-    default_sort_by = {
-        "summary": "total_points_team",
-        "defence": "starts_team",
-        "offence": "goals_scored_team",
-        "points": "minutes_points_team",
-        "players": "total_points",
-        "talisman": "total_points",
-        "teams": "total_points",
-    }.get(table, "goals_scored_team")
-
-    FIXTURE_SORT_KEYS = {
-        "next3_fdr_sum", "next3_fdr_avg",
-        "next5_fdr_sum", "next5_fdr_avg",
-        "next_ko_ts_utc",
-    }
+    default_sort_by = DEFAULT_SORT_BY.get(table, FALLBACK_SORT_BY)
 
     sort_by = request_args.get("sort_by", default_sort_by)
     order = request_args.get("order", "desc")
@@ -101,30 +181,17 @@ def filter_and_sort_players(global_info, team_info, request_args):
         players = [p for p in players if p.get("now_cost", 0) <= thr]
 
     # ---------------- 4) Column-based inclusion filter -------------------------------
-    negative_columns = {
-        "points_pm_team", "yellow_cards_points_team", "yellow_cards_points",
-        "red_cards_points_team", "red_cards_points", "penalties_missed_points",
-        "penalties_missed_points_team", "own_goals_points", "own_goals_points_team",
-        "goals_conceded_points", "goals_conceded_points_team",
-    }
-    positive_and_negative_columns = {
-        "goals_performance_team", "assists_performance_team", "goals_assists_performance_team",
-        "goals_performance", "assists_performance", "goals_assists_performance",
-        "goals_assists_performance_team_vs_total", "total_points",
-        "starts_team", "total_points_team"
-    }
-
     if sort_by not in FIXTURE_SORT_KEYS:
-        if sort_by in negative_columns:
+        if sort_by in NEGATIVE_COLUMNS:
             players = [p for p in players if float(p.get(sort_by, 0)) < 0]
-        elif sort_by in positive_and_negative_columns:
+        elif sort_by in POSITIVE_AND_NEGATIVE_COLUMNS:
             players = [p for p in players if float(p.get(sort_by, 0))]
         else:
             players = [p for p in players if float(p.get(sort_by, 0)) > 0]
 
     # ---------------- 5) Sort ----------------------------------------------------------
     reverse_order = (order == "desc")
-    if sort_by in negative_columns:
+    if sort_by in NEGATIVE_COLUMNS:
         players = sorted(players, key=lambda x: x.get(
             sort_by, 0), reverse=not reverse_order)
     else:
@@ -133,15 +200,46 @@ def filter_and_sort_players(global_info, team_info, request_args):
 
     # ---------------- 6) Truncate & images --------------------------------------------
     is_truncated = False
-    if table in ["summary", "defence", "offence", "points"]:
-        is_truncated = len(players) > 100
-        players = players[:100]
+    if table in TEAM_TABLES:
+        is_truncated = len(players) > TEAM_TABLE_LIMIT
+        players = players[:TEAM_TABLE_LIMIT]
 
     players_images = [{"photo": p.get("photo"), "team_code": p.get(
         "team_code")} for p in players[:5]]
 
     return players, players_images, is_truncated, price_range
 
+def paginate_players(players, request_args):
+    """
+    One page of the sorted `players`. page is 1-based; without page_size
+    every row is returned. Returns (rows, total, page, page_size).
+    """
+    total = len(players)
+    page_size = request_args.get("page_size", type=int)
+    if not page_size or page_size < 1:
+        return players, total, 1, total
+    page_size = min(page_size, MAX_PAGE_SIZE)
+    page = max(1, request_args.get("page", default=1, type=int) or 1)
+    start = (page - 1) * page_size
+    return players[start:start + page_size], total, page, page_size
+
+
+def project_players(players, request_args):
+    """
+    Keep only the fields the client asked for (comma-separated `fields`:
+    the table's column keys plus whatever its renderers read) and ROW_FIELDS
+    and the sort key. Without `fields` the rows are returned whole.
+    """
+    fields = request_args.get("fields")
+    if not fields:
+        return players
+    keep = set(ROW_FIELDS)
+    keep.update(f for f in fields.split(",") if f)
+    sort_by = request_args.get("sort_by")
+    if sort_by:
+        keep.add(sort_by)
+    return [{k: p[k] for k in keep if k in p} for p in players]
+
 # Sort for simple tables. I use it for graph/tables combo on manager page
 
 
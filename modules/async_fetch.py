@@ -0,0 +1,109 @@
+# modules/async_fetch.py
+"""
+Process-wide asyncio fetch engine for upstream fan-out.
+
+One event loop runs in a daemon thread and every batch submitted through
+fetch_many() / fetch_json_many() is scheduled on it under a single global
+concurrency budget (MAX_CONCURRENCY). Nested fan-out (league → managers →
+GWs) therefore shares one bounded pool instead of spawning executors per
+request.
+
+The blocking call itself stays on the shared HTTP session (connection pool,
+retries) and runs on one fixed executor sized to the budget, so there is a
+single HTTP stack for the whole app.
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from modules.http_client import HTTP
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("FPL_FETCH_CONCURRENCY", "32"))
+DEFAULT_TIMEOUT = 10
+
+_LOCK = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_thread: threading.Thread | None = None
+_executor: ThreadPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+_pid: int | None = None
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    """Start the loop thread lazily (and again after a fork, e.g. gunicorn workers)."""
+    global _loop, _thread, _executor, _semaphore, _pid
+    with _LOCK:
+        if _loop is not None and _pid == os.getpid() and _thread.is_alive():
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        executor = ThreadPoolExecutor(
+            max_workers=MAX_CONCURRENCY, thread_name_prefix="fetch")
+        loop.set_default_executor(executor)
+
+        async def _make_semaphore():
+            return asyncio.Semaphore(MAX_CONCURRENCY)
+
+        thread = threading.Thread(
+            target=loop.run_forever, name="fetch-loop", daemon=True)
+        thread.start()
+        _semaphore = asyncio.run_coroutine_threadsafe(
+            _make_semaphore(), loop).result()
+        _loop, _thread, _executor, _pid = loop, thread, executor, os.getpid()
+        logger.debug("[async_fetch] loop started (concurrency=%d)",
+                     MAX_CONCURRENCY)
+        return loop
+
+
+async def _get(url: str, timeout):
+    async with _semaphore:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(HTTP.get, url, timeout=timeout))
+
+
+async def _gather(urls: list[str], timeout):
+    return await asyncio.gather(*(_get(u, timeout) for u in urls), return_exceptions=True)
+
+
+def fetch_many(urls, *, timeout=DEFAULT_TIMEOUT) -> dict:
+    """
+    GET every URL concurrently and return {url: Response | Exception}.
+
+    Duplicate URLs are fetched once. Blocks the calling thread until the whole
+    batch is done; must not be called from the fetch loop itself.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    loop = _ensure_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("fetch_many() called from inside the fetch loop")
+
+    results = asyncio.run_coroutine_threadsafe(
+        _gather(urls, timeout), loop).result()
+    return dict(zip(urls, results))
+
+
+def fetch_json_many(urls, *, timeout=DEFAULT_TIMEOUT) -> dict:
+    """
+    GET every URL concurrently and return {url: parsed JSON | None}.
+
+    Non-2xx responses and transport errors are logged and mapped to None.
+    """
+    out = {}
+    for url, res in fetch_many(urls, timeout=timeout).items():
+        try:
+            if isinstance(res, Exception):
+                raise res
+            res.raise_for_status()
+            out[url] = res.json()
+        except Exception as e:
+            logger.warning("[async_fetch] %s failed: %s", url, e)
+            out[url] = None
+    return out
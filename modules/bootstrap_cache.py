@@ -0,0 +1,98 @@
+# modules/bootstrap_cache.py
+"""
+Process-wide parsed bootstrap-static.
+
+get_static_data() publishes every bootstrap payload it reads (from SQLite or
+the network) here. Publishing hashes the raw JSON text: an unchanged payload
+only refreshes `fetched_at` (no json.loads), a changed one is parsed once,
+indexed, and bumps `generation` so derived caches know to rebuild.
+
+The parsed dict and its indexes are shared by every request in the process —
+treat them as read-only.
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+_LOCK = threading.Lock()
+_CURRENT = None
+_GENERATION = 0
+
+
+class Bootstrap:
+    """Parsed bootstrap-static plus lookup indexes."""
+
+    __slots__ = (
+        "data", "digest", "generation", "fetched_at",
+        "elements_by_id", "teams_by_id", "teams_by_code", "team_name_by_id",
+        "events_by_id", "current_event", "current_gw",
+    )
+
+    def __init__(self, data: dict, digest: str = "", generation: int = 0, fetched_at: datetime | None = None):
+        self.data = data
+        self.digest = digest
+        self.generation = generation
+        self.fetched_at = fetched_at or datetime.now(timezone.utc)
+
+        teams = data.get("teams", []) or []
+        events = data.get("events", []) or []
+        self.elements_by_id = {e["id"]: e for e in data.get("elements", []) or []}
+        self.teams_by_id = {t["id"]: t for t in teams}
+        self.teams_by_code = {t.get("code"): t for t in teams}
+        self.team_name_by_id = {t["id"]: t.get("name") for t in teams}
+        self.events_by_id = {e["id"]: e for e in events}
+        self.current_event = next((e for e in events if e.get("is_current")), None)
+        self.current_gw = self.current_event["id"] if self.current_event else None
+
+    def age_seconds(self, now: datetime | None = None) -> float:
+        return ((now or datetime.now(timezone.utc)) - self.fetched_at).total_seconds()
+
+
+def _digest(raw: str | bytes) -> str:
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+def publish_raw(raw: str | bytes, fetched_at: datetime) -> Bootstrap:
+    """Publish a raw bootstrap JSON payload; parses only if the content changed."""
+    global _CURRENT, _GENERATION
+    digest = _digest(raw)
+    with _LOCK:
+        if _CURRENT is not None and _CURRENT.digest == digest:
+            if fetched_at > _CURRENT.fetched_at:
+                _CURRENT.fetched_at = fetched_at
+            return _CURRENT
+
+    boot = Bootstrap(json.loads(raw), digest, fetched_at=fetched_at)
+    with _LOCK:
+        if _CURRENT is not None and _CURRENT.digest == digest:
+            return _CURRENT  # another thread won the race
+        _GENERATION += 1
+        boot.generation = _GENERATION
+        _CURRENT = boot
+    logger.debug("[bootstrap_cache] generation %s (%s)", boot.generation, digest[:12])
+    return boot
+
+
+def current() -> Bootstrap | None:
+    return _CURRENT
+
+
+def generation() -> int:
+    return _GENERATION
+
+
+def indexes_for(static_data: dict | None) -> Bootstrap:
+    """
+    Indexes for `static_data`: the published instance when it is the same
+    dict (the normal case), otherwise a throwaway one built on the spot.
+    """
+    boot = _CURRENT
+    if boot is not None and boot.data is static_data:
+        return boot
+    return Bootstrap(static_data or {})
@@ -0,0 +1,228 @@
+# modules/cache_builders.py
+"""
+Rebuilders for the per-request caches (mini-league summary/breakdown rows and
+team_player_info blobs).
+
+They take everything they need as arguments — no Flask `g`/session — so the
+request handlers in app.py and the background pre-warmer (modules/prewarm.py)
+share one implementation. Freshness is always judged against the caller's
+event-status generation (modules/event_watch.py): a row built for it, or a
+later one, is current.
+
+Stale league rows are served as-is while revalidate_league_cache() rebuilds
+them on a small background pool (stale-while-revalidate); at most one
+background rebuild per cohort is queued at a time. The manager rows link to
+pages with url_for(), so those rebuilds run in a request context of the app,
+as the pre-warmer's do.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from flask import g
+
+from modules import codec, retention
+from modules.db import get_conn, release
+from modules.fetch_all_tables import populate_player_info_all_with_live_data
+from modules.fetch_mini_leagues import (
+    get_live_points, get_team_ids_from_league, get_team_mini_league_breakdown,
+)
+from modules.live_cache import get_live_gameweeks
+from modules.picks_cache import get_picks_many
+from modules.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+FPL_API = "https://fantasy.premierleague.com/api"
+DATABASE = "page_views.db"
+
+# Mini-league cache rebuilds in flight, keyed by (kind, league_id, gw, max_show,
+# event_gen): a caller never joins a rebuild started for an older generation
+LEAGUE_FLIGHTS = SingleFlight("league_cache")
+
+# Background revalidation of stale league rows
+REVALIDATE_WORKERS = 2
+_REVALIDATOR = ThreadPoolExecutor(
+    max_workers=REVALIDATE_WORKERS, thread_name_prefix="league-revalidate")
+_REVALIDATING: set = set()
+_REVALIDATING_LOCK = threading.Lock()
+
+
+def is_fresh(row_gen: int | None, event_gen: int | None) -> bool:
+    """Fresh if the row's event_gen is >= event_gen (None → always fresh)."""
+    return event_gen is None or (row_gen is not None and row_gen >= event_gen)
+
+
+def read_league_cache(cur, table: str, league_id: int, gw: int, max_show: int,
+                      event_gen: int | None) -> str | None:
+    """Cached payload for the cohort if it is still fresh, else None."""
+    cur.execute(f"""
+        SELECT data, event_gen
+        FROM {table}
+        WHERE league_id = ? AND gameweek = ? AND max_show = ?
+    """, (league_id, gw, max_show))
+    row = cur.fetchone()
+    return row[0] if row and is_fresh(row[1], event_gen) else None
+
+
+def rebuild_league_summary(conn, league_id: int, gw: int, max_show: int, static_data: dict, *,
+                           event_gen: int | None = None, refresh: bool = False):
+    """
+    Encoded mini_league_summary_cache payload for the cohort, rebuilt and
+    stored unless a fresh row already exists (refresh=True always rebuilds).
+    Concurrent callers for the same cohort share one rebuild.
+    """
+    cur = conn.cursor()
+
+    def _rebuild():
+        # A concurrent flight may have just written the row
+        if not refresh:
+            fresh = read_league_cache(
+                cur, "mini_league_summary_cache", league_id, gw, max_show, event_gen)
+            if fresh:
+                return fresh
+        logger.debug(
+            "[mini_summary] rebuilding league=%s gw=%s max_show=%s", league_id, gw, max_show)
+        live_map = get_live_points(gw, cur)
+        rebuilt = get_team_ids_from_league(
+            league_id, max_show,
+            static_data=static_data,
+            current_gw=gw,
+            live_points_by_element=live_map,
+            cur=cur,
+            skip_history=False,
+        )
+        payload = codec.encode_for("mini_league_summary_cache", rebuilt)
+        cur.execute("""
+            INSERT OR REPLACE INTO mini_league_summary_cache
+            (league_id, gameweek, max_show, data, last_fetched, event_gen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (league_id, gw, max_show, payload, datetime.now(timezone.utc).isoformat(),
+              event_gen))
+        conn.commit()
+        return payload
+
+    return LEAGUE_FLIGHTS.do(("summary", league_id, gw, max_show, event_gen), _rebuild)
+
+
+def rebuild_league_breakdown(conn, league_id: int, gw: int, max_show: int, static_data: dict, *,
+                             event_gen: int | None = None, refresh: bool = False):
+    """Same as rebuild_league_summary() for mini_league_breakdown_cache."""
+    cur = conn.cursor()
+
+    def _rebuild():
+        if not refresh:
+            fresh = read_league_cache(
+                cur, "mini_league_breakdown_cache", league_id, gw, max_show, event_gen)
+            if fresh:
+                return fresh
+        logger.debug(
+            "[mini_breakdown] rebuilding league=%s gw=%s max_show=%s", league_id, gw, max_show)
+        rebuilt = []
+
+        # Top-N managers
+        managers = get_team_ids_from_league(
+            league_id, max_show,
+            static_data=static_data,
+            current_gw=gw
+        )
+
+        # Prefetch live once per GW (shared store; finished GWs never refetched)
+        live_data_map = get_live_gameweeks(
+            cur, range(1, gw + 1), FPL_API, current_gw=gw)
+
+        # Prefetch every manager's picks in one batch (past GWs are cached for good)
+        picks_by_gw = get_picks_many(
+            cur, [m["entry"] for m in managers], range(1, gw + 1), current_gw=gw)
+
+        # Build per-manager breakdown rows
+        for m in managers:
+            try:
+                summary = get_team_mini_league_breakdown(
+                    m["entry"], static_data, live_data_map, picks_by_gw)
+                rebuilt.append({**m, **summary, "team_id": m["entry"]})
+            except Exception as e:
+                logger.warning(
+                    "[mini_breakdown] summary build failed for %s: %s", m.get("entry"), e)
+
+        # Cache the generic top-N (without 'me')
+        payload = codec.encode_for("mini_league_breakdown_cache", rebuilt)
+        cur.execute("""
+            INSERT OR REPLACE INTO mini_league_breakdown_cache
+            (league_id, gameweek, max_show, data, last_fetched, event_gen)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (league_id, gw, max_show, payload, datetime.now(timezone.utc).isoformat(),
+              event_gen))
+        conn.commit()
+        return payload
+
+    return LEAGUE_FLIGHTS.do(("breakdown", league_id, gw, max_show, event_gen), _rebuild)
+
+
+_LEAGUE_REBUILDERS = {
+    "summary": rebuild_league_summary,
+    "breakdown": rebuild_league_breakdown,
+}
+
+
+def revalidate_league_cache(app, kind: str, league_id: int, gw: int, max_show: int,
+                            static_data: dict, event_gen: int | None) -> bool:
+    """
+    Queue a background rebuild of a stale league cache row ("summary" or
+    "breakdown"). Returns False if one is already queued/running for the cohort
+    at this event generation (a rebuild for an older one does not count).
+    """
+    key = (kind, league_id, gw, max_show, event_gen)
+    with _REVALIDATING_LOCK:
+        if key in _REVALIDATING:
+            return False
+        _REVALIDATING.add(key)
+    _REVALIDATOR.submit(_revalidate, app, key, static_data)
+    return True
+
+
+def _revalidate(app, key, static_data: dict) -> None:
+    kind, league_id, gw, max_show, event_gen = key
+    conn = get_conn(DATABASE)
+    try:
+        with app.test_request_context("/"):
+            g.current_gw = gw
+            g.event_gen = event_gen
+            _LEAGUE_REBUILDERS[kind](conn, league_id, gw, max_show, static_data,
+                                     event_gen=event_gen)
+        logger.debug("[%s] revalidated league=%s gw=%s max_show=%s",
+                     kind, league_id, gw, max_show)
+    except Exception as e:
+        logger.warning("[%s] background rebuild failed for league=%s: %s", kind, league_id, e)
+    finally:
+        release(conn)
+        with _REVALIDATING_LOCK:
+            _REVALIDATING.discard(key)
+
+
+def load_team_blob(cur, team_id: int, gw: int, event_gen: int | None) -> dict | None:
+    """Cached team_player_info for (team_id, gw) if fresh, else None."""
+    cur.execute(
+        "SELECT data, event_gen FROM team_player_info WHERE team_id=? AND gameweek=?", (team_id, gw))
+    row = cur.fetchone()
+    if row and is_fresh(row[1], event_gen):
+        retention.touch("team_player_info", team_id, gw)
+        return codec.decode(row[0], int_keys=True)
+    return None
+
+
+def rebuild_team_blob(conn, team_id: int, gw: int, static_blob: dict, static_data: dict,
+                      event_gen: int | None = None) -> dict:
+    """Recompute team_player_info for (team_id, gw) from live data and store it."""
+    cur = conn.cursor()
+    team_blob = populate_player_info_all_with_live_data(
+        team_id, static_blob, static_data, cur=cur)
+    cur.execute(
+        """INSERT OR REPLACE INTO team_player_info (team_id, gameweek, data, last_fetched, event_gen)
+           VALUES (?, ?, ?, ?, ?)""",
+        (team_id, gw, codec.encode_for("team_player_info", team_blob),
+         datetime.now(timezone.utc).isoformat(), event_gen),
+    )
+    conn.commit()
+    return team_blob
@@ -0,0 +1,139 @@
+# modules/codec.py
+"""
+Encoding of cached blobs stored in SQLite `data` columns.
+
+Rows are either legacy JSON TEXT or binary BLOBs that start with a 5-byte
+header: MAGIC (b"FPC1") + one codec byte. Binary payloads are pickles of
+plain containers (dict/list/tuple/str/int/float/bool/None), so integer keys
+survive a round trip and readers skip the `{int(pid): ...}` re-keying pass.
+They are loaded with a restricted unpickler that refuses any global lookup.
+
+Which encoding a table writes is set in TABLE_CODECS (env override
+FPL_CACHE_CODEC applies to every table). decode() accepts every format, so
+existing JSON rows keep working and are rewritten in the new format the next
+time their cache entry refreshes (or eagerly with migrate_table()).
+"""
+import io
+import json
+import logging
+import os
+import pickle
+import zlib
+
+try:  # optional
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FPC1"
+PICKLE_PROTOCOL = 5
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# codec name -> header byte
+_CODEC_IDS = {"pickle": b"p", "pickle+zlib": b"z", "pickle+zstd": b"s"}
+_CODEC_NAMES = {v: k for k, v in _CODEC_IDS.items()}
+
+TABLE_CODECS = {
+    "static_player_info": "pickle+zlib",
+    "team_player_info": "pickle+zlib",
+    "team_gw_vectors": "pickle",
+    "global_points_cache": "pickle+zlib",
+    "mini_league_summary_cache": "pickle+zlib",
+    "mini_league_breakdown_cache": "pickle+zlib",
+}
+DEFAULT_CODEC = "json"
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    """Plain containers only: any class/function reference is rejected."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(
+            f"cache blobs may not reference {module}.{name}")
+
+
+def codec_for(table: str) -> str:
+    name = os.getenv("FPL_CACHE_CODEC") or TABLE_CODECS.get(table, DEFAULT_CODEC)
+    if name == "pickle+zstd" and zstandard is None:
+        return "pickle+zlib"
+    if name != "json" and name not in _CODEC_IDS:
+        logger.warning("Unknown cache codec %r; using json", name)
+        return "json"
+    return name
+
+
+def encode(obj, codec: str = DEFAULT_CODEC):
+    """Serialise `obj` with `codec`: str for json, bytes for the binary codecs."""
+    if codec == "json":
+        return json.dumps(obj)
+    raw = pickle.dumps(obj, protocol=PICKLE_PROTOCOL)
+    if codec == "pickle+zlib":
+        raw = zlib.compress(raw, ZLIB_LEVEL)
+    elif codec == "pickle+zstd":
+        raw = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return MAGIC + _CODEC_IDS[codec] + raw
+
+
+def encode_for(table: str, obj):
+    return encode(obj, codec_for(table))
+
+
+def is_binary(data) -> bool:
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:4]) == MAGIC
+
+
+def decode(data, *, int_keys: bool = False):
+    """
+    Inverse of encode() for any codec, including legacy JSON TEXT.
+
+    int_keys: re-key the top-level dict to ints — only needed (and only done)
+    for JSON rows; binary rows already carry int keys.
+    """
+    if data is None:
+        return None
+    if not is_binary(data):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode("utf-8")
+        obj = json.loads(data)
+        if int_keys and isinstance(obj, dict):
+            obj = {int(k): v for k, v in obj.items()}
+        return obj
+
+    data = bytes(data)
+    codec = _CODEC_NAMES.get(data[4:5])
+    body = data[5:]
+    if codec == "pickle+zlib":
+        body = zlib.decompress(body)
+    elif codec == "pickle+zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd-encoded cache row but zstandard is not installed")
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif codec != "pickle":
+        raise ValueError(f"unknown cache codec byte {data[4:5]!r}")
+    return _SafeUnpickler(io.BytesIO(body)).load()
+
+
+def migrate_table(conn, table: str, key_columns: tuple[str, ...], *, int_keys: bool = False) -> int:
+    """
+    Re-encode every JSON row of `table` with the table's codec. Returns the
+    number of rows rewritten. Safe to run repeatedly.
+    """
+    codec = codec_for(table)
+    if codec == "json":
+        return 0
+    cols = ", ".join(key_columns)
+    where = " AND ".join(f"{c} = ?" for c in key_columns)
+    rows = conn.execute(f"SELECT {cols}, data FROM {table}").fetchall()
+    n = 0
+    for *keys, data in rows:
+        if is_binary(data):
+            continue
+        obj = decode(data, int_keys=int_keys)
+        conn.execute(f"UPDATE {table} SET data = ? WHERE {where}",
+                     (encode(obj, codec), *keys))
+        n += 1
+    conn.commit()
+    return n
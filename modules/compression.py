@@ -0,0 +1,216 @@
+# modules/compression.py
+"""
+Response compression (brotli/gzip) and precompressed, content-hashed static
+assets.
+
+init_app(app) wires up:
+
+  after_request   compresses text responses (JSON, HTML, CSS, JS) of at
+                  least MIN_BYTES, using the best encoding the client
+                  accepts (br if the brotli package is installed, else
+                  gzip), and adds `Vary: Accept-Encoding`
+  static view     serves .css/.js from an in-memory table of precompressed
+                  variants, built at startup and again whenever a file's
+                  mtime changes
+  url_for         static URLs for those files get `?v=<content hash>`;
+                  a request carrying the current hash is served with
+                  `Cache-Control: public, max-age=1y, immutable`
+
+A compressed response keeps its identity ETag plus "-<encoding>" (a
+different body is a different strong ETag); etag_variants() lists them so
+conditional requests match whichever one the client holds.
+modules/response_cache.py stores compressed bodies next to the identity
+body via encode(), so a cache hit never recompresses.
+
+Tuning (env): FPL_COMPRESS=0 disables, FPL_COMPRESS_MIN_BYTES,
+FPL_GZIP_LEVEL (1-9), FPL_BROTLI_QUALITY (0-11).
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from flask import abort, request
+from werkzeug.security import safe_join
+
+try:  # optional
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("FPL_COMPRESS", "1").lower() not in ("0", "false", "no", "off")
+MIN_BYTES = int(os.getenv("FPL_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("FPL_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("FPL_BROTLI_QUALITY", "5"))
+STATIC_GZIP_LEVEL = 9           # static variants are built once, so compress hard
+STATIC_BROTLI_QUALITY = 11
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json", "text/html", "text/css", "text/plain",
+    "application/javascript", "text/javascript", "image/svg+xml",
+}
+STATIC_EXTENSIONS = (".css", ".js", ".svg")
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_UNVERSIONED_MAX_AGE = 300
+HASH_LENGTH = 12
+
+_STATIC: dict = {}              # path -> asset dict (see _build_asset)
+_STATIC_LOCK = threading.Lock()
+
+
+def encodings() -> tuple:
+    """Supported encodings, preferred first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding) -> str | None:
+    """Best supported encoding for a request's Accept-Encoding, or None."""
+    if not ENABLED:
+        return None
+    for enc in encodings():
+        if accept_encoding[enc] > 0:
+            return enc
+    return None
+
+
+def compress(body: bytes, encoding: str, *, static: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=STATIC_BROTLI_QUALITY if static else BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=STATIC_GZIP_LEVEL if static else GZIP_LEVEL, mtime=0)
+
+
+def encode(body: bytes, variants: dict | None = None) -> tuple[bytes, str | None]:
+    """
+    (body, encoding) for the current request. `variants` (encoding -> bytes)
+    memoises compressed bodies, e.g. on a response cache entry.
+    """
+    enc = negotiate(request.accept_encodings) if len(body) >= MIN_BYTES else None
+    if enc is None:
+        return body, None
+    if variants is None:
+        return compress(body, enc), enc
+    data = variants.get(enc)
+    if data is None:
+        data = variants[enc] = compress(body, enc)
+    return data, enc
+
+
+def etag_variants(etag: str) -> list[str]:
+    return [etag] + [f"{etag}-{enc}" for enc in encodings()]
+
+
+def apply(resp, data: bytes, encoding: str | None, etag: str | None = None):
+    """Put a (possibly compressed) body on `resp` with matching headers."""
+    resp.set_data(data)
+    resp.vary.add("Accept-Encoding")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    if etag:
+        resp.set_etag(f"{etag}-{encoding}" if encoding else etag)
+    return resp
+
+
+# ── Dynamic responses ────────────────────────────────────────────────────────
+
+
+def compress_response(resp):
+    """after_request: compress eligible responses that are not already."""
+    if (not ENABLED or resp.direct_passthrough or resp.status_code != 200
+            or "Content-Encoding" in resp.headers
+            or resp.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return resp
+    body = resp.get_data()
+    data, enc = encode(body)
+    if enc is None:
+        return resp
+    etag, weak = resp.get_etag()
+    apply(resp, data, enc)
+    if etag:
+        resp.set_etag(f"{etag}-{enc}", weak=weak)
+    return resp
+
+
+# ── Static assets ────────────────────────────────────────────────────────────
+
+
+def _build_asset(path: str, mtime: float) -> dict:
+    with open(path, "rb") as f:
+        body = f.read()
+    return {
+        "mtime": mtime,
+        "hash": hashlib.sha1(body).hexdigest()[:HASH_LENGTH],
+        "mimetype": mimetypes.guess_type(path)[0] or "application/octet-stream",
+        "variants": {None: body, **{enc: compress(body, enc, static=True) for enc in encodings()}},
+    }
+
+
+def static_asset(static_folder: str, filename: str) -> dict | None:
+    """
+    The precompressed asset for `filename`, rebuilt if the file changed.
+    None for other files, names that escape `static_folder` and missing files.
+    """
+    if not filename.endswith(STATIC_EXTENSIONS):
+        return None
+    path = safe_join(static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None
+    asset = _STATIC.get(path)
+    if asset is None or asset["mtime"] != mtime:
+        asset = _build_asset(path, mtime)
+        with _STATIC_LOCK:
+            _STATIC[path] = asset
+    return asset
+
+
+def precompress_static(static_folder: str) -> int:
+    """Build every static asset up front; returns how many."""
+    count = 0
+    for root, _dirs, files in os.walk(static_folder):
+        for name in files:
+            filename = os.path.relpath(os.path.join(root, name), static_folder).replace(os.sep, "/")
+            if static_asset(static_folder, filename) is not None:
+                count += 1
+    return count
+
+
+def init_app(app) -> None:
+    static_folder = app.static_folder
+    fallback = app.view_functions["static"]
+
+    def static(filename):
+        if safe_join(static_folder, filename) is None:
+            abort(404)
+        asset = static_asset(static_folder, filename)
+        if asset is None:
+            return fallback(filename=filename)
+        enc = negotiate(request.accept_encodings)
+        resp = app.response_class(mimetype=asset["mimetype"])
+        apply(resp, asset["variants"][enc], enc, asset["hash"])
+        if request.args.get("v") == asset["hash"]:
+            resp.headers["Cache-Control"] = f"public, max-age={STATIC_MAX_AGE}, immutable"
+        else:
+            resp.headers["Cache-Control"] = f"public, max-age={STATIC_UNVERSIONED_MAX_AGE}"
+        return resp.make_conditional(request)
+
+    app.view_functions["static"] = static
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            asset = static_asset(static_folder, values["filename"])
+            if asset is not None:
+                values["v"] = asset["hash"]
+
+    app.after_request(compress_response)
+
+    n = precompress_static(static_folder)
+    logger.info("[compression] %s; %d static assets precompressed",
+                "/".join(encodings()) if ENABLED else "disabled", n)
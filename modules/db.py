@@ -0,0 +1,111 @@
+# modules/db.py
+"""
+SQLite access for the whole app.
+
+Every thread keeps one long-lived connection per database file (reopened
+after a fork), configured with the same PRAGMAs everywhere and a larger
+statement cache so hot queries stay prepared. Callers lease it:
+
+    conn = get_conn()
+    try:
+        ...
+        conn.commit()
+    finally:
+        release(conn)
+
+Leases nest (a helper called with cur=None reuses its caller's connection);
+when the outermost lease is released, any uncommitted transaction is rolled
+back — the same outcome conn.close() used to have — so a connection never
+holds a write lock between uses.
+
+Inside a Flask request get_db() returns the same connection, released
+automatically at teardown (see close_db / init_app).
+"""
+import logging
+import os
+import sqlite3
+import threading
+
+from flask import g, has_app_context
+
+logger = logging.getLogger(__name__)
+
+DATABASE = "page_views.db"
+
+CONNECT_TIMEOUT = 30          # seconds to wait on a locked database
+STATEMENT_CACHE_SIZE = 256    # sqlite3's per-connection prepared statement LRU
+
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", "10000"),   # ms
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-16000"),    # KiB (negative) → ~16 MB page cache
+    ("mmap_size", "134217728"),  # 128 MB
+)
+
+_local = threading.local()
+
+
+def connect(path: str = DATABASE) -> sqlite3.Connection:
+    """A new, fully configured connection (caller owns and closes it)."""
+    conn = sqlite3.connect(
+        path,
+        timeout=CONNECT_TIMEOUT,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value};")
+    return conn
+
+
+def _slots() -> dict:
+    if getattr(_local, "pid", None) != os.getpid():
+        # Fresh thread, or a forked child: never reuse the parent's handles
+        _local.pid = os.getpid()
+        _local.slots = {}
+    return _local.slots
+
+
+def get_conn(path: str = DATABASE) -> sqlite3.Connection:
+    """Lease this thread's connection to `path` (opened on first use)."""
+    slots = _slots()
+    slot = slots.get(path)
+    if slot is None:
+        slot = slots[path] = {"conn": connect(path), "leases": 0}
+    slot["leases"] += 1
+    return slot["conn"]
+
+
+def release(conn: sqlite3.Connection) -> None:
+    """End a lease; the outermost release rolls back anything left uncommitted."""
+    for slot in _slots().values():
+        if slot["conn"] is conn:
+            slot["leases"] = max(0, slot["leases"] - 1)
+            if slot["leases"] == 0 and conn.in_transaction:
+                logger.debug("[db] rolling back uncommitted transaction")
+                conn.rollback()
+            return
+    # Not pooled (e.g. from connect()): behave like before
+    conn.close()
+
+
+def get_db(path: str = DATABASE) -> sqlite3.Connection:
+    """Request-scoped connection: leased once per request, released at teardown."""
+    if not has_app_context():
+        raise RuntimeError("get_db() needs an app context; use get_conn()")
+    conns = g.setdefault("_db_conns", {})
+    conn = conns.get(path)
+    if conn is None:
+        conn = conns[path] = get_conn(path)
+    return conn
+
+
+def close_db(_exc=None) -> None:
+    for conn in g.pop("_db_conns", {}).values():
+        release(conn)
+
+
+def init_app(app) -> None:
+    app.teardown_appcontext(close_db)
@@ -0,0 +1,255 @@
+# modules/event_watch.py
+"""
+One event-status poller for the whole deployment.
+
+Every worker process runs a small daemon thread (start()); whichever holds
+the lease in the event_status row polls /event-status/ every POLL_SECONDS
+(utils.get_event_status, a conditional GET) and publishes the parsed status
+into that row. When the status content changes, `generation` goes up by one
+and last_update is stamped, in the same UPDATE — so every worker sees the
+same change under the same number.
+
+Request handlers call current(): a one-row SELECT, memoised per process for
+READ_TTL_SECONDS. If the row is missing or nobody has refreshed it for
+STALE_AFTER_SECONDS (no watcher yet, FPL_EVENT_WATCH=0), the caller polls
+and publishes itself, as every request used to.
+
+The request caches in GEN_TABLES stamp the generation they were built
+against (event_gen) and are fresh while it is >= the current one
+(cache_builders.is_fresh) — an integer compare, and a rebuild that started
+before a change can no longer look newer than it.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+from modules.db import get_conn, release
+from modules.utils import get_event_status
+
+logger = logging.getLogger(__name__)
+
+DATABASE = "page_views.db"
+
+ENABLED = os.getenv("FPL_EVENT_WATCH", "1").lower() not in ("0", "false", "no", "off")
+POLL_SECONDS = float(os.getenv("FPL_EVENT_POLL", "15"))
+LEASE_SECONDS = 60              # a watcher that stops polling loses it after this
+STALE_AFTER_SECONDS = 90        # then request handlers poll themselves
+READ_TTL_SECONDS = 2.0          # per-process memo of the row
+
+# Caches whose rows carry the generation they were built against
+GEN_TABLES = ("team_player_info", "mini_league_summary_cache", "mini_league_breakdown_cache")
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS event_status (
+    id            INTEGER PRIMARY KEY CHECK (id = 1),
+    generation    INTEGER NOT NULL DEFAULT 0,   -- +1 whenever sig changes
+    gw            INTEGER,
+    is_live       INTEGER NOT NULL DEFAULT 0,
+    updating      INTEGER NOT NULL DEFAULT 0,
+    maintenance   INTEGER NOT NULL DEFAULT 0,
+    message       TEXT,
+    sig           TEXT,                         -- status content the generation is for
+    last_update   TEXT,                         -- ISO, when generation last changed
+    polled_at     REAL,                         -- unix time of the last publish
+    owner         TEXT,                         -- watcher holding the poll lease
+    lease_expires REAL
+);
+INSERT OR IGNORE INTO event_status (id) VALUES (1);
+"""
+
+_SCHEMA_READY = False
+_GEN_COLUMNS_READY: set = set()
+
+_STATE: dict | None = None
+_STATE_AT = 0.0
+_STATE_LOCK = threading.Lock()
+
+_START_LOCK = threading.Lock()
+_THREAD = None
+_THREAD_PID = None
+_STOP = threading.Event()
+
+
+def ensure_gen_columns(cur) -> None:
+    """Add event_gen to every existing GEN_TABLES table that lacks it."""
+    for table in GEN_TABLES:
+        if table in _GEN_COLUMNS_READY:
+            continue
+        cols = {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+        if not cols:
+            continue
+        if "event_gen" not in cols:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN event_gen INTEGER")
+            logger.info("[event_watch] added event_gen to %s", table)
+        _GEN_COLUMNS_READY.add(table)
+    cur.connection.commit()
+
+
+def ensure_schema(cur):
+    global _SCHEMA_READY
+    if not _SCHEMA_READY:
+        cur.executescript(SCHEMA_SQL)
+        ensure_gen_columns(cur)
+        _SCHEMA_READY = True
+
+
+# ── Shared row ───────────────────────────────────────────────────────────────
+
+
+def read(cur) -> dict | None:
+    cur.execute("""
+        SELECT generation, gw, is_live, updating, maintenance, message, sig,
+               last_update, polled_at
+        FROM event_status WHERE id = 1
+    """)
+    row = cur.fetchone()
+    if not row or row[8] is None:
+        return None
+    return {
+        "generation": row[0],
+        "gw": row[1],
+        "is_live": bool(row[2]),
+        "updating": bool(row[3]),
+        "maintenance": bool(row[4]),
+        "message": row[5],
+        "sig": row[6],
+        "last_update": datetime.fromisoformat(row[7]) if row[7] else None,
+        "polled_at": row[8],
+    }
+
+
+def publish(cur, es: dict) -> dict | None:
+    """
+    Write a get_event_status() snapshot to the shared row. A new sig bumps
+    the generation; maintenance snapshots only set the flags/message.
+    """
+    now = time.time()
+    if es.get("maintenance") or not es.get("sig"):
+        cur.execute("""
+            UPDATE event_status
+            SET maintenance = 1, is_live = 0, updating = 1, message = ?, polled_at = ?
+            WHERE id = 1
+        """, (es.get("message"), now))
+    else:
+        # One statement, so concurrent publishers of the same change bump once
+        cur.execute("""
+            UPDATE event_status
+            SET generation  = generation + (sig IS NOT :sig),
+                last_update = CASE WHEN sig IS NOT :sig THEN :now_iso ELSE last_update END,
+                sig = :sig, gw = :gw, is_live = :is_live, updating = :updating,
+                maintenance = 0, message = :message, polled_at = :now
+            WHERE id = 1
+        """, {
+            "sig": es["sig"], "gw": es.get("gw"),
+            "is_live": int(bool(es.get("is_live"))),
+            "updating": int(bool(es.get("updating"))),
+            "message": es.get("message"),
+            "now": now,
+            "now_iso": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+        })
+    cur.connection.commit()
+    return read(cur)
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(cur, owner: str) -> bool:
+    """Take or renew the polling lease; True if `owner` holds it now."""
+    now = time.time()
+    cur.execute("""
+        UPDATE event_status SET owner = ?, lease_expires = ?
+        WHERE id = 1 AND (owner IS NULL OR owner = ? OR lease_expires < ?)
+    """, (owner, now + LEASE_SECONDS, owner, now))
+    held = cur.rowcount == 1
+    cur.connection.commit()
+    return held
+
+
+# ── Readers ──────────────────────────────────────────────────────────────────
+
+
+def current(cur=None) -> dict:
+    """
+    The shared event status: gw, is_live, updating, maintenance, message,
+    last_update, generation. Polls FPL only if no watcher has kept it fresh.
+    """
+    global _STATE, _STATE_AT
+    with _STATE_LOCK:
+        if _STATE is not None and time.monotonic() - _STATE_AT < READ_TTL_SECONDS:
+            return dict(_STATE)
+
+    conn = cur.connection if cur is not None else get_conn(DATABASE)
+    try:
+        c = conn.cursor()
+        ensure_schema(c)
+        state = read(c)
+        if state is None or time.time() - state["polled_at"] > STALE_AFTER_SECONDS:
+            logger.debug("[event_watch] shared status stale → polling in-request")
+            state = publish(c, get_event_status()) or state
+    finally:
+        if cur is None:
+            release(conn)
+
+    if state is None:  # first poll failed before anything was published
+        es = get_event_status()
+        state = {"generation": 0, "gw": es.get("gw"), "is_live": bool(es.get("is_live")),
+                 "updating": bool(es.get("updating")), "maintenance": True,
+                 "message": es.get("message"), "sig": None,
+                 "last_update": es.get("last_update"), "polled_at": None}
+    with _STATE_LOCK:
+        _STATE, _STATE_AT = state, time.monotonic()
+    return dict(state)
+
+
+# ── Watcher thread ───────────────────────────────────────────────────────────
+
+
+def tick(owner: str) -> None:
+    conn = get_conn(DATABASE)
+    try:
+        cur = conn.cursor()
+        ensure_schema(cur)
+        if not acquire_lease(cur, owner):
+            return
+        before = read(cur)
+        state = publish(cur, get_event_status(force=True))
+        if state and (before is None or state["generation"] != before["generation"]):
+            logger.info("[event_watch] gw=%s generation %s → %s", state["gw"],
+                        before and before["generation"], state["generation"])
+    finally:
+        release(conn)
+
+
+def _run() -> None:
+    owner = _owner_id()
+    logger.info("[event_watch] watcher started (%s, every %ss)", owner, POLL_SECONDS)
+    while True:
+        try:
+            tick(owner)
+        except Exception:
+            logger.exception("[event_watch] tick failed")
+        if _STOP.wait(POLL_SECONDS):
+            return
+
+
+def start() -> None:
+    """Start this process's watcher thread once (again after a fork)."""
+    global _THREAD, _THREAD_PID
+    if not ENABLED or (_THREAD is not None and _THREAD_PID == os.getpid()):
+        return
+    with _START_LOCK:
+        if _THREAD is not None and _THREAD_PID == os.getpid():
+            return
+        _STOP.clear()
+        _THREAD = threading.Thread(target=_run, name="event-watch", daemon=True)
+        _THREAD_PID = os.getpid()
+        _THREAD.start()
+
+
+def stop() -> None:
+    _STOP.set()
@@ -1,14 +1,17 @@
 # modules/fetch_all_tables.py
 from datetime import datetime, timezone  # add this import
+import hashlib
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from modules.http_client import HTTP
+import pickle
+from modules import codec, retention
+from modules.db import get_conn, release
+from modules.live_cache import get_live_gameweeks
+from modules.picks_cache import get_picks_many, multipliers_by_gw
 
 logger = logging.getLogger(__name__)
 
-# Local request tuning (avoid importing from utils to prevent circular import)
-REQ_TIMEOUT = 10
-MAX_WORKERS = 8
+FPL_API = "https://fantasy.premierleague.com/api"
+DATABASE = "page_views.db"
 
 # === Mapping from FPL "explain" identifiers to your *_points keys ===
 EXPLAIN_TO_FIELD = {
@@ -239,29 +242,206 @@ def build_player_info(static_data, fixtures_cache: dict | None = None, fixtures_
     return player_info
 
 
-def add_explain_points(pi: dict, explain_blocks, suffix: str = "", mult: int = 1):
+# === Team aggregation specs ===
+# (team field, live column, which picks it sums over). A field may appear more
+# than once (e.g. goals_assists_team = goals + assists). Column None counts
+# the pick instead of summing a stat.
+#   start    → multiplier > 0          bench   → multiplier == 0
+#   played   → started with minutes>0  captain → multiplier >= 2
+#   armband  → weighted by multiplier - 1 (the captain's extra share)
+TEAM_SUM_SPECS = (
+    ("appearances_team", None, "played"),
+    ("assists_team", "assists", "start"),
+    ("bonus_team", "bonus", "start"),
+    ("bps_team", "bps", "start"),
+    ("cbi_team", "clearances_blocks_interceptions", "start"),
+    ("clean_sheets_team", "clean_sheets", "start"),
+    ("defensive_contribution_team", "defensive_contribution", "start"),
+    ("expected_assists_team", "expected_assists", "start"),
+    ("expected_goals_team", "expected_goals", "start"),
+    ("expected_goals_conceded_team", "expected_goals_conceded", "start"),
+    ("expected_goal_involvements_team", "expected_goals", "start"),
+    ("expected_goal_involvements_team", "expected_assists", "start"),
+    ("goals_conceded_team", "goals_conceded", "start"),
+    ("goals_scored_team", "goals_scored", "start"),
+    ("goals_assists_team", "goals_scored", "start"),
+    ("goals_assists_team", "assists", "start"),
+    ("minutes_team", "minutes", "start"),
+    ("own_goals_team", "own_goals", "start"),
+    ("penalties_missed_team", "penalties_missed", "start"),
+    ("penalties_saved_team", "penalties_saved", "start"),
+    ("red_cards_team", "red_cards", "start"),
+    ("recoveries_team", "recoveries", "start"),
+    ("starts_team", "starts", "start"),
+    ("tackles_team", "tackles", "start"),
+    ("yellow_cards_team", "yellow_cards", "start"),
+    ("dreamteam_count_team", "in_dreamteam", "start"),
+    ("total_points_team", "total_points", "start"),
+    ("total_points_team", "total_points", "captain"),
+    ("captained_team", None, "captain"),
+    ("goals_captained_team", "goals_scored", "captain"),
+    ("assists_captained_team", "assists", "captain"),
+    ("captain_points_team", "total_points", "armband"),
+    ("goals_benched_team", "goals_scored", "bench"),
+    ("assists_benched_team", "assists", "bench"),
+    ("starts_benched_team", "starts", "bench"),
+    ("minutes_benched_team", "minutes", "bench"),
+    ("benched_points_team", "total_points", "bench"),
+    ("_started", None, "start"),
+)
+
+# Integer slots of a per-player team vector: summed fields, then explain points.
+TEAM_VECTOR_FIELDS = tuple(dict.fromkeys(
+    [f for f, _c, _k in TEAM_SUM_SPECS] + list(TEAM_POINTS_KEYS)))
+_SLOT = {f: i for i, f in enumerate(TEAM_VECTOR_FIELDS)}
+# Explain points come from the live *_points columns (starters, no captain boost)
+_SPEC_SLOTS = tuple((_SLOT[f], c, k) for f, c, k in TEAM_SUM_SPECS) + tuple(
+    (_SLOT[f"{dst}_team"], dst, "start") for dst in GLOBAL_POINTS_KEYS)
+
+# Persisted vectors are only reused while the slot layout is unchanged
+TEAM_VECTOR_LAYOUT = hashlib.sha1(
+    ",".join(TEAM_VECTOR_FIELDS).encode()).hexdigest()[:12]
+
+# Per-team, per-GW partial aggregates (finished GWs are never recomputed)
+TEAM_GW_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS team_gw_vectors (
+    team_id      INTEGER NOT NULL,
+    gameweek     INTEGER NOT NULL,
+    layout       TEXT NOT NULL,
+    finished     INTEGER NOT NULL DEFAULT 0,
+    data         TEXT NOT NULL,
+    last_fetched TEXT NOT NULL,
+    PRIMARY KEY (team_id, gameweek)
+);
+CREATE INDEX IF NOT EXISTS idx_team_gw_vectors_last_fetched ON team_gw_vectors(last_fetched);
+"""
+
+# Live columns stored in hundredths (see live_cache.SCALED_COLUMNS)
+TEAM_SCALED_FIELDS = {
+    "expected_assists_team": 100,
+    "expected_goals_team": 100,
+    "expected_goals_conceded_team": 100,
+    "expected_goal_involvements_team": 100,
+}
+
+
+def team_gw_vectors(live_gw, multipliers: dict[int, int]) -> dict[int, list[int]]:
     """
-    Sum points from 'explain' into pi[<metric>_points{suffix}],
-    e.g. suffix="_team" for team aggregates. 'mult' is almost always 1 here.
+    One GW of team aggregation: {pid: integer vector over TEAM_VECTOR_FIELDS}.
+
+    The GW's live columns (element × stat) are combined with the pick
+    weights (element × kind) one spec at a time, touching only picked
+    elements. Vectors are additive across GWs.
     """
-    for block in (explain_blocks or []):
-        for s in block.get("stats", []) or []:
-            ident = s.get("identifier")
-            dst = EXPLAIN_TO_FIELD.get(ident)
-            if not dst:
+    # Every pick gets a vector (zeros if absent from live) so the set of
+    # owned players can be rebuilt from stored vectors alone.
+    vectors = {pid: [0] * len(TEAM_VECTOR_FIELDS) for pid in multipliers}
+    picked = [pid for pid in multipliers if pid in live_gw]
+    if not picked:
+        return vectors
+    minutes = live_gw.columns["minutes"]
+    weights = {
+        "start": [(pid, 1) for pid in picked if multipliers[pid] > 0],
+        "bench": [(pid, 1) for pid in picked if multipliers[pid] == 0],
+        "captain": [(pid, 1) for pid in picked if multipliers[pid] >= 2],
+        "armband": [(pid, multipliers[pid] - 1) for pid in picked if multipliers[pid] >= 2],
+    }
+    weights["played"] = [(pid, 1)
+                         for pid, _w in weights["start"] if minutes[pid] > 0]
+
+    for slot, column, kind in _SPEC_SLOTS:
+        col = live_gw.columns[column] if column else None
+        for pid, w in weights[kind]:
+            vectors[pid][slot] += (col[pid] * w) if col is not None else w
+    return vectors
+
+
+def fold_team_vectors(per_gw) -> dict[int, list[int]]:
+    """Sum {pid: vector} maps from several GWs."""
+    totals: dict[int, list[int]] = {}
+    for vectors in per_gw:
+        for pid, vec in vectors.items():
+            acc = totals.get(pid)
+            if acc is None:
+                totals[pid] = list(vec)
+            else:
+                totals[pid] = [a + b for a, b in zip(acc, vec)]
+    return totals
+
+
+def apply_team_vectors(team_info: dict, totals: dict[int, list[int]]) -> None:
+    """Write folded vectors into team_info rows, plus the fields derived from them."""
+    for pid, vec in totals.items():
+        ti = team_info.get(pid)
+        if ti is None:
+            continue
+        started = vec[_SLOT["_started"]] > 0
+        for i, field in enumerate(TEAM_VECTOR_FIELDS):
+            if field == "_started":
                 continue
-            key = f"{dst}{suffix}"
-            try:
-                pts = int(s.get("points", 0))
-            except (TypeError, ValueError):
-                pts = 0
-            pi[key] = pi.get(key, 0) + pts * mult
+            scale = TEAM_SCALED_FIELDS.get(field)
+            if scale:
+                # only starters accumulate xG-style floats
+                ti[field] = vec[i] / scale if started else 0
+            else:
+                ti[field] = vec[i]
+
+        if started:
+            ti['goals_performance_team'] = round(
+                ti['goals_scored_team'] - ti['expected_goals_team'], 2)
+            ti['assists_performance_team'] = round(
+                ti['assists_team'] - ti['expected_assists_team'], 2)
+            ti['goals_assists_performance_team'] = round(
+                ti['goals_assists_team'] -
+                ti['expected_goal_involvements_team'], 2
+            )
+            cost = ti.get('now_cost', 0)
+            if cost:
+                ti['ppm_team'] = round(
+                    ti['total_points_team'] / (cost / 10), 1)
+
+
+def ensure_team_gw_schema(cur):
+    cur.executescript(TEAM_GW_SCHEMA_SQL)
+
+
+def load_team_gw_vectors(cur, team_id: int, max_gw: int) -> dict[int, dict[int, list[int]]]:
+    """Stored {gw: {pid: vector}} for finished GWs <= max_gw with the current layout."""
+    rows = cur.execute(
+        "SELECT gameweek, data FROM team_gw_vectors "
+        "WHERE team_id = ? AND gameweek <= ? AND finished = 1 AND layout = ?",
+        (team_id, max_gw, TEAM_VECTOR_LAYOUT),
+    ).fetchall()
+    if rows:
+        retention.touch("team_gw_vectors", team_id)
+    out = {}
+    for gw, data in rows:
+        try:
+            out[gw] = codec.decode(data, int_keys=True)
+        except (TypeError, ValueError, pickle.UnpicklingError):
+            continue
+    return out
 
 
-def populate_player_info_all_with_live_data(team_id, player_info, static_data):
-    logger.debug("[populate_player_info_all_with_live_data] called")
+def save_team_gw_vectors(cur, team_id: int, gw: int, vectors: dict, finished: bool):
+    cur.execute(
+        "INSERT OR REPLACE INTO team_gw_vectors (team_id, gameweek, layout, finished, data, last_fetched) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (team_id, gw, TEAM_VECTOR_LAYOUT, int(finished),
+         codec.encode_for("team_gw_vectors", vectors),
+         datetime.now(timezone.utc).isoformat()),
+    )
+
+
+def populate_player_info_all_with_live_data(team_id, player_info, static_data, cur=None):
+    """
+    Build the team-specific (*_team) rows for every player the team has owned.
 
-    FPL_API = "https://fantasy.premierleague.com/api"
+    Per-GW partial aggregates are persisted in team_gw_vectors; finished GWs
+    are loaded from there, so a refresh only fetches picks/live for the GWs
+    that are missing (normally just the current one) and folds them in.
+    """
+    logger.debug("[populate_player_info_all_with_live_data] called")
 
     # 1) Current GW
     try:
@@ -271,49 +451,52 @@ def populate_player_info_all_with_live_data(team_id, player_info, static_data):
         logger.error("No current gameweek found in static_data.events")
         return {}
 
-    # 2) URLs
-    live_urls = {
-        gw: f"{FPL_API}/event/{gw}/live/" for gw in range(1, current_gw + 1)}
-    pick_urls = {
-        gw: f"{FPL_API}/entry/{team_id}/event/{gw}/picks/" for gw in range(1, current_gw + 1)}
-
-    # 3) Fetch concurrently
-    live_data_map, picks_data_map = {}, {}
-    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, current_gw)) as executor:
-        future_to_info = {}
-        for gw, url in live_urls.items():
-            future_to_info[executor.submit(
-                HTTP.get, url, timeout=REQ_TIMEOUT)] = ('live', gw)
-        for gw, url in pick_urls.items():
-            future_to_info[executor.submit(
-                HTTP.get, url, timeout=REQ_TIMEOUT)] = ('picks', gw)
-
-        for fut in as_completed(future_to_info):
-            kind, gw = future_to_info[fut]
-            try:
-                r = fut.result()
-                r.raise_for_status()
-                data = r.json()
-            except Exception as e:
-                logger.warning(f"Failed fetch {kind} for GW {gw}: {e}")
-                continue
-            if kind == 'live':
-                live_data_map[gw] = data.get('elements', [])
-            else:
-                picks = data.get('picks', [])
-                picks_data_map[gw] = {p['element']: p.get(
-                    'multiplier', 1) for p in picks}
+    local_conn = None
+    if cur is None:
+        local_conn = get_conn(DATABASE)
+        cur = local_conn.cursor()
 
-    logger.debug(f"Fetched live_data for GWs: {sorted(live_data_map.keys())}")
-    logger.debug(f"Fetched pick_data for GWs: {sorted(picks_data_map.keys())}")
-
-    # 4) DO NOT reset GLOBAL *_points; utils.fill_global_points_from_explain has populated those.
-    #    We'll compute only *_points_team here.
-
-    # 5) Only players ever picked
+    try:
+        ensure_team_gw_schema(cur)
+
+        # 2) Frozen GWs from storage; everything else is (re)computed
+        vectors_by_gw = load_team_gw_vectors(cur, team_id, current_gw - 1)
+        todo = [gw for gw in range(1, current_gw + 1)
+                if gw not in vectors_by_gw]
+
+        # 3) Live data and picks come from their shared caches
+        live_data_map = get_live_gameweeks(
+            cur, todo, FPL_API, current_gw=current_gw)
+        picks = get_picks_many(cur, [team_id], todo, current_gw=current_gw)
+        picks_data_map = multipliers_by_gw(picks, team_id)
+
+        logger.debug("Reused stored vectors for GWs: %s",
+                     sorted(vectors_by_gw.keys()))
+        logger.debug(
+            f"Fetched live_data for GWs: {sorted(live_data_map.keys())}")
+        logger.debug(
+            f"Fetched pick_data for GWs: {sorted(picks_data_map.keys())}")
+
+        # 4) Compute the missing GWs (column gathers over picked elements) and persist them
+        for gw in todo:
+            live_gw = live_data_map.get(gw)
+            if live_gw is None or gw not in picks_data_map:
+                continue
+            vectors_by_gw[gw] = team_gw_vectors(live_gw, picks_data_map[gw])
+            # Stale live data or picks (failed refetch) must not be frozen
+            save_team_gw_vectors(cur, team_id, gw, vectors_by_gw[gw],
+                                 finished=gw < current_gw and live_gw.finished
+                                 and (team_id, gw) not in picks.unfinished)
+        cur.connection.commit()
+    finally:
+        if local_conn is not None:
+            release(local_conn)
+
+    # 5) DO NOT reset GLOBAL *_points; utils.fill_global_points_from_explain has populated those.
+    #    We'll compute only *_points_team here, for players ever picked.
     all_picked_pids = set()
-    for picks in picks_data_map.values():
-        all_picked_pids.update(picks.keys())
+    for vectors in vectors_by_gw.values():
+        all_picked_pids.update(vectors.keys())
 
     # 6) Build team_info copies and zero *_team fields
     team_info = {}
@@ -345,124 +528,9 @@ def populate_player_info_all_with_live_data(team_id, player_info, static_data):
 
         team_info[pid] = ti
 
-    # 7) Compute per GW
-    for gw in range(1, current_gw + 1):
-        live_elements = live_data_map.get(gw, [])
-        multipliers = picks_data_map.get(gw, {})
-
-        # de-dup for GLOBAL pass across this GW (we won't update GLOBAL here,
-        # but we reuse dedup for team points)
-        seen_global = set()  # (pid, fixture_id, identifier)
-
-        for element in live_elements:
-            pid = element.get('id')
-            base = player_info.get(pid)  # global (non-team)
-            if not base:
-                continue
-
-            stats = element.get('stats', {}) or {}
-            explain = element.get('explain', []) or []
-
-            # ---- Build deduped blocks (per fixture + identifier) ----
-            dedup_blocks = []
-            for block in explain:
-                fx = block.get("fixture")
-                kept = []
-                for s in block.get("stats", []) or []:
-                    ident = s.get("identifier")
-                    sig = (pid, fx, ident)
-                    if sig in seen_global:
-                        continue
-                    seen_global.add(sig)
-                    kept.append(s)
-                if kept:
-                    dedup_blocks.append({"fixture": fx, "stats": kept})
-
-            # ---- Do NOT modify global *_points here (already computed once).
-            # add_explain_points(base, dedup_blocks, suffix="", mult=1)
-
-            # ---- TEAM (only if picked this GW) ----
-            if pid not in multipliers or pid not in team_info:
-                continue
-
-            mult = multipliers[pid]
-            ti = team_info[pid]
-
-            # bench
-            if mult == 0:
-                ti['goals_benched_team'] += stats.get('goals_scored', 0)
-                ti['assists_benched_team'] += stats.get('assists', 0)
-                ti['starts_benched_team'] += stats.get('starts', 0)
-                ti['minutes_benched_team'] += stats.get('minutes', 0)
-                ti['benched_points_team'] += stats.get('total_points', 0)
-
-            # starter / (triple) captain
-            if mult > 0:
-                mins = stats.get('minutes', 0)
-                if mins > 0:
-                    ti['appearances_team'] += 1
-
-                # Aggregate team stats
-                ti['assists_team'] += stats.get('assists', 0)
-                ti['bonus_team'] += stats.get('bonus', 0)
-                ti['bps_team'] += stats.get('bps', 0)
-                ti['cbi_team'] += stats.get(
-                    'clearances_blocks_interceptions', 0)
-                ti['clean_sheets_team'] += stats.get('clean_sheets', 0)
-                ti['defensive_contribution_team'] += stats.get(
-                    'defensive_contribution', 0)
-
-                xa = float(stats.get('expected_assists', 0))
-                xg = float(stats.get('expected_goals', 0))
-                xgc = float(stats.get('expected_goals_conceded', 0))
-                ti['expected_assists_team'] += xa
-                ti['expected_goals_team'] += xg
-                ti['expected_goals_conceded_team'] += xgc
-                ti['expected_goal_involvements_team'] += (xg + xa)
-
-                ti['goals_conceded_team'] += stats.get('goals_conceded', 0)
-                goals = stats.get('goals_scored', 0)
-                ti['goals_scored_team'] += goals
-                ti['goals_assists_team'] += (goals + stats.get('assists', 0))
-                ti['minutes_team'] += mins
-                ti['own_goals_team'] += stats.get('own_goals', 0)
-                ti['penalties_missed_team'] += stats.get('penalties_missed', 0)
-                ti['penalties_saved_team'] += stats.get('penalties_saved', 0)
-                ti['red_cards_team'] += stats.get('red_cards', 0)
-                ti['recoveries_team'] += stats.get('recoveries', 0)
-                ti['starts_team'] += stats.get('starts', 0)
-                ti['tackles_team'] += stats.get('tackles', 0)
-                ti['yellow_cards_team'] += stats.get('yellow_cards', 0)
-                if stats.get('in_dreamteam', False):
-                    ti['dreamteam_count_team'] += 1
-
-                ti['goals_performance_team'] = round(
-                    ti['goals_scored_team'] - ti['expected_goals_team'], 2)
-                ti['assists_performance_team'] = round(
-                    ti['assists_team'] - ti['expected_assists_team'], 2)
-                ti['goals_assists_performance_team'] = round(
-                    ti['goals_assists_team'] -
-                    ti['expected_goal_involvements_team'], 2
-                )
-                ti['total_points_team'] += stats.get('total_points', 0)
-
-                # Captain (extra over x1)
-                if mult in (2, 3):
-                    ti['captained_team'] += 1
-                    ti['goals_captained_team'] += goals
-                    ti['assists_captained_team'] += stats.get('assists', 0)
-                    base_points = stats.get('total_points', 0)
-                    ti['captain_points_team'] += base_points * (mult - 1)
-                    ti['total_points_team'] += stats.get('total_points', 0)
-
-                # ✅ Team points via explain (no captain boost), using deduped blocks
-                add_explain_points(ti, dedup_blocks, suffix="_team", mult=1)
-
-                # PPM
-                cost = ti.get('now_cost', 0)
-                if cost:
-                    ti['ppm_team'] = round(
-                        ti['total_points_team'] / (cost / 10), 1)
+    # 7) Fold the per-GW vectors into season totals
+    apply_team_vectors(team_info, fold_team_vectors(
+        vectors_by_gw[gw] for gw in sorted(vectors_by_gw)))
 
     # 8) Post-process TEAM rates after aggregation
     for ti in team_info.values():
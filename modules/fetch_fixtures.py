@@ -1,11 +1,16 @@
 # modules/fetch_fixtures.py
 import sys
-import sqlite3
 from datetime import datetime, timezone
 from pathlib import Path
 import argparse
 import requests
 
+try:
+    from modules.db import connect, get_conn, release
+except ImportError:  # run directly as `python modules/fetch_fixtures.py`
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    from modules.db import connect, get_conn, release
+
 # Default DB path: one level up from /modules
 DEFAULT_DB = str((Path(__file__).resolve().parents[1] / "page_views.db"))
 
@@ -52,9 +57,10 @@ def fetch_and_cache_fixtures(*, future=True, event=None, database=DEFAULT_DB, ve
 
     now_utc = datetime.now(timezone.utc).isoformat(timespec="seconds")
 
-    conn = sqlite3.connect(database, check_same_thread=False)
+    # Own connection: this runs an explicit BEGIN, so it must not share the
+    # thread's pooled connection with a caller mid-transaction
+    conn = connect(database)
     cur = conn.cursor()
-    cur.execute("PRAGMA busy_timeout=10000")
 
     # Ensure table/indexes exist
     ensure_schema(cur)
@@ -124,9 +130,8 @@ def ensure_fixtures_for_gw(from_event: int | None, *, database=DEFAULT_DB, verbo
 
     If from_event is None or <1 (pre-season), we just require any unfinished row.
     """
-    conn = sqlite3.connect(database, check_same_thread=False)
+    conn = get_conn(database)
     cur = conn.cursor()
-    cur.execute("PRAGMA busy_timeout=10000")
     ensure_schema(cur)
 
     if from_event and from_event >= 1:
@@ -145,7 +150,7 @@ def ensure_fixtures_for_gw(from_event: int | None, *, database=DEFAULT_DB, verbo
         """)
 
     have_upcoming = cur.fetchone() is not None
-    conn.close()
+    release(conn)
 
     if have_upcoming:
         if verbose:
@@ -1,11 +1,14 @@
 from flask import url_for
 import json
 from datetime import datetime, timezone
-from modules.utils import get_event_status_last_update, territory_icon, get_json_cached
+from modules.utils import get_event_status_last_update, territory_icon, get_json_cached, get_current_gw, get_bootstrap
 from modules.utils import (territory_icon)
+from modules import retention
+from modules.db import get_conn, release
 from modules.http_client import HTTP
+from modules.live_cache import get_live_points_map
+from modules.picks_cache import get_entry_picks
 import logging
-import sqlite3
 import time
 
 
@@ -53,7 +56,7 @@ def get_manager_data(team_id):
     Fetch manager data and cache it as a single JSON blob in SQLite.
     Returns the cached data if it's already up-to-date based on event-status.
     """
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = get_conn(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS managers (
@@ -73,7 +76,8 @@ def get_manager_data(team_id):
         cached_time = datetime.fromisoformat(last_fetched)
         event_updated = get_event_status_last_update()
         if cached_time >= event_updated:
-            conn.close()
+            release(conn)
+            retention.touch("managers", team_id)
             return json.loads(data_json)
 
     # 2️⃣ Cache miss or stale → fetch from API
@@ -108,7 +112,7 @@ def get_manager_data(team_id):
         api_data = resp.json()
     except ValueError:
         logger.error("Still not JSON for team_id=%s, giving up", team_id)
-        conn.close()
+        release(conn)
         return None
 
     # extract the bits we care about
@@ -144,7 +148,7 @@ def get_manager_data(team_id):
         datetime.now(timezone.utc).isoformat()
     ))
     conn.commit()
-    conn.close()
+    release(conn)
 
     return manager
 
@@ -310,10 +314,9 @@ def get_manager_history(team_id):
                 chips_state["wildcard_2"]["used"] = True
                 chips_state["wildcard_2"]["gw"] = event
 
-    # Fetch bootstrap static data once for use in photo/name lookups
-    bootstrap_url = "https://fantasy.premierleague.com/api/bootstrap-static/"
-    bootstrap_response = HTTP.get(bootstrap_url, timeout=TIMEOUT_MED)
-    bootstrap_data = bootstrap_response.json()
+    # Process-wide bootstrap (parsed + indexed once) for photo/name lookups
+    elements_by_id = get_bootstrap().elements_by_id
+    current_gw = get_current_gw()
 
     # -----------------------------
     # Enrich Triple Captain chips
@@ -323,46 +326,39 @@ def get_manager_history(team_id):
         if chips_state[chip_key]["used"] and chips_state[chip_key]["gw"]:
             event_number = chips_state[chip_key]["gw"]
 
-            # Fetch picks for the event.
-            picks_url = f"{FPL_API_BASE}/entry/{team_id}/event/{event_number}/picks/"
-            picks_response = HTTP.get(picks_url, timeout=TIMEOUT_SHORT)
-            picks_data = picks_response.json()
+            # Picks for the event (cached for good once the GW is over).
+            picks = get_entry_picks(
+                None, team_id, event_number, current_gw=current_gw)
 
             # Find the captain's pick.
             captain_element = None
-            for pick in picks_data.get("picks", []):
+            for pick in picks:
                 if pick.get("is_captain"):
                     captain_element = pick.get("element")
                     break
 
             if captain_element is not None:
-                # Fetch live data for the event.
-                live_url = f"{FPL_API_BASE}/event/{event_number}/live/"
-                live_response = HTTP.get(live_url, timeout=TIMEOUT_SHORT)
-                live_data = live_response.json()
-
-                for element in live_data.get("elements", []):
-                    if element.get("id") == captain_element:
-                        stats = element.get("stats", {})
-                        chips_state[chip_key]["total_points"] = stats.get(
-                            "total_points", 0)
-                        # Retrieve the captain's photo/name from bootstrap data.
-                        for player in bootstrap_data.get("elements", []):
-                            if player.get("id") == captain_element:
-                                chips_state[chip_key]['web_name'] = player.get(
-                                    "web_name")
-                                chips_state[chip_key]["team_code"] = player.get(
-                                    "team_code")
-                                photo = player.get("photo", "")
-                                if photo:
-                                    # if not photo.startswith("p"):
-                                    #     photo = "p" + photo
-                                    chips_state[chip_key]["photo"] = photo.replace(
-                                        ".jpg", "")
-                                else:
-                                    chips_state[chip_key]["photo"] = DEFAULT_PHOTO
-                                break
-                        break
+                # Live data for the event (shared per-GW store).
+                live_points = get_live_points_map(
+                    None, event_number, FPL_API_BASE, current_gw=current_gw, columns=("total_points",))
+
+                if captain_element in live_points:
+                    chips_state[chip_key]["total_points"] = live_points[captain_element]["total_points"]
+                    # Retrieve the captain's photo/name from bootstrap data.
+                    player = elements_by_id.get(captain_element)
+                    if player is not None:
+                        chips_state[chip_key]['web_name'] = player.get(
+                            "web_name")
+                        chips_state[chip_key]["team_code"] = player.get(
+                            "team_code")
+                        photo = player.get("photo", "")
+                        if photo:
+                            # if not photo.startswith("p"):
+                            #     photo = "p" + photo
+                            chips_state[chip_key]["photo"] = photo.replace(
+                                ".jpg", "")
+                        else:
+                            chips_state[chip_key]["photo"] = DEFAULT_PHOTO
 
     # -----------------------------
     # Enrich Bench Boost chips
@@ -372,48 +368,39 @@ def get_manager_history(team_id):
         if chips_state[chip_key]["used"] and chips_state[chip_key]["gw"]:
             event_number = chips_state[chip_key]["gw"]
 
-            # Fetch picks for the bench boost event.
-            picks_url = f"{FPL_API_BASE}/entry/{team_id}/event/{event_number}/picks/"
-            picks_response = HTTP.get(picks_url, timeout=TIMEOUT_MED)
-            picks_data = picks_response.json()
+            # Picks for the bench boost event (shared picks cache).
+            picks = get_entry_picks(
+                None, team_id, event_number, current_gw=current_gw)
 
             # Get the four bench players based on their positions (12, 13, 14, 15).
             bench_players = [
-                pick for pick in picks_data.get("picks", [])
+                pick for pick in picks
                 if pick.get("position") in [12, 13, 14, 15]
             ]
             bench_players = sorted(
                 bench_players, key=lambda p: p.get("position"))
 
-            # Fetch live data for the event.
-            live_url = f"{FPL_API_BASE}/event/{event_number}/live/"
-            live_response = HTTP.get(live_url, timeout=TIMEOUT_MED)
-            live_data = live_response.json()
-
-            # Create a mapping of element IDs to their total points.
-            live_points = {
-                element.get("id"): element.get("stats", {}).get("total_points", 0)
-                for element in live_data.get("elements", [])
-            }
+            # Element id -> {"total_points": n} from the shared per-GW store.
+            live_points = get_live_points_map(
+                None, event_number, FPL_API_BASE, current_gw=current_gw, columns=("total_points",))
 
             # Update bench boost players info.
             for idx, bench_pick in enumerate(bench_players[:4]):
                 element_id = bench_pick.get("element")
-                points = live_points.get(element_id, 0)
+                points = live_points.get(element_id, {}).get("total_points", 0)
                 photo = DEFAULT_PHOTO
                 web_name = ""
                 team_code = None
 
-                for player in bootstrap_data.get("elements", []):
-                    if player.get("id") == element_id:
-                        candidate = player.get("photo", "")
-                        if candidate:
-                            # if not candidate.startswith("p"):
-                            #     candidate = "p" + candidate
-                            photo = candidate.replace(".jpg", "")
-                        web_name = player.get("web_name", "")
-                        team_code = player.get("team_code", "")
-                        break
+                player = elements_by_id.get(element_id)
+                if player is not None:
+                    candidate = player.get("photo", "")
+                    if candidate:
+                        # if not candidate.startswith("p"):
+                        #     candidate = "p" + candidate
+                        photo = candidate.replace(".jpg", "")
+                    web_name = player.get("web_name", "")
+                    team_code = player.get("team_code", "")
 
                 chips_state[chip_key]["players"][idx]["total_points"] = points
                 chips_state[chip_key]["players"][idx]["photo"] = photo
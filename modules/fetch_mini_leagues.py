@@ -1,13 +1,16 @@
 import sqlite3
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 from flask import url_for
 
 # use the pooled session from http_client
 from modules.utils import ordinalformat, get_static_data
+from modules.async_fetch import fetch_json_many
+from modules.bootstrap_cache import indexes_for
+from modules.db import get_conn, release
 from modules.live_cache import get_live_points_map
+from modules.picks_cache import get_entry_picks, get_picks_many, multipliers_by_gw
 from modules.http_client import HTTP
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,9 @@ SPECIAL_FLAGS = {
 
 DATABASE = "page_views.db"  # adjust path as needed
 
+# Only columns build_manager reads from the live map
+LIVE_POINTS_COLUMNS = ("minutes", "total_points")
+
 
 def get_live_points(event_id: int, cur: sqlite3.Cursor | None = None) -> dict[int, dict]:
     """
@@ -32,12 +38,12 @@ def get_live_points(event_id: int, cur: sqlite3.Cursor | None = None) -> dict[in
     local_conn = None
     try:
         if cur is None:
-            local_conn = sqlite3.connect(DATABASE, check_same_thread=False)
+            local_conn = get_conn(DATABASE)
             cur = local_conn.cursor()
-        return get_live_points_map(cur, event_id, FPL_API)
+        return get_live_points_map(cur, event_id, FPL_API, columns=LIVE_POINTS_COLUMNS)
     finally:
         if local_conn is not None:
-            local_conn.close()
+            release(local_conn)
 
 
 def get_entry_history(entry_id: int) -> dict:
@@ -165,14 +171,12 @@ def build_manager(
     if static_data is None:
         static_data = get_static_data(
             current_gw=-1, include_global_points=False) or {}
-    elements = static_data.get("elements", [])
-    teams = static_data.get("teams", [])
-    events = static_data.get("events", [])
-    player_data_by_id = {e["id"]: e for e in elements}
-    team_id_to_name = {t["id"]: t["name"] for t in teams}
-    current_gw = next((e["id"] for e in events if e.get("is_current")), None)
-    gw_finished = next((e.get("finished")
-                       for e in events if e.get("id") == current_gw), False)
+    # Shared per-process indexes (no per-manager dict rebuilds)
+    boot = indexes_for(static_data)
+    player_data_by_id = boot.elements_by_id
+    team_id_to_name = boot.team_name_by_id
+    current_gw = boot.current_gw
+    gw_finished = bool(boot.current_event and boot.current_event.get("finished"))
 
     # --- current GW points UX nicety ---
     current_SEP = int(me.get("summary_event_points") or 0)
@@ -198,7 +202,7 @@ def build_manager(
         "captain_current_pending": False,
     })
     if current_gw:
-        picks = get_picks(base["entry"], current_gw)
+        picks = get_picks(base["entry"], current_gw, cur, current_gw=current_gw)
         armband = next((p for p in picks if int(
             p.get("multiplier", 1) or 1) > 1), None)
         if armband is None:
@@ -296,7 +300,7 @@ def get_team_ids_from_league(
     # 2) One-time live map (current GW only)
     local_conn = None
     if cur is None:
-        local_conn = sqlite3.connect(DATABASE, check_same_thread=False)
+        local_conn = get_conn(DATABASE)
         cur = local_conn.cursor()
     if live_points_by_element is None and current_gw:
         live_points_by_element = get_live_points(current_gw, cur)
@@ -309,34 +313,31 @@ def get_team_ids_from_league(
 
     managers: list[dict] = []
     try:
-        with ThreadPoolExecutor(max_workers=min(8, len(standings))) as executor:
-            future_to_entry = {
-                executor.submit(HTTP.get, f"{FPL_API}/entry/{m['entry']}/", timeout=10): m
-                for m in standings
-            }
-            for fut in as_completed(future_to_entry):
-                m = future_to_entry[fut]
-                try:
-                    r = fut.result()
-                    r.raise_for_status()
-                    me = r.json()
-                except Exception as e:
-                    logger.warning(
-                        "Entry fetch failed for %s: %s", m.get("entry"), e)
-                    continue
-                managers.append(
-                    build_manager(
-                        me,
-                        league_entry=m,
-                        cur=cur,
-                        static_data=static_data,
-                        live_points_by_element=live_points_by_element,
-                        skip_history=skip_history,  # True for summary table if you don’t show those cols
-                    )
+        # One batch on the shared fetch loop for all entries, and one for the
+        # current-GW picks that build_manager() reads back from the cache
+        entry_urls = {m["entry"]: f"{FPL_API}/entry/{m['entry']}/" for m in standings}
+        entries = fetch_json_many(entry_urls.values(), timeout=10)
+        if current_gw:
+            get_picks_many(cur, list(entry_urls), [current_gw], current_gw=current_gw)
+
+        for m in standings:
+            me = entries.get(entry_urls[m["entry"]])
+            if me is None:
+                logger.warning("Entry fetch failed for %s", m.get("entry"))
+                continue
+            managers.append(
+                build_manager(
+                    me,
+                    league_entry=m,
+                    cur=cur,
+                    static_data=static_data,
+                    live_points_by_element=live_points_by_element,
+                    skip_history=skip_history,  # True for summary table if you don’t show those cols
                 )
+            )
     finally:
         if local_conn is not None:
-            local_conn.close()
+            release(local_conn)
 
     return managers
 
@@ -356,43 +357,31 @@ def append_current_manager(managers: list[dict], team_id: int, league_id: int, l
                 break
 
 
-def get_picks(entry_id: int, event_id: int) -> list[dict]:
-    url = f"{FPL_API}/entry/{entry_id}/event/{event_id}/picks/"
-    try:
-        resp = HTTP.get(url, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException:
-        logger.warning(
-            "Failed to fetch picks for entry %s, event %s", entry_id, event_id)
-        return []
-    return resp.json().get("picks", [])
+def get_picks(entry_id: int, event_id: int, cur: sqlite3.Cursor | None = None, *,
+              current_gw: int | None = None) -> list[dict]:
+    # Served from the shared picks cache (modules/picks_cache.py); with
+    # current_gw, past-GW picks are stored finished and never refetched
+    return get_entry_picks(cur, entry_id, event_id, current_gw=current_gw)
 
 
-def get_team_mini_league_breakdown(team_id: int, static_data: dict, live_data_map: dict) -> dict:
+def get_team_mini_league_breakdown(team_id: int, static_data: dict, live_data_map: dict,
+                                   picks_by_gw: dict | None = None,
+                                   cur: sqlite3.Cursor | None = None) -> dict:
+    """
+    picks_by_gw: optional get_picks_many() result covering this team (the
+    league route prefetches all managers in one go); otherwise the picks
+    cache is queried for this team alone.
+    """
     current_gw = next((e["id"] for e in static_data.get(
         "events", []) if e.get("is_current")), None)
     if current_gw is None:
         logger.warning("No current gameweek found in the data.")
         return {}
 
-    # Fetch all picks for this manager (still per manager)
-    pick_urls = {
-        gw: f"{FPL_API}/entry/{team_id}/event/{gw}/picks/"
-        for gw in range(1, current_gw + 1)
-    }
-
-    picks_map: dict[int, dict[int, int]] = {}
-    with ThreadPoolExecutor(max_workers=8) as ex:
-        future_to_gw = {
-            ex.submit(HTTP.get, url, timeout=10): gw for gw, url in pick_urls.items()}
-        for fut in as_completed(future_to_gw):
-            gw = future_to_gw[fut]
-            try:
-                data = fut.result().json()
-                picks_map[gw] = {p["element"]: p.get(
-                    "multiplier", 1) for p in data.get("picks", [])}
-            except Exception:
-                picks_map[gw] = {}
+    if picks_by_gw is None:
+        picks_by_gw = get_picks_many(
+            cur, [team_id], range(1, current_gw + 1), current_gw=current_gw)
+    picks_map = multipliers_by_gw(picks_by_gw, int(team_id))
 
     summary = {
         "assists_team": 0,
@@ -410,21 +399,19 @@ def get_team_mini_league_breakdown(team_id: int, static_data: dict, live_data_ma
         "yellow_cards_team": 0,
     }
 
-    # Use pre-fetched live_data_map instead of fetching again
+    # Use pre-fetched live_data_map ({gw: LiveGameweek}) instead of fetching
+    # again; only the picked elements' columns are read.
     for gw, multipliers in picks_map.items():
-        elements = live_data_map.get(gw, [])
-        for el in elements:
-            pid = el.get("id")
-            mult = multipliers.get(pid)
-            if mult is None:
-                continue
-            stats = el.get("stats", {}) or {}
-
+        live_gw = live_data_map.get(gw)
+        if live_gw is None:
+            continue
+        col = live_gw.value
+        for pid, mult in multipliers.items():
             if mult == 0:
-                summary["goals_benched_team"] += stats.get("goals_scored", 0)
+                summary["goals_benched_team"] += col("goals_scored", pid)
                 continue
 
-            base_points = stats.get("total_points", 0)
+            base_points = col("total_points", pid)
             if mult == 2:
                 summary["captain_points_team"] += base_points
             elif mult == 3:
@@ -432,25 +419,19 @@ def get_team_mini_league_breakdown(team_id: int, static_data: dict, live_data_ma
 
             # Starters / captains
             if mult in (1, 2, 3):
-                summary["goals_scored_team"] += stats.get("goals_scored", 0)
-                summary["assists_team"] += stats.get("assists", 0)
-                summary["clean_sheets_team"] += stats.get("clean_sheets", 0)
-                # summary["expected_goals_team"] += stats.get(
-                #     "expected_goals", 0)
-
-                # Use points from explain for defensive contribution
-                dc_points = 0
-                for block in el.get("explain", []) or []:
-                    for s in block.get("stats", []) or []:
-                        if s.get("identifier") == "defensive_contribution":
-                            dc_points += s.get("points", 0)
-                summary["defensive_contribution_team"] += dc_points
-
-                summary["bonus_team"] += stats.get("bonus", 0)
-                summary["yellow_cards_team"] += stats.get("yellow_cards", 0)
-                summary["red_cards_team"] += stats.get("red_cards", 0)
-                summary["minutes_team"] += stats.get("minutes", 0)
-                if stats.get("in_dreamteam"):
+                summary["goals_scored_team"] += col("goals_scored", pid)
+                summary["assists_team"] += col("assists", pid)
+                summary["clean_sheets_team"] += col("clean_sheets", pid)
+
+                # Defensive contribution counts its explain points
+                summary["defensive_contribution_team"] += col(
+                    "defensive_contribution_points", pid)
+
+                summary["bonus_team"] += col("bonus", pid)
+                summary["yellow_cards_team"] += col("yellow_cards", pid)
+                summary["red_cards_team"] += col("red_cards", pid)
+                summary["minutes_team"] += col("minutes", pid)
+                if col("in_dreamteam", pid):
                     summary["dreamteam_count_team"] += 1
                 summary["total_points_team"] += base_points
 
@@ -1,11 +1,368 @@
 # modules/http_client.py
-from requests import Session
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from requests import Response, Session
 from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from urllib3.util.retry import Retry
 
+from modules.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# --- Upstream rate limiting ---------------------------------------------------
+# Every request through HTTP takes a token from its endpoint class's bucket
+# first. Budgets are (tokens per second, burst) per process. Set
+# FPL_RATE_LIMIT_DB to a SQLite path to share the buckets between processes
+# (e.g. gunicorn workers).
+
+ENDPOINT_CLASSES = (
+    ("live", re.compile(r"/event/\d+/live/")),
+    ("picks", re.compile(r"/entry/\d+/event/\d+/picks/")),
+    ("league", re.compile(r"/leagues-classic/")),
+    ("entry", re.compile(r"/entry/\d+/")),
+    ("static", re.compile(r"/bootstrap-static/|/fixtures/|/event-status/")),
+)
+
+# Sizing: the largest fan-out is a cold mini-league breakdown, which fetches
+# picks for every manager × GW (get_picks_many: 50 × 38 ≈ 1900 requests,
+# at most async_fetch.MAX_CONCURRENCY = 32 in flight). The picks burst takes
+# the first third at once and the rate drains the rest in ~20 s, inside
+# gunicorn's default 30 s worker timeout; (1900 - 640) / 64 ≈ 19.7 s. A
+# whole season of /live/ (38 GWs) fits in the live burst.
+#
+# Override per class with FPL_RATE_LIMITS="<class>=<rate>:<burst>,...", e.g.
+# FPL_RATE_LIMITS="picks=32:320,live=4:8"; classes are the keys below
+# (live, picks, league, entry, static, other). Lower budgets make cold
+# breakdowns correspondingly slower.
+RATE_LIMITS = {
+    "live": (8.0, 38),
+    "picks": (64.0, 640),
+    "league": (3.0, 6),
+    "entry": (10.0, 20),
+    "static": (2.0, 4),
+    "other": (5.0, 10),
+}
+
+MAX_429_RETRIES = 1
+DEFAULT_RETRY_AFTER = 2.0
+MAX_RETRY_AFTER = 30.0
+
+
+def endpoint_class(url: str) -> str:
+    for name, pattern in ENDPOINT_CLASSES:
+        if pattern.search(url):
+            return name
+    return "other"
+
+
+def _rate_limits_from_env() -> dict:
+    limits = dict(RATE_LIMITS)
+    for part in filter(None, os.getenv("FPL_RATE_LIMITS", "").split(",")):
+        try:
+            name, spec = part.split("=", 1)
+            rate, burst = spec.split(":", 1)
+            limits[name.strip()] = (float(rate), int(burst))
+        except ValueError:
+            logger.warning("Ignoring bad FPL_RATE_LIMITS entry %r", part)
+    return limits
+
+
+class TokenBucket:
+    """In-process token bucket; acquire() blocks until a token is free."""
+
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token (possibly going into debt) and return how long to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens +
+                               (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self) -> float:
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Hold the whole class back after an upstream 429."""
+        with self._lock:
+            self._blocked_until = max(
+                self._blocked_until, time.monotonic() + seconds)
+
+
+class SQLiteTokenBucket(TokenBucket):
+    """Same bucket, state kept in SQLite so all processes share one budget."""
+
+    SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        name          TEXT PRIMARY KEY,
+        tokens        REAL NOT NULL,
+        updated       REAL NOT NULL,
+        blocked_until REAL NOT NULL DEFAULT 0
+    )
+    """
+
+    _local = threading.local()      # per thread: {path: (pid, connection)}
+
+    def __init__(self, name: str, rate: float, burst: int, path: str):
+        super().__init__(name, rate, burst)
+        self.path = path
+        self._connect().execute(self.SCHEMA_SQL)
+
+    def _connect(self):
+        """This thread's connection to the shared file (reopened after a fork)."""
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        pid, conn = conns.get(self.path, (None, None))
+        if conn is None or pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=10000")
+            conns[self.path] = (os.getpid(), conn)
+        return conn
+
+    def _reserve(self) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated, blocked_until FROM rate_limit_buckets WHERE name = ?",
+                (self.name,)).fetchone()
+            tokens, updated, blocked_until = row or (
+                float(self.burst), now, 0.0)
+            tokens = min(self.burst, tokens +
+                         max(0.0, now - updated) * self.rate) - 1
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (name, tokens, updated, blocked_until) "
+                "VALUES (?, ?, ?, ?)", (self.name, tokens, now, blocked_until))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return max(wait, blocked_until - now)
+
+    def penalize(self, seconds: float) -> None:
+        # Upsert: the row may not exist yet (another process penalizes first)
+        now = time.time()
+        self._connect().execute("""
+            INSERT INTO rate_limit_buckets (name, tokens, updated, blocked_until)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(name) DO UPDATE SET
+                blocked_until = MAX(blocked_until, excluded.blocked_until)
+        """, (self.name, float(self.burst), now, now + seconds))
+
+
+class LimiterMetrics:
+    """Per-class counters for queue wait time and upstream 429s."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}
 
-def make_session(pool=60, retries=2, backoff=0.2):
-    s = Session()
+    def record(self, name: str, wait: float = 0.0, throttled: bool = False) -> None:
+        with self._lock:
+            m = self._data.setdefault(name, {
+                "requests": 0, "waited": 0, "wait_total_s": 0.0, "wait_max_s": 0.0, "throttled_429": 0})
+            if throttled:
+                m["throttled_429"] += 1
+                return
+            m["requests"] += 1
+            if wait > 0:
+                m["waited"] += 1
+                m["wait_total_s"] += wait
+                m["wait_max_s"] = max(m["wait_max_s"], wait)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, m in self._data.items():
+                out[name] = {**m,
+                             "wait_total_s": round(m["wait_total_s"], 3),
+                             "wait_max_s": round(m["wait_max_s"], 3),
+                             "wait_avg_ms": round(1000 * m["wait_total_s"] / m["requests"], 1) if m["requests"] else 0.0}
+            return out
+
+
+class RateLimiter:
+    def __init__(self, limits: dict, shared_db: str | None = None):
+        if shared_db:
+            self.buckets = {name: SQLiteTokenBucket(name, rate, burst, shared_db)
+                            for name, (rate, burst) in limits.items()}
+        else:
+            self.buckets = {name: TokenBucket(name, rate, burst)
+                            for name, (rate, burst) in limits.items()}
+        self.metrics = LimiterMetrics()
+
+    def bucket(self, url: str) -> TokenBucket:
+        return self.buckets.get(endpoint_class(url)) or self.buckets["other"]
+
+    def acquire(self, url: str) -> TokenBucket:
+        bucket = self.bucket(url)
+        self.metrics.record(bucket.name, wait=bucket.acquire())
+        return bucket
+
+
+def _retry_after_seconds(resp) -> float:
+    value = resp.headers.get("Retry-After")
+    try:
+        seconds = float(value) if value is not None else DEFAULT_RETRY_AFTER
+    except ValueError:
+        seconds = DEFAULT_RETRY_AFTER
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class ValidatorCache:
+    """
+    ETag / Last-Modified validators per URL, plus the body they validate.
+
+    Only URLs fetched through conditional_get() are kept, so in practice this
+    holds a handful of hot polling endpoints (bootstrap-static, event-status).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+        self.hits = 0
+
+    def request_headers(self, url: str) -> dict:
+        with self._lock:
+            entry = self._entries.get(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def remember(self, url: str, resp) -> None:
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        with self._lock:
+            if not (etag or last_modified):
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content": resp.content,
+                "headers": dict(resp.headers),
+                "encoding": resp.encoding,
+            }
+
+    def replay(self, url: str, not_modified) -> Response | None:
+        """Rebuild the stored 200 response for a 304 (None if nothing stored)."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self.hits += 1
+        resp = Response()
+        resp.status_code = 200
+        resp.reason = "OK"
+        resp.url = url
+        resp._content = entry["content"]
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        resp.encoding = entry["encoding"]
+        resp.request = not_modified.request
+        resp.elapsed = not_modified.elapsed
+        return resp
+
+
+class RateLimitedSession(Session):
+    """
+    Session that waits for a rate-limit token before every request.
+
+    A 429 pauses the endpoint class for Retry-After and is retried at most
+    MAX_429_RETRIES times; 5xx/connection retries stay with urllib3.
+
+    Plain GETs (no params/body/headers/stream) are coalesced per URL:
+    concurrent callers share one upstream call and the same (fully read)
+    Response.
+    """
+
+    def __init__(self, limiter: RateLimiter | None = None):
+        super().__init__()
+        self.limiter = limiter
+        self.flights = SingleFlight("http")
+        self.validators = ValidatorCache()
+
+    def request(self, method, url, *args, **kwargs):
+        if (str(method).upper() == "GET" and not args
+                and not any(kwargs.get(k) for k in ("params", "data", "json", "headers", "stream"))):
+            return self.flights.do(url, self._request, method, url, **kwargs)
+        return self._request(method, url, *args, **kwargs)
+
+    def conditional_get(self, url: str, **kwargs):
+        """
+        GET with If-None-Match / If-Modified-Since from the last 200 for `url`.
+
+        A 304 is answered with the stored body as a regular 200 Response, so
+        callers need no special casing; `resp.not_modified` tells them the
+        payload is unchanged (and can skip re-parsing / re-storing it).
+        """
+        return self.flights.do(("conditional", url), self._conditional_get, url, **kwargs)
+
+    def _conditional_get(self, url: str, **kwargs):
+        headers = {**(kwargs.pop("headers", None) or {}),
+                   **self.validators.request_headers(url)}
+        resp = self._request("GET", url, headers=headers, **kwargs)
+        if resp.status_code == 304:
+            replayed = self.validators.replay(url, resp)
+            if replayed is not None:
+                replayed.not_modified = True
+                return replayed
+            # Validators were dropped meanwhile: fetch unconditionally
+            resp = self._request("GET", url, **kwargs)
+        if resp.status_code == 200:
+            self.validators.remember(url, resp)
+        resp.not_modified = False
+        return resp
+
+    def _request(self, method, url, *args, **kwargs):
+        if self.limiter is None:
+            return super().request(method, url, *args, **kwargs)
+        attempt = 0
+        while True:
+            bucket = self.limiter.acquire(url)
+            resp = super().request(method, url, *args, **kwargs)
+            if resp.status_code != 429:
+                return resp
+            delay = _retry_after_seconds(resp)
+            bucket.penalize(delay)
+            self.limiter.metrics.record(bucket.name, throttled=True)
+            logger.warning("Upstream 429 on %s; pausing class %s for %.1fs",
+                           url, bucket.name, delay)
+            if attempt >= MAX_429_RETRIES:
+                return resp
+            attempt += 1
+            resp.close()
+
+
+def make_session(pool=60, retries=2, backoff=0.2, limiter=None):
+    s = RateLimitedSession(limiter)
 
     retry = Retry(
         total=retries,
@@ -13,7 +370,9 @@ def make_session(pool=60, retries=2, backoff=0.2):
         read=retries,
         status=retries,
         backoff_factor=backoff,
-        status_forcelist=(429, 500, 502, 503, 504),
+        # 429 is handled by RateLimitedSession so throttling backs off the
+        # whole endpoint class instead of every thread retrying on its own
+        status_forcelist=(500, 502, 503, 504),
         raise_on_status=False,
     )
 
@@ -34,4 +393,13 @@ def make_session(pool=60, retries=2, backoff=0.2):
     return s
 
 
-HTTP = make_session(pool=60)
+LIMITER = RateLimiter(_rate_limits_from_env(),
+                      shared_db=os.getenv("FPL_RATE_LIMIT_DB") or None)
+HTTP = make_session(pool=60, limiter=LIMITER)
+
+
+def limiter_metrics() -> dict:
+    """Snapshot of per-endpoint-class wait/429 counters for this process."""
+    return {**LIMITER.metrics.snapshot(),
+            "coalesced_gets": HTTP.flights.coalesced,
+            "not_modified_304": HTTP.validators.hits}
@@ -1,38 +1,468 @@
 # modules/live_cache.py
+"""
+Shared per-gameweek store for /event/{gw}/live/.
+
+Every caller that needs live element data goes through this module so a
+gameweek is downloaded once per process (and once ever, when finished):
+
+  • finished GWs (gw < current_gw) are frozen: stored with finished=1 and
+    never refetched. A snapshot stored while its GW was still live is
+    fetched once more when the GW becomes final, so bonus points and late
+    corrections are in the frozen copy,
+  • the current GW is refetched at most every LIVE_TTL,
+  • repeat reads are served from process memory.
+
+Storage is columnar: one row per (gameweek, element_id, fixture) in
+live_element_stats with an integer column per stat, instead of the raw JSON
+payload. In memory each GW is a LiveGameweek holding one dense array per stat,
+indexed by element id, so callers read only the columns they need.
+
+The per-fixture 'explain' blocks are flattened at ingest too: the points of
+each identifier in EXPLAIN_IDENTIFIERS land in an "<identifier>_points"
+column (the same names as the *_points player fields), so global, team and
+mini-league point breakdowns are plain column sums.
+
+Returned objects are shared between callers — treat them as read-only.
+"""
 import json
-import requests
+import logging
+from array import array
 from datetime import datetime, timezone, timedelta
+from threading import Lock
 
-USER_AGENT = {"User-Agent": "Mozilla/5.0"}
-LIVE_TTL = timedelta(seconds=60)  # or your existing LIVE_TTL
+from modules.async_fetch import fetch_json_many
+from modules.db import get_conn, release
 
+logger = logging.getLogger(__name__)
 
-def get_live_elements(cur, gw: int, fpl_api_base: str) -> list[dict]:
-    """Return list of elements for GW, cached in SQLite."""
-    cur.execute(
-        "SELECT data, last_fetched FROM live_elements_cache WHERE gameweek=?", (gw,))
-    row = cur.fetchone()
-    now = datetime.now(timezone.utc)
-    if row:
-        data, last_iso = row
+FPL_API = "https://fantasy.premierleague.com/api"
+DATABASE = "page_views.db"
+
+LIVE_TTL = timedelta(seconds=60)
+REQ_TIMEOUT = 10
+
+# Integer columns in live_element_stats, one per entry of the /live/ 'stats' block
+LIVE_STAT_COLUMNS = (
+    "minutes",
+    "goals_scored",
+    "assists",
+    "clean_sheets",
+    "goals_conceded",
+    "own_goals",
+    "penalties_saved",
+    "penalties_missed",
+    "yellow_cards",
+    "red_cards",
+    "saves",
+    "bonus",
+    "bps",
+    "clearances_blocks_interceptions",
+    "recoveries",
+    "tackles",
+    "defensive_contribution",
+    "starts",
+    "total_points",
+    "in_dreamteam",
+    "expected_goals",
+    "expected_assists",
+    "expected_goal_involvements",
+    "expected_goals_conceded",
+)
+
+# explain identifiers kept as "<identifier>_points" columns
+EXPLAIN_IDENTIFIERS = (
+    "assists",
+    "bonus",
+    "clean_sheets",
+    "defensive_contribution",
+    "goals_scored",
+    "goals_conceded",
+    "minutes",
+    "own_goals",
+    "penalties_saved",
+    "penalties_missed",
+    "red_cards",
+    "saves",
+    "yellow_cards",
+)
+POINTS_COLUMNS = tuple(f"{ident}_points" for ident in EXPLAIN_IDENTIFIERS)
+_POINTS_INDEX = {ident: i for i, ident in enumerate(EXPLAIN_IDENTIFIERS)}
+
+LIVE_COLUMNS = LIVE_STAT_COLUMNS + POINTS_COLUMNS
+
+# Decimal stats ("0.45") are stored as integers in hundredths
+SCALED_COLUMNS = {
+    "expected_goals": 100,
+    "expected_assists": 100,
+    "expected_goal_involvements": 100,
+    "expected_goals_conceded": 100,
+}
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS live_gameweeks (
+    gameweek     INTEGER PRIMARY KEY,
+    finished     INTEGER NOT NULL DEFAULT 0,
+    last_fetched TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS live_element_stats (
+    gameweek     INTEGER NOT NULL,
+    element_id   INTEGER NOT NULL,
+    fixture      INTEGER NOT NULL DEFAULT 0,
+    {", ".join(f"{c} INTEGER NOT NULL DEFAULT 0" for c in LIVE_COLUMNS)},
+    PRIMARY KEY (gameweek, element_id, fixture)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_live_gameweeks_last_fetched ON live_gameweeks(last_fetched);
+"""
+
+_INSERT_SQL = (
+    f"INSERT OR REPLACE INTO live_element_stats "
+    f"(gameweek, element_id, fixture, {', '.join(LIVE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * (len(LIVE_COLUMNS) + 3))})"
+)
+
+# gw -> LiveGameweek
+_MEM: dict[int, "LiveGameweek"] = {}
+_MEM_LOCK = Lock()
+_SCHEMA_READY = False
+
+
+class LiveGameweek:
+    """
+    Column view of one GW.
+
+    columns[name] is an array('l') indexed by element id (summed over the
+    element's fixtures), for the stats and the *_points explain columns alike.
+    """
+    __slots__ = ("gameweek", "element_ids", "columns",
+                 "finished", "fetched_at", "_present")
+
+    def __init__(self, gameweek, element_ids, columns, finished, fetched_at):
+        self.gameweek = gameweek
+        self.element_ids = element_ids
+        self.columns = columns
+        self.finished = finished
+        self.fetched_at = fetched_at
+        self._present = frozenset(element_ids)
+
+    def __contains__(self, pid) -> bool:
+        return pid in self._present
+
+    def value(self, name: str, pid: int) -> int:
+        """Raw stored integer (scaled columns stay in hundredths)."""
+        col = self.columns.get(name)
+        if col is None or not 0 <= pid < len(col):
+            return 0
+        return col[pid]
+
+    def stats(self, pid: int, columns=None) -> dict:
+        """Same shape as the /live/ 'stats' block (decimals back as floats)."""
+        out = {}
+        for name in (columns or [c for c in self.columns if c not in _POINTS_SET]):
+            v = self.value(name, pid)
+            if name in SCALED_COLUMNS:
+                out[name] = v / SCALED_COLUMNS[name]
+            elif name == "in_dreamteam":
+                out[name] = bool(v)
+            else:
+                out[name] = v
+        return out
+
+
+_POINTS_SET = frozenset(POINTS_COLUMNS)
+
+
+def _to_int(name: str, raw) -> int:
+    try:
+        if name in SCALED_COLUMNS:
+            return round(float(raw or 0) * SCALED_COLUMNS[name])
+        return int(raw or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _rows_from_elements(gw: int, elements: list[dict]) -> list[tuple]:
+    """
+    Flatten /live/ elements into live_element_stats rows.
+
+    One row per (element, fixture) found in 'explain' (fixture 0 when the
+    element has none). The element's GW stat totals sit on its first row and
+    later fixture rows carry zeros, so summing rows per element gives the
+    totals back. Each row carries that fixture's explain points per
+    identifier (each identifier counted once per fixture).
+    """
+    rows = []
+    for el in elements:
+        pid = el.get("id")
+        if not isinstance(pid, int):
+            continue
+        stats = el.get("stats", {}) or {}
+        totals = [_to_int(c, stats.get(c)) for c in LIVE_STAT_COLUMNS]
+
+        per_fixture: dict[int, list] = {}
+        for block in el.get("explain", []) or []:
+            fx = block.get("fixture") or 0
+            per_fixture.setdefault(fx, []).extend(
+                (s.get("identifier"), s.get("points")) for s in block.get("stats", []) or [])
+
+        if not per_fixture:
+            per_fixture[0] = []
+        for n, (fx, items) in enumerate(per_fixture.items()):
+            vals = totals if n == 0 else [0] * len(LIVE_STAT_COLUMNS)
+            rows.append((gw, pid, fx, *vals, *_explain_points(items)))
+    return rows
+
+
+def _explain_points(items) -> list[int]:
+    """[(identifier, points), ...] of one fixture → points per EXPLAIN_IDENTIFIERS slot."""
+    out = [0] * len(EXPLAIN_IDENTIFIERS)
+    seen = set()
+    for ident, pts in items:
+        slot = _POINTS_INDEX.get(ident)
+        if slot is None or ident in seen:
+            continue
+        seen.add(ident)
         try:
-            if now - datetime.fromisoformat(last_iso) < LIVE_TTL:
-                return json.loads(data)
-        except Exception:
+            out[slot] = int(pts or 0)
+        except (TypeError, ValueError):
             pass
+    return out
 
-    url = f"{fpl_api_base}/event/{gw}/live/"
-    resp = requests.get(url, headers=USER_AGENT, timeout=10)
-    resp.raise_for_status()
-    elements = resp.json().get("elements", [])
+
+def _build_gameweek(gw: int, rows, columns, finished: bool, fetched_at: datetime) -> LiveGameweek:
+    """rows: (element_id, fixture, *columns values)."""
+    rows = list(rows)
+    size = (max((r[0] for r in rows), default=0)) + 1
+    cols = {c: array("l", [0]) * size for c in columns}
+    ids = []
+    seen = set()
+    for r in rows:
+        pid = r[0]
+        if pid not in seen:
+            seen.add(pid)
+            ids.append(pid)
+        for i, c in enumerate(columns, start=2):
+            cols[c][pid] += r[i]
+    return LiveGameweek(gw, tuple(ids), cols, finished, fetched_at)
+
+
+def ensure_schema(cur):
+    """Create the columnar tables; migrate rows from older layouts once."""
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
+    cur.executescript(SCHEMA_SQL)
+    _migrate_explain_column(cur)
+
+    legacy = cur.execute(
+        "SELECT 1 FROM sqlite_schema WHERE type='table' AND name='live_elements_cache'").fetchone()
+    if legacy:
+        cols = {r[1]
+                for r in cur.execute("PRAGMA table_info(live_elements_cache)")}
+        finished_sql = "finished" if "finished" in cols else "0"
+        migrated = 0
+        for gw, data, last_iso, finished in cur.execute(
+                f"SELECT gameweek, data, last_fetched, {finished_sql} FROM live_elements_cache").fetchall():
+            try:
+                elements = json.loads(data)
+            except (TypeError, ValueError):
+                continue
+            _store(cur, gw, _rows_from_elements(gw, elements),
+                   bool(finished), last_iso)
+            migrated += 1
+        cur.execute("DROP TABLE live_elements_cache")
+        cur.connection.commit()
+        logger.info(
+            "[live_cache] migrated %d GWs from live_elements_cache", migrated)
+    _SCHEMA_READY = True
+
+
+def _migrate_explain_column(cur):
+    """Replace the old compact-JSON 'explain' column with the *_points columns."""
+    existing = {r[1] for r in cur.execute("PRAGMA table_info(live_element_stats)")}
+    missing = [c for c in POINTS_COLUMNS if c not in existing]
+    for c in missing:
+        cur.execute(
+            f"ALTER TABLE live_element_stats ADD COLUMN {c} INTEGER NOT NULL DEFAULT 0")
+    if "explain" not in existing:
+        if missing:
+            cur.connection.commit()
+        return
+
+    assignments = ", ".join(f"{c} = ?" for c in POINTS_COLUMNS)
+    updates = [
+        (*_explain_points(json.loads(explain)), gw, pid, fx)
+        for gw, pid, fx, explain in cur.execute(
+            "SELECT gameweek, element_id, fixture, explain FROM live_element_stats "
+            "WHERE explain IS NOT NULL").fetchall()
+    ]
+    cur.executemany(
+        f"UPDATE live_element_stats SET {assignments} "
+        f"WHERE gameweek = ? AND element_id = ? AND fixture = ?", updates)
+    try:
+        cur.execute("ALTER TABLE live_element_stats DROP COLUMN explain")
+    except Exception as e:  # old SQLite: the column just stays unused
+        logger.debug("[live_cache] could not drop explain column: %s", e)
+    cur.connection.commit()
+    logger.info("[live_cache] flattened explain into *_points for %d rows", len(updates))
+
+
+def _store(cur, gw: int, rows: list[tuple], finished: bool, last_iso: str):
+    cur.execute("DELETE FROM live_element_stats WHERE gameweek = ?", (gw,))
+    cur.executemany(_INSERT_SQL, rows)
     cur.execute(
-        "INSERT OR REPLACE INTO live_elements_cache (gameweek, data, last_fetched) VALUES (?, ?, ?)",
-        (gw, json.dumps(elements), now.isoformat()),
+        "INSERT OR REPLACE INTO live_gameweeks (gameweek, finished, last_fetched) VALUES (?, ?, ?)",
+        (gw, int(finished), last_iso),
     )
-    return elements
 
 
-def get_live_points_map(cur, gw: int, fpl_api_base: str) -> dict[int, dict]:
-    """id -> stats map for the GW, from the same cache."""
-    els = get_live_elements(cur, gw, fpl_api_base)
-    return {e["id"]: e.get("stats", {}) for e in els}
+def _load_from_db(cur, gws: list[int], columns=LIVE_COLUMNS) -> dict[int, LiveGameweek]:
+    """Per-GW array loader: reads only `columns` for the given GWs."""
+    placeholders = ",".join("?" * len(gws))
+    meta = {
+        gw: (bool(finished), last_iso)
+        for gw, finished, last_iso in cur.execute(
+            f"SELECT gameweek, finished, last_fetched FROM live_gameweeks WHERE gameweek IN ({placeholders})",
+            gws,
+        ).fetchall()
+    }
+    if not meta:
+        return {}
+
+    by_gw: dict[int, list] = {gw: [] for gw in meta}
+    for row in cur.execute(
+        f"SELECT gameweek, element_id, fixture, {', '.join(columns)} "
+        f"FROM live_element_stats WHERE gameweek IN ({','.join('?' * len(meta))})",
+        list(meta),
+    ):
+        by_gw[row[0]].append(row[1:])
+
+    out = {}
+    for gw, (finished, last_iso) in meta.items():
+        try:
+            at = datetime.fromisoformat(last_iso)
+        except (TypeError, ValueError):
+            continue
+        out[gw] = _build_gameweek(gw, by_gw[gw], columns, finished, at)
+    return out
+
+
+def _is_final(gw: int, current_gw: int | None) -> bool:
+    """A GW is final once a later GW has become current."""
+    return isinstance(current_gw, int) and gw < current_gw
+
+
+def _is_usable(gwv: LiveGameweek, current_gw: int | None, now: datetime) -> bool:
+    if gwv.finished:
+        return True
+    if _is_final(gwv.gameweek, current_gw):
+        return False  # taken while live: refetch once, then it is stored finished
+    return now - gwv.fetched_at < LIVE_TTL
+
+
+def _live_url(gw: int, fpl_api_base: str) -> str:
+    return f"{fpl_api_base}/event/{gw}/live/"
+
+
+def get_live_gameweeks(
+    cur,
+    gws,
+    fpl_api_base: str = FPL_API,
+    *,
+    current_gw: int | None = None,
+) -> dict[int, LiveGameweek]:
+    """
+    Return {gw: LiveGameweek} for every requested GW that could be resolved.
+
+    Lookup order is memory → SQLite → network; only GWs that are missing or
+    (for the live GW) older than LIVE_TTL are downloaded, concurrently.
+    A failed download falls back to the stale copy if there is one, otherwise
+    the GW is left out of the result.
+    """
+    gws = sorted({int(gw) for gw in gws if gw and int(gw) >= 1})
+    if not gws:
+        return {}
+
+    local_conn = None
+    if cur is None:
+        local_conn = get_conn(DATABASE)
+        cur = local_conn.cursor()
+
+    try:
+        ensure_schema(cur)
+        now = datetime.now(timezone.utc)
+        result: dict[int, LiveGameweek] = {}
+        stale: dict[int, LiveGameweek] = {}
+
+        # 1) Memory
+        with _MEM_LOCK:
+            for gw in gws:
+                gwv = _MEM.get(gw)
+                if gwv is None:
+                    continue
+                if _is_usable(gwv, current_gw, now):
+                    result[gw] = gwv
+                else:
+                    stale[gw] = gwv
+
+        # 2) SQLite
+        missing = [gw for gw in gws if gw not in result and gw not in stale]
+        if missing:
+            for gw, gwv in _load_from_db(cur, missing).items():
+                if _is_usable(gwv, current_gw, now):
+                    with _MEM_LOCK:
+                        _MEM[gw] = gwv
+                    result[gw] = gwv
+                else:
+                    stale[gw] = gwv
+
+        # 3) Network (only what is still unresolved)
+        to_fetch = [gw for gw in gws if gw not in result]
+        if to_fetch:
+            logger.debug("[live_cache] fetching GWs %s", to_fetch)
+            fetched: dict[int, list[dict]] = {}
+            urls = {gw: _live_url(gw, fpl_api_base) for gw in to_fetch}
+            payloads = fetch_json_many(urls.values(), timeout=REQ_TIMEOUT)
+            for gw, url in urls.items():
+                data = payloads.get(url)
+                if data is not None:
+                    fetched[gw] = data.get("elements", []) or []
+                elif gw in stale:
+                    result[gw] = stale[gw]
+
+            stamp = datetime.now(timezone.utc)
+            for gw, elements in fetched.items():
+                finished = _is_final(gw, current_gw)
+                rows = _rows_from_elements(gw, elements)
+                _store(cur, gw, rows, finished, stamp.isoformat())
+                gwv = _build_gameweek(
+                    gw, (r[1:] for r in rows), LIVE_COLUMNS, finished, stamp)
+                with _MEM_LOCK:
+                    _MEM[gw] = gwv
+                result[gw] = gwv
+            if fetched:
+                cur.connection.commit()
+
+        return result
+    finally:
+        if local_conn is not None:
+            release(local_conn)
+
+
+def get_live_gameweek(cur, gw: int, fpl_api_base: str = FPL_API, *, current_gw: int | None = None) -> LiveGameweek | None:
+    """Single-GW convenience wrapper around get_live_gameweeks."""
+    return get_live_gameweeks(cur, [gw], fpl_api_base, current_gw=current_gw).get(gw)
+
+
+def get_live_points_map(
+    cur,
+    gw: int,
+    fpl_api_base: str = FPL_API,
+    *,
+    current_gw: int | None = None,
+    columns=None,
+) -> dict[int, dict]:
+    """id -> stats map for the GW (optionally only `columns`), from the same cache."""
+    gwv = get_live_gameweek(cur, gw, fpl_api_base, current_gw=current_gw)
+    if gwv is None:
+        return {}
+    return {pid: gwv.stats(pid, columns) for pid in gwv.element_ids}
@@ -0,0 +1,190 @@
+# modules/picks_cache.py
+"""
+Persistent cache for /entry/{id}/event/{gw}/picks/.
+
+Picks for a finished GW (gw < current_gw) never change, so they are stored
+once with finished=1 and never refetched. A row stored while its GW was
+still live (before auto-subs and vice-captain promotion) is fetched once
+more when the GW becomes final. The current GW is refetched at most every
+PICKS_TTL. Only the compact (element, multiplier, position,
+is_captain) tuples are kept.
+"""
+import json
+import logging
+from datetime import datetime, timezone, timedelta
+
+from modules import retention
+from modules.async_fetch import fetch_many
+from modules.db import get_conn, release
+
+logger = logging.getLogger(__name__)
+
+FPL_API = "https://fantasy.premierleague.com/api"
+DATABASE = "page_views.db"
+
+PICKS_TTL = timedelta(seconds=60)
+REQ_TIMEOUT = 10
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS picks (
+    entry_id     INTEGER NOT NULL,
+    gameweek     INTEGER NOT NULL,
+    picks        TEXT NOT NULL,
+    finished     INTEGER NOT NULL DEFAULT 0,
+    last_fetched TEXT NOT NULL,
+    PRIMARY KEY (entry_id, gameweek)
+);
+CREATE INDEX IF NOT EXISTS idx_picks_last_fetched ON picks(last_fetched);
+"""
+
+_SCHEMA_READY = False
+
+
+def ensure_schema(cur):
+    global _SCHEMA_READY
+    if not _SCHEMA_READY:
+        cur.executescript(SCHEMA_SQL)
+        _SCHEMA_READY = True
+
+
+def _pack(picks: list[dict]) -> str:
+    return json.dumps(
+        [[p.get("element"), p.get("multiplier", 1), p.get("position"), int(bool(p.get("is_captain")))]
+         for p in picks],
+        separators=(",", ":"),
+    )
+
+
+def _unpack(packed: str) -> list[dict]:
+    return [
+        {"element": el, "multiplier": mult,
+            "position": pos, "is_captain": bool(cap)}
+        for el, mult, pos, cap in json.loads(packed)
+    ]
+
+
+class PicksMap(dict):
+    """{(entry_id, gw): picks}; `unfinished` holds the keys whose picks are not final yet."""
+
+    __slots__ = ("unfinished",)
+
+    def __init__(self):
+        super().__init__()
+        self.unfinished: set = set()
+
+
+def _picks_url(entry_id: int, gw: int) -> str:
+    return f"{FPL_API}/entry/{entry_id}/event/{gw}/picks/"
+
+
+def _parse_picks(res) -> list[dict]:
+    if isinstance(res, Exception):
+        raise res
+    if res.status_code == 404:
+        # Entry has no team for this GW (joined later) — cacheable as empty
+        return []
+    res.raise_for_status()
+    return res.json().get("picks", []) or []
+
+
+def get_picks_many(cur, entry_ids, gws, *, current_gw: int | None = None) -> PicksMap:
+    """
+    Return {(entry_id, gw): picks} for every entry × GW that could be resolved.
+
+    One SELECT covers all cached pairs; the rest are fetched concurrently.
+    Failed fetches are left out of the result (callers treat them as no picks),
+    or served from the stale row if there is one. Pairs whose picks are not
+    stored finished are listed in the result's `unfinished`.
+    """
+    entry_ids = sorted({int(e) for e in entry_ids if e})
+    gws = sorted({int(gw) for gw in gws if gw and int(gw) >= 1})
+    if not entry_ids or not gws:
+        return PicksMap()
+
+    local_conn = None
+    if cur is None:
+        local_conn = get_conn(DATABASE)
+        cur = local_conn.cursor()
+
+    try:
+        ensure_schema(cur)
+        now = datetime.now(timezone.utc)
+        result = PicksMap()
+        stale: dict[tuple[int, int], str] = {}
+
+        # 1) Cached rows
+        placeholders = ",".join("?" * len(entry_ids))
+        rows = cur.execute(
+            f"SELECT entry_id, gameweek, picks, finished, last_fetched FROM picks "
+            f"WHERE entry_id IN ({placeholders}) AND gameweek BETWEEN ? AND ?",
+            (*entry_ids, gws[0], gws[-1]),
+        ).fetchall()
+        for entry_id in {r[0] for r in rows}:
+            retention.touch("picks", entry_id)
+        wanted = set(gws)
+        for entry_id, gw, packed, finished, last_iso in rows:
+            if gw not in wanted:
+                continue
+            final = isinstance(current_gw, int) and gw < current_gw
+            fresh = bool(finished)
+            if not fresh and not final:  # taken while live and now final: refetch once
+                try:
+                    fresh = now - datetime.fromisoformat(last_iso) < PICKS_TTL
+                except (TypeError, ValueError):
+                    fresh = False
+            if fresh:
+                result[(entry_id, gw)] = _unpack(packed)
+                if not finished:
+                    result.unfinished.add((entry_id, gw))
+            else:
+                stale[(entry_id, gw)] = packed
+
+        # 2) Network for the rest
+        todo = [(e, gw) for e in entry_ids for gw in gws if (e, gw) not in result]
+        if todo:
+            logger.debug("[picks_cache] fetching %d entry×GW pairs", len(todo))
+            fetched: dict[tuple[int, int], list[dict]] = {}
+            urls = {key: _picks_url(*key) for key in todo}
+            responses = fetch_many(urls.values(), timeout=REQ_TIMEOUT)
+            for key, url in urls.items():
+                try:
+                    fetched[key] = _parse_picks(responses[url])
+                except Exception as e:
+                    logger.warning(
+                        "[picks_cache] picks fetch failed for entry %s GW %s: %s", key[0], key[1], e)
+                    if key in stale:
+                        result[key] = _unpack(stale[key])
+                        result.unfinished.add(key)
+
+            stamp = datetime.now(timezone.utc).isoformat()
+            for (entry_id, gw), picks in fetched.items():
+                packed = _pack(picks)
+                finished = isinstance(current_gw, int) and gw < current_gw
+                cur.execute(
+                    "INSERT OR REPLACE INTO picks (entry_id, gameweek, picks, finished, last_fetched) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (entry_id, gw, packed, int(finished), stamp),
+                )
+                result[(entry_id, gw)] = _unpack(packed)
+                if not finished:
+                    result.unfinished.add((entry_id, gw))
+            if fetched:
+                cur.connection.commit()
+
+        return result
+    finally:
+        if local_conn is not None:
+            release(local_conn)
+
+
+def get_entry_picks(cur, entry_id: int, gw: int, *, current_gw: int | None = None) -> list[dict]:
+    """Picks of one entry for one GW ([] when unavailable)."""
+    return get_picks_many(cur, [entry_id], [gw], current_gw=current_gw).get((int(entry_id), int(gw)), [])
+
+
+def multipliers_by_gw(picks_map: dict[tuple[int, int], list[dict]], entry_id: int) -> dict[int, dict[int, int]]:
+    """{gw: {element: multiplier}} for one entry out of a get_picks_many result."""
+    return {
+        gw: {p["element"]: p.get("multiplier", 1) for p in picks}
+        for (e, gw), picks in picks_map.items() if e == entry_id
+    }
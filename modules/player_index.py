@@ -0,0 +1,216 @@
+# modules/player_index.py
+"""
+Pre-sorted column orders and filter bitsets over a shared static player blob.
+
+A PlayerIndex is built once per blob object (utils.get_player_blob hands out
+a new one whenever the bootstrap or the global points change) and answers
+the /get-sorted-players filters with the same results as
+aggregate_data.filter_and_sort_players, without copying or re-sorting
+the ~700 rows per request:
+
+  filters   position / minutes / price are Python-int bitsets (bit i = the
+            i-th player in blob order); ranges come from prefix masks over
+            the column's ascending order, so a filter is a few ANDs
+  sorting   each blob column's order (asc and desc, built on first use and
+            stable like sorted()) is walked against the filter mask
+  team_*    columns come from the manager's team blob, which changes per
+            request; only the filtered candidates are sorted for those
+
+Only the rows that are returned are materialised, as OverlayRows merged
+with the team data, by player_rows(). Fixture sort keys are stamped per request and still go
+through filter_and_sort_players.
+"""
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+
+from modules.aggregate_data import (
+    DEFAULT_SORT_BY, FALLBACK_SORT_BY, FIXTURE_SORT_KEYS, NEGATIVE_COLUMNS,
+    POSITIVE_AND_NEGATIVE_COLUMNS, TEAM_TABLE_LIMIT, TEAM_TABLES, OverlayRow, team_keys_of,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_CACHE_SIZE = 4    # blobs (one per gw_key in practice)
+
+_INDEXES: dict = {}     # id(blob) -> PlayerIndex (holds the blob, so ids stay valid)
+_INDEX_LOCK = threading.Lock()
+
+
+def _num(v) -> float:
+    try:
+        return float(v or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _RangeIndex:
+    """Bitsets for lo <= value <= hi over one numeric column."""
+
+    __slots__ = ("order", "values", "prefix")
+
+    def __init__(self, values: list):
+        order = self.order = sorted(range(len(values)), key=values.__getitem__)
+        self.values = [values[i] for i in order]
+        # prefix[j] = players at positions order[:j]
+        self.prefix = [0] * (len(order) + 1)
+        mask = 0
+        for j, i in enumerate(order):
+            mask |= 1 << i
+            self.prefix[j + 1] = mask
+
+    def between(self, lo=None, hi=None) -> int:
+        start = 0 if lo is None else bisect_left(self.values, lo)
+        end = len(self.values) if hi is None else bisect_right(self.values, hi)
+        if end <= start:
+            return 0
+        return self.prefix[end] & ~self.prefix[start]
+
+
+class PlayerIndex:
+    def __init__(self, blob: dict):
+        self.blob = blob
+        self.pids = list(blob)
+        self.rows = [blob[pid] for pid in self.pids]
+        self.all = (1 << len(self.pids)) - 1
+
+        by_type: dict = {}
+        for i, row in enumerate(self.rows):
+            by_type[row.get("element_type")] = by_type.get(row.get("element_type"), 0) | (1 << i)
+        self.by_type = by_type
+        self.minutes = _RangeIndex([row.get("minutes") or 0 for row in self.rows])
+        self.cost = _RangeIndex([row.get("now_cost") or 0 for row in self.rows])
+
+        self._orders: dict = {}   # (column, descending) -> [i, ...]
+        self._signs: dict = {}    # column -> (positive, negative) masks
+
+    def values(self, column: str) -> list:
+        return [_num(row.get(column, 0)) for row in self.rows]
+
+    def order(self, column: str, descending: bool) -> list:
+        key = (column, descending)
+        order = self._orders.get(key)
+        if order is None:
+            vals = self.values(column)
+            order = sorted(range(len(vals)), key=vals.__getitem__, reverse=descending)
+            self._orders[key] = order
+        return order
+
+    def signs(self, column: str) -> tuple[int, int]:
+        signs = self._signs.get(column)
+        if signs is None:
+            pos = neg = 0
+            for i, v in enumerate(self.values(column)):
+                if v > 0:
+                    pos |= 1 << i
+                elif v < 0:
+                    neg |= 1 << i
+            signs = self._signs[column] = (pos, neg)
+        return signs
+
+    def positions(self, selected: str) -> int:
+        """Mask for the `selected_positions` arg (a substring test, like before)."""
+        if not selected:
+            return self.all
+        mask = 0
+        for etype, bits in self.by_type.items():
+            if str(etype) in selected:
+                mask |= bits
+        return mask
+
+    def bits(self, mask: int) -> str:
+        """`mask` as a string where bits(mask)[i] == "1" for player i (fast to probe)."""
+        return f"{mask:0{len(self.pids)}b}"[::-1] if self.pids else ""
+
+    def cost_range(self, mask: int) -> dict:
+        """min/max now_cost among `mask` (the price slider bounds)."""
+        if not mask:
+            return {"min": None, "max": None}
+        bits, order, values = self.bits(mask), self.cost.order, self.cost.values
+        lo = next(j for j, i in enumerate(order) if bits[i] == "1")
+        hi = next(j for j in range(len(order) - 1, -1, -1) if bits[order[j]] == "1")
+        return {"min": values[lo], "max": values[hi]}
+
+
+def index_for(blob: dict) -> PlayerIndex:
+    """The (cached) index for a shared, read-only player blob."""
+    with _INDEX_LOCK:
+        index = _INDEXES.get(id(blob))
+        if index is not None and index.blob is blob:
+            return index
+    index = PlayerIndex(blob)
+    with _INDEX_LOCK:
+        _INDEXES[id(blob)] = index
+        while len(_INDEXES) > INDEX_CACHE_SIZE:
+            _INDEXES.pop(next(iter(_INDEXES)))
+    logger.debug("[player_index] built for %d players", len(index.pids))
+    return index
+
+
+def can_serve(request_args) -> bool:
+    return request_args.get("sort_by") not in FIXTURE_SORT_KEYS
+
+
+def sorted_player_ids(index: PlayerIndex, team_info: dict, request_args):
+    """
+    filter_and_sort_players() as player ids. Returns (pids, price_range,
+    is_truncated); build the rows for the ones you need with player_rows().
+    """
+    table = request_args.get("table", "summary")
+    sort_by = request_args.get("sort_by", DEFAULT_SORT_BY.get(table, FALLBACK_SORT_BY))
+    descending = request_args.get("order", "desc") == "desc"
+    min_cost = request_args.get("min_cost", type=float)
+    max_cost = request_args.get("max_cost", type=float)
+    min_minutes = int(request_args.get("min_minutes", 0))
+    max_minutes = int(request_args.get("max_minutes", 38 * 90))
+
+    # 1) positions + minutes, 2) price range over those, 3) price
+    mask = index.positions(request_args.get("selected_positions", ""))
+    mask &= index.minutes.between(min_minutes, max_minutes)
+    price_range = index.cost_range(mask)
+    if min_cost is not None or max_cost is not None:
+        mask &= index.cost.between(
+            int(min_cost * 10) if min_cost is not None else None,
+            int(max_cost * 10) if max_cost is not None else None)
+
+    # team_* columns of the merged rows come from team_info (0 if never owned)
+    team_column = table in TEAM_TABLES and sort_by in team_keys_of(team_info)
+    if sort_by in NEGATIVE_COLUMNS:
+        descending = not descending
+
+    if team_column:
+        def value(i):
+            return _num(team_info.get(index.pids[i], {}).get(sort_by, 0))
+        bits = index.bits(mask)
+        candidates = [i for i in range(len(index.pids)) if bits[i] == "1"]
+        if sort_by in NEGATIVE_COLUMNS:
+            candidates = [i for i in candidates if value(i) < 0]
+        elif sort_by in POSITIVE_AND_NEGATIVE_COLUMNS:
+            candidates = [i for i in candidates if value(i) != 0]
+        else:
+            candidates = [i for i in candidates if value(i) > 0]
+        order = sorted(candidates, key=value, reverse=descending)
+    else:
+        pos, neg = index.signs(sort_by)
+        if sort_by in NEGATIVE_COLUMNS:
+            mask &= neg
+        elif sort_by in POSITIVE_AND_NEGATIVE_COLUMNS:
+            mask &= pos | neg
+        else:
+            mask &= pos
+        bits = index.bits(mask)
+        order = [i for i in index.order(sort_by, descending) if bits[i] == "1"]
+
+    is_truncated = False
+    if table in TEAM_TABLES:
+        is_truncated = len(order) > TEAM_TABLE_LIMIT
+        order = order[:TEAM_TABLE_LIMIT]
+    return [index.pids[i] for i in order], price_range, is_truncated
+
+
+def player_rows(index: PlayerIndex, team_info: dict, pids, table: str) -> list:
+    """Rows for `pids` as OverlayRows (merged like merge_team_and_global)."""
+    if table not in TEAM_TABLES:
+        return [OverlayRow(index.blob[pid]) for pid in pids]
+    team_keys = team_keys_of(team_info)
+    return [OverlayRow(index.blob[pid], team_info.get(pid), team_keys) for pid in pids]
@@ -0,0 +1,274 @@
+# modules/prewarm.py
+"""
+Background pre-warming of the caches ahead of user traffic.
+
+Every worker process runs one daemon thread (started on its first request,
+see start()). Each tick it:
+
+  1. flushes the request-frequency counters this process collected
+     (record_demand()) into prewarm_demand, bucketed per hour, and the
+     cache access times (retention.touch());
+  2. tries to take/renew the SQLite lease in prewarm_lease, so only one
+     process across the deployment does the warming — and, every
+     retention.ENFORCE_INTERVAL_SECONDS, the cache retention pass;
+  3. if it holds the lease and the shared event-status generation
+     (modules/event_watch.py) moved since the last warm, rebuilds — in
+     this order — bootstrap/static_player_info,
+     the global points (and with them the live per-GW store), fixtures,
+     then the most requested league summaries/breakdowns and team blobs
+     over the last DEMAND_WINDOW_HOURS.
+
+The rebuilds run inside app.test_request_context() with g populated, the
+same code paths a request would take, so request handlers find fresh rows
+and only fall back to rebuilding on a genuine miss.
+
+Tuning (env): FPL_PREWARM=0 disables, FPL_PREWARM_INTERVAL (s),
+FPL_PREWARM_LEAGUES / FPL_PREWARM_TEAMS (how many of each to warm).
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from collections import Counter
+
+from flask import g
+
+from modules import cache_builders, event_watch, retention
+from modules.db import get_conn, release
+from modules.utils import get_player_blob, get_static_data
+
+logger = logging.getLogger(__name__)
+
+DATABASE = "page_views.db"
+
+ENABLED = os.getenv("FPL_PREWARM", "1").lower() not in ("0", "false", "no", "off")
+INTERVAL_SECONDS = float(os.getenv("FPL_PREWARM_INTERVAL", "15"))
+LEASE_SECONDS = 120             # a holder that stops renewing loses it after this
+TOP_LEAGUES = int(os.getenv("FPL_PREWARM_LEAGUES", "20"))
+TOP_TEAMS = int(os.getenv("FPL_PREWARM_TEAMS", "50"))
+DEMAND_WINDOW_HOURS = 24
+
+LEASE_NAME = "prewarm"
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS prewarm_demand (
+    kind   TEXT NOT NULL,       -- 'summary' | 'breakdown' | 'team'
+    key    TEXT NOT NULL,       -- 'league_id:max_show' or 'team_id'
+    bucket INTEGER NOT NULL,    -- unix hour
+    hits   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_prewarm_demand_bucket ON prewarm_demand(bucket);
+CREATE TABLE IF NOT EXISTS prewarm_lease (
+    name       TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL,   -- unix time
+    warmed_for TEXT             -- event-status generation of the last full warm
+);
+"""
+
+_SCHEMA_READY = False
+
+_DEMAND = Counter()
+_DEMAND_LOCK = threading.Lock()
+
+_START_LOCK = threading.Lock()
+_THREAD = None
+_THREAD_PID = None
+_STOP = threading.Event()
+
+
+def ensure_schema(cur):
+    global _SCHEMA_READY
+    if not _SCHEMA_READY:
+        cur.executescript(SCHEMA_SQL)
+        _SCHEMA_READY = True
+
+
+# ── Demand counters ──────────────────────────────────────────────────────────
+
+
+def record_demand(kind: str, key) -> None:
+    """Count one request for a cache entry (cheap; flushed by the scheduler)."""
+    if _THREAD is None:
+        return
+    with _DEMAND_LOCK:
+        _DEMAND[(kind, str(key))] += 1
+
+
+def flush_demand(cur) -> int:
+    """Add this process's counters to prewarm_demand and drop expired buckets."""
+    global _DEMAND
+    with _DEMAND_LOCK:
+        pending, _DEMAND = _DEMAND, Counter()
+    bucket = int(time.time() // 3600)
+    if pending:
+        cur.executemany("""
+            INSERT INTO prewarm_demand (kind, key, bucket, hits) VALUES (?, ?, ?, ?)
+            ON CONFLICT(kind, key, bucket) DO UPDATE SET hits = hits + excluded.hits
+        """, [(kind, key, bucket, n) for (kind, key), n in pending.items()])
+    cur.execute("DELETE FROM prewarm_demand WHERE bucket < ?",
+                (bucket - DEMAND_WINDOW_HOURS,))
+    cur.connection.commit()
+    return len(pending)
+
+
+def top_demand(cur, kind: str, limit: int) -> list[str]:
+    """Most requested keys of `kind` over the demand window, busiest first."""
+    since = int(time.time() // 3600) - DEMAND_WINDOW_HOURS
+    cur.execute("""
+        SELECT key FROM prewarm_demand
+        WHERE kind = ? AND bucket >= ?
+        GROUP BY key
+        ORDER BY SUM(hits) DESC
+        LIMIT ?
+    """, (kind, since, limit))
+    return [r[0] for r in cur.fetchall()]
+
+
+# ── Lease ────────────────────────────────────────────────────────────────────
+
+
+def _owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(cur, owner: str) -> bool:
+    """Take or renew the warming lease; True if `owner` holds it now."""
+    now = time.time()
+    cur.execute(
+        "INSERT OR IGNORE INTO prewarm_lease (name, owner, expires_at) VALUES (?, ?, 0)",
+        (LEASE_NAME, owner))
+    cur.execute("""
+        UPDATE prewarm_lease SET owner = ?, expires_at = ?
+        WHERE name = ? AND (owner = ? OR expires_at < ?)
+    """, (owner, now + LEASE_SECONDS, LEASE_NAME, owner, now))
+    held = cur.rowcount == 1
+    cur.connection.commit()
+    return held
+
+
+def _warmed_for(cur) -> str | None:
+    cur.execute("SELECT warmed_for FROM prewarm_lease WHERE name = ?", (LEASE_NAME,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _mark_warmed(cur, owner: str, sig: str) -> None:
+    cur.execute("UPDATE prewarm_lease SET warmed_for = ? WHERE name = ? AND owner = ?",
+                (sig, LEASE_NAME, owner))
+    cur.connection.commit()
+
+
+# ── Warming ──────────────────────────────────────────────────────────────────
+
+
+def warm(app, conn, es: dict, owner: str) -> None:
+    """Rebuild every cache for the event-status snapshot `es` (see module doc)."""
+    cur = conn.cursor()
+    gw = es.get("gw")
+    event_last_update = es.get("last_update")
+    event_gen = es.get("generation")
+    event_iso = event_last_update.isoformat() if event_last_update else None
+    t0 = time.perf_counter()
+
+    with app.test_request_context("/"):
+        g.current_gw = gw
+        g.event_last_update = event_last_update
+        g.event_gen = event_gen
+        g.is_live = bool(es.get("is_live"))
+
+        # Bootstrap, static_player_info, global points (+ live store), fixtures
+        static_data = get_static_data(
+            current_gw=gw if gw else -1,
+            event_updated_iso=event_iso,
+            hydrate_fixtures=True,
+            fixtures_lookahead=5,
+        ) or {}
+        if not gw:
+            return
+
+        for kind, rebuild in (("summary", cache_builders.rebuild_league_summary),
+                              ("breakdown", cache_builders.rebuild_league_breakdown)):
+            for key in top_demand(cur, kind, TOP_LEAGUES):
+                league_id, max_show = (int(x) for x in key.split(":"))
+                try:
+                    rebuild(conn, league_id, gw, max_show, static_data,
+                            event_gen=event_gen)
+                except Exception as e:
+                    logger.warning("[prewarm] %s %s failed: %s", kind, key, e)
+                acquire_lease(cur, owner)  # keep the lease through long warms
+
+        static_blob = get_player_blob(gw, event_last_update, cur)
+        if static_blob is not None:
+            for key in top_demand(cur, "team", TOP_TEAMS):
+                team_id = int(key)
+                if cache_builders.load_team_blob(cur, team_id, gw, event_gen) is not None:
+                    continue
+                try:
+                    cache_builders.rebuild_team_blob(
+                        conn, team_id, gw, static_blob, static_data, event_gen)
+                except Exception as e:
+                    logger.warning("[prewarm] team %s failed: %s", team_id, e)
+                acquire_lease(cur, owner)
+
+    logger.info("[prewarm] warmed gw=%s in %.1fs", gw, time.perf_counter() - t0)
+
+
+def tick(app, owner: str) -> None:
+    conn = get_conn(DATABASE)
+    try:
+        cur = conn.cursor()
+        ensure_schema(cur)
+        flush_demand(cur)
+        retention.flush_touches(cur)
+        if not acquire_lease(cur, owner):
+            return
+        try:
+            retention.maybe_enforce(cur)
+        except Exception as e:
+            logger.warning("[prewarm] retention pass failed: %s", e)
+
+        es = event_watch.current(cur)
+        if es.get("maintenance") or not es.get("generation"):
+            return  # nothing trustworthy to warm against
+        generation = str(es["generation"])
+        if _warmed_for(cur) == generation:
+            return
+
+        logger.info("[prewarm] event-status generation %s (gw=%s) → warming",
+                    generation, es.get("gw"))
+        warm(app, conn, es, owner)
+        _mark_warmed(cur, owner, generation)
+    finally:
+        release(conn)
+
+
+def _run(app) -> None:
+    owner = _owner_id()
+    logger.info("[prewarm] scheduler started (%s, every %ss)", owner, INTERVAL_SECONDS)
+    while not _STOP.wait(INTERVAL_SECONDS):
+        try:
+            tick(app, owner)
+        except Exception:
+            logger.exception("[prewarm] tick failed")
+
+
+def start(app) -> None:
+    """Start this process's scheduler thread once (again after a fork)."""
+    global _THREAD, _THREAD_PID
+    if not ENABLED or (_THREAD is not None and _THREAD_PID == os.getpid()):
+        return
+    with _START_LOCK:
+        if _THREAD is not None and _THREAD_PID == os.getpid():
+            return
+        _STOP.clear()
+        _THREAD = threading.Thread(
+            target=_run, args=(app,), name="prewarm", daemon=True)
+        _THREAD_PID = os.getpid()
+        _THREAD.start()
+
+
+def stop() -> None:
+    _STOP.set()
@@ -0,0 +1,176 @@
+# modules/response_cache.py
+"""
+Per-process cache of rendered JSON responses for the table endpoints, with
+strong ETags.
+
+@cached(...) wraps a view. The cache key is the endpoint, the normalised
+query args and the data generation the response was built from:
+
+  g.event_gen       shared event-status generation (modules/event_watch.py)
+  g.current_gw / g.is_updating
+  bootstrap digest  prices/ownership change without an event-status change
+  g.team_id         responses carry the session's manager / "me" row
+
+so a hit can only ever return what the view would have rendered. Entries
+also expire after TTL_SECONDS as a backstop. Every 200 JSON response gets
+ETag = sha1(body) and `Cache-Control: private, no-cache`; a request whose
+If-None-Match matches gets an empty 304, hit or miss. Browsers re-requesting
+a table on a tab switch therefore cost a dict lookup and no body. Compressed
+bodies (modules/compression.py) are kept on the entry next to the identity
+one, so a hit is not recompressed.
+
+A view opts a response out (e.g. stale-while-revalidate rows) with
+`g.response_cacheable = False`; `refresh=1` bypasses the cache.
+
+Tuning (env): FPL_RESPONSE_CACHE=0 disables, FPL_RESPONSE_CACHE_MB.
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, make_response, request
+
+from modules import bootstrap_cache, compression
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("FPL_RESPONSE_CACHE", "1").lower() not in ("0", "false", "no", "off")
+MAX_BYTES = int(float(os.getenv("FPL_RESPONSE_CACHE_MB", "64")) * 1024 * 1024)
+MAX_ENTRIES = 1024
+TTL_SECONDS = 600
+
+# Query args that never change the response (cache busters)
+IGNORED_ARGS = {"_"}
+BYPASS_ARGS = {"refresh"}
+
+_ENTRIES: "OrderedDict[tuple, dict]" = OrderedDict()
+_BYTES = 0
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def _generation() -> tuple:
+    boot = bootstrap_cache.current()
+    return (
+        getattr(g, "event_gen", None),
+        getattr(g, "current_gw", None),
+        bool(getattr(g, "is_updating", False)),
+        boot.digest if boot else None,
+        getattr(g, "team_id", None),
+    )
+
+
+def _key() -> tuple:
+    args = tuple(sorted(
+        (k, v) for k, v in request.args.items(multi=True) if k not in IGNORED_ARGS))
+    return (request.endpoint, args, _generation())
+
+
+def _get(key) -> dict | None:
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["at"] > TTL_SECONDS:
+            _drop(key)
+            return None
+        _ENTRIES.move_to_end(key)
+        return entry
+
+
+def _drop(key) -> None:
+    global _BYTES
+    entry = _ENTRIES.pop(key, None)
+    if entry is not None:
+        _BYTES -= len(entry["body"])
+
+
+def _put(key, entry: dict) -> None:
+    global _BYTES
+    if len(entry["body"]) > MAX_BYTES // 8:
+        return  # one huge response must not flush everything else
+    with _LOCK:
+        _drop(key)
+        _ENTRIES[key] = entry
+        _BYTES += len(entry["body"])
+        while _ENTRIES and (_BYTES > MAX_BYTES or len(_ENTRIES) > MAX_ENTRIES):
+            _drop(next(iter(_ENTRIES)))
+
+
+def clear() -> None:
+    global _BYTES
+    with _LOCK:
+        _ENTRIES.clear()
+        _BYTES = 0
+
+
+def stats() -> dict:
+    with _LOCK:
+        return {**_STATS, "entries": len(_ENTRIES), "bytes": _BYTES}
+
+
+def etag_for(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+
+def _finish(body: bytes, etag: str, variants: dict | None = None):
+    """
+    The (compressed) response for `body`, or a 304 if the client already has
+    it. `variants` memoises the compressed bodies (see compression.encode).
+    """
+    held = next((t for t in compression.etag_variants(etag)
+                 if request.if_none_match.contains(t)), None)
+    if held is not None:
+        with _LOCK:
+            _STATS["not_modified"] += 1
+        resp = make_response("", 304)
+        resp.set_etag(held)
+        resp.vary.add("Accept-Encoding")
+    else:
+        data, enc = compression.encode(body, variants)
+        resp = make_response("", 200)
+        resp.mimetype = "application/json"
+        compression.apply(resp, data, enc, etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+def cached(on_hit=None):
+    """
+    Cache the wrapped JSON view (see module doc). `on_hit`, if given, runs
+    for requests answered from the cache, where the view itself does not
+    (e.g. to keep the pre-warm demand counters complete).
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            bypass = not ENABLED or any(request.args.get(a) for a in BYPASS_ARGS)
+            key = None if bypass else _key()
+
+            entry = _get(key) if key is not None else None
+            if entry is not None:
+                with _LOCK:
+                    _STATS["hits"] += 1
+                if on_hit is not None:
+                    on_hit()
+                return _finish(entry["body"], entry["etag"], entry["encoded"])
+
+            if key is not None:
+                with _LOCK:
+                    _STATS["misses"] += 1
+            g.response_cacheable = True
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or resp.mimetype != "application/json":
+                return resp
+            body = resp.get_data()
+            entry = {"body": body, "etag": etag_for(body), "encoded": {},
+                     "at": time.monotonic()}
+            if key is not None and g.get("response_cacheable", True):
+                _put(key, entry)
+            return _finish(body, entry["etag"], entry["encoded"])
+        return wrapper
+    return decorator
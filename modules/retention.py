@@ -0,0 +1,283 @@
+# modules/retention.py
+"""
+Cache-size governance for page_views.db.
+
+Each cache table gets a policy in RETENTION_POLICIES:
+
+  max_age_days  evict rows not used (read or written) for this long
+  max_rows      keep at most this many rows, least recently used first out
+  max_bytes     cap on SUM(LENGTH(size_column)), LRU first out
+  touch_key     columns identifying what a read "uses"; reads call touch()
+                and the timestamps land in a last_accessed column
+
+"Used" means COALESCE(last_accessed, last_fetched), so rows that were never
+read since this module existed age by their write time. After the per-table
+policies, if the database is still above DB_BUDGET_BYTES the least recently
+used rows of the evictable tables are trimmed further, largest table first.
+
+enforce() ends with a WAL checkpoint and, when the database was created with
+auto_vacuum=INCREMENTAL (db_setup.py does that for new files; `db_stats.py
+--vacuum` converts an existing one), an incremental_vacuum that hands the
+freed pages back to the filesystem.
+
+In the app, the pre-warm scheduler (modules/prewarm.py) flushes each
+process's touches every tick and the lease holder runs enforce() every
+ENFORCE_INTERVAL_SECONDS. `python db_stats.py --enforce` does it by hand.
+
+Only rowid tables may have a policy. The live per-GW tables, fixtures and
+bootstrap are bounded by the season and are left alone.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+DB_BUDGET_BYTES = int(float(os.getenv("FPL_DB_BUDGET_MB", "512")) * MB)
+ENFORCE_INTERVAL_SECONDS = int(os.getenv("FPL_RETENTION_INTERVAL", "900"))
+INCREMENTAL_VACUUM_PAGES = 2000       # per enforce() run
+MAX_PENDING_TOUCHES = 50_000          # per process, between flushes
+BUDGET_TRIM_FRACTION = 0.10           # share of a table's rows cut per budget pass
+
+RETENTION_POLICIES = {
+    "team_player_info": {
+        "max_age_days": 14, "max_rows": 20_000, "max_bytes": 150 * MB,
+        "size_column": "data", "touch_key": ("team_id", "gameweek"),
+    },
+    "team_gw_vectors": {
+        "max_age_days": 45, "max_rows": 400_000, "max_bytes": 150 * MB,
+        "size_column": "data", "touch_key": ("team_id",),
+    },
+    "mini_league_summary_cache": {
+        "max_age_days": 7, "max_rows": 5_000, "max_bytes": 50 * MB,
+        "size_column": "data", "touch_key": ("league_id", "gameweek", "max_show"),
+    },
+    "mini_league_breakdown_cache": {
+        "max_age_days": 7, "max_rows": 5_000, "max_bytes": 50 * MB,
+        "size_column": "data", "touch_key": ("league_id", "gameweek", "max_show"),
+    },
+    "picks": {
+        "max_age_days": 45, "max_rows": 1_000_000, "max_bytes": 100 * MB,
+        "size_column": "picks", "touch_key": ("entry_id",),
+    },
+    "managers": {
+        "max_age_days": 30, "max_rows": 50_000, "max_bytes": 50 * MB,
+        "size_column": "data", "touch_key": ("team_id",),
+    },
+    "global_points_cache": {
+        # self-pruning (see utils.fill_global_points_from_explain); a backstop
+        "max_rows": 10, "size_column": "data",
+    },
+}
+
+_TOUCHES: dict = {}
+_TOUCH_LOCK = threading.Lock()
+_ACCESS_COLUMNS_READY: set = set()
+_LAST_ENFORCED = 0.0
+
+# "Last used" for LRU ordering
+LRU_EXPR = "COALESCE(last_accessed, last_fetched)"
+
+
+def _table_columns(cur, table: str) -> set:
+    return {r[1] for r in cur.execute(f"PRAGMA table_info({table})")}
+
+
+def ensure_access_columns(cur) -> None:
+    """Add last_accessed to every existing policy table that lacks it."""
+    for table in RETENTION_POLICIES:
+        if table in _ACCESS_COLUMNS_READY:
+            continue
+        cols = _table_columns(cur, table)
+        if not cols:
+            continue  # created later by its own module; checked again next time
+        if "last_accessed" not in cols:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN last_accessed TEXT")
+            logger.info("[retention] added last_accessed to %s", table)
+        _ACCESS_COLUMNS_READY.add(table)
+    cur.connection.commit()
+
+
+# ── Access tracking ──────────────────────────────────────────────────────────
+
+
+def touch(table: str, *key) -> None:
+    """Note that a cached row was read (buffered; written by flush_touches())."""
+    with _TOUCH_LOCK:
+        if len(_TOUCHES) < MAX_PENDING_TOUCHES:
+            _TOUCHES[(table, key)] = time.time()
+
+
+def flush_touches(cur) -> int:
+    """Write this process's buffered touches to last_accessed."""
+    global _TOUCHES
+    with _TOUCH_LOCK:
+        pending, _TOUCHES = _TOUCHES, {}
+    if not pending:
+        return 0
+    ensure_access_columns(cur)
+
+    by_table: dict[str, list] = {}
+    for (table, key), ts in pending.items():
+        if table in _ACCESS_COLUMNS_READY:
+            iso = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+            by_table.setdefault(table, []).append((iso, *key))
+    for table, params in by_table.items():
+        where = " AND ".join(f"{c} = ?" for c in RETENTION_POLICIES[table]["touch_key"])
+        cur.executemany(
+            f"UPDATE {table} SET last_accessed = ? WHERE {where}", params)
+    cur.connection.commit()
+    return len(pending)
+
+
+# ── Size accounting ──────────────────────────────────────────────────────────
+
+
+def db_size_bytes(cur) -> int:
+    """Bytes in use (pages minus free pages)."""
+    page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+    pages = cur.execute("PRAGMA page_count").fetchone()[0]
+    free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    return (pages - free) * page_size
+
+
+def table_bytes(cur, table: str) -> int:
+    col = RETENTION_POLICIES[table].get("size_column", "data")
+    return cur.execute(f"SELECT COALESCE(SUM(LENGTH({col})), 0) FROM {table}").fetchone()[0]
+
+
+# ── Policies ─────────────────────────────────────────────────────────────────
+
+
+def _evict_oldest(cur, table: str, n: int, dry_run: bool) -> int:
+    if n <= 0:
+        return 0
+    if dry_run:
+        return n
+    return cur.execute(
+        f"DELETE FROM {table} WHERE rowid IN "
+        f"(SELECT rowid FROM {table} ORDER BY {LRU_EXPR} LIMIT ?)", (n,)).rowcount
+
+
+def apply_policy(cur, table: str, policy: dict, *, now: datetime, dry_run: bool = False) -> dict:
+    """Apply one table's policy; returns {"age": n, "rows": n, "bytes": n} evicted."""
+    lru = LRU_EXPR if "last_accessed" in _table_columns(cur, table) else "last_fetched"
+    out = {"age": 0, "rows": 0, "bytes": 0}
+
+    max_age = policy.get("max_age_days")
+    if max_age:
+        cutoff = (now - timedelta(days=max_age)).isoformat()
+        if dry_run:
+            out["age"] = cur.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {lru} < ?", (cutoff,)).fetchone()[0]
+        else:
+            out["age"] = cur.execute(
+                f"DELETE FROM {table} WHERE {lru} < ?", (cutoff,)).rowcount
+
+    max_rows = policy.get("max_rows")
+    if max_rows:
+        count = cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - (
+            out["age"] if dry_run else 0)
+        out["rows"] = _evict_oldest(cur, table, count - max_rows, dry_run)
+
+    max_bytes = policy.get("max_bytes")
+    if max_bytes:
+        col = policy.get("size_column", "data")
+        # Keep the most recently used rows whose running size fits the budget
+        over = f"""
+            SELECT rowid FROM (
+                SELECT rowid, SUM(LENGTH({col})) OVER (
+                    ORDER BY {lru} DESC, rowid DESC
+                ) AS running
+                FROM {table}
+            ) WHERE running > ?
+        """
+        if dry_run:
+            out["bytes"] = cur.execute(
+                f"SELECT COUNT(*) FROM ({over})", (max_bytes,)).fetchone()[0]
+        else:
+            out["bytes"] = cur.execute(
+                f"DELETE FROM {table} WHERE rowid IN ({over})", (max_bytes,)).rowcount
+    return out
+
+
+def _trim_to_budget(cur, budget: int, dry_run: bool) -> dict:
+    """
+    Cut LRU rows from the largest evictable tables until the pages in use fit
+    `budget` (freed pages go to the freelist, which db_size_bytes() excludes).
+    """
+    trimmed: dict[str, int] = {}
+    for _ in range(20):  # bounded: each pass removes BUDGET_TRIM_FRACTION of a table
+        if db_size_bytes(cur) <= budget or dry_run:
+            break
+        sizes = sorted(
+            ((table_bytes(cur, t), t) for t in RETENTION_POLICIES if _table_columns(cur, t)),
+            reverse=True)
+        if not sizes or sizes[0][0] == 0:
+            break
+        table = sizes[0][1]
+        count = cur.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        n = _evict_oldest(cur, table, max(1, int(count * BUDGET_TRIM_FRACTION)), False)
+        trimmed[table] = trimmed.get(table, 0) + n
+        cur.connection.commit()
+    return trimmed
+
+
+def vacuum_step(cur, pages: int = INCREMENTAL_VACUUM_PAGES) -> dict:
+    """Checkpoint the WAL and give free pages back (incremental auto_vacuum only)."""
+    mode = cur.execute("PRAGMA auto_vacuum").fetchone()[0]  # 0 none, 1 full, 2 incremental
+    free_before = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    if mode == 2 and free_before:
+        cur.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    cur.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    free_after = cur.execute("PRAGMA freelist_count").fetchone()[0]
+    return {"auto_vacuum": mode, "freed_pages": free_before - free_after,
+            "free_pages": free_after}
+
+
+def full_vacuum(conn) -> None:
+    """Switch to incremental auto_vacuum and rebuild the file (blocks writers)."""
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def enforce(cur, *, budget: int = DB_BUDGET_BYTES, dry_run: bool = False) -> dict:
+    """Run every table policy, the size budget and the vacuum step. Returns a report."""
+    global _LAST_ENFORCED
+    t0 = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    ensure_access_columns(cur)
+
+    report = {"tables": {}, "size_before": db_size_bytes(cur)}
+    for table, policy in RETENTION_POLICIES.items():
+        if not _table_columns(cur, table):
+            continue
+        report["tables"][table] = apply_policy(
+            cur, table, policy, now=now, dry_run=dry_run)
+        if not dry_run:
+            cur.connection.commit()
+
+    report["budget_trim"] = _trim_to_budget(cur, budget, dry_run)
+    if not dry_run:
+        report["vacuum"] = vacuum_step(cur)
+    report["size_after"] = db_size_bytes(cur)
+    report["seconds"] = round(time.perf_counter() - t0, 3)
+    if not dry_run:
+        _LAST_ENFORCED = time.time()
+
+    evicted = sum(sum(v.values()) for v in report["tables"].values())
+    logger.info("[retention] %s%d rows over policy, size %.1f → %.1f MB in %.2fs",
+                "(dry run) " if dry_run else "", evicted,
+                report["size_before"] / MB, report["size_after"] / MB, report["seconds"])
+    return report
+
+
+def maybe_enforce(cur) -> dict | None:
+    """enforce() at most every ENFORCE_INTERVAL_SECONDS (per process)."""
+    if time.time() - _LAST_ENFORCED < ENFORCE_INTERVAL_SECONDS:
+        return None
+    return enforce(cur)
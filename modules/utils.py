@@ -1,6 +1,7 @@
 
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from flask import g, flash, has_request_context
 import json
@@ -10,9 +11,11 @@ from markupsafe import Markup
 from modules.fetch_all_tables import build_player_info
 from modules.fetch_fixtures import ensure_fixtures_for_gw
 from modules.fixtures_utils import build_team_fixture_cache
+from modules import bootstrap_cache, codec
+from modules.db import connect as db_connect, get_conn, release
 from modules.http_client import HTTP
+from modules.live_cache import get_live_gameweeks
 import requests
-import sqlite3
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +30,7 @@ _ES_CACHE = {
     "sig": None, "at": None, "maintenance": False, "message": None
 }
 # _ES_CACHE = {"ts": None, "at": None, "live": False}
+_ES_LOCK = threading.Lock()  # one poll at a time per process; callers get a copy
 LIVE_TTL_SECONDS = 30  # advance freshness at most every 30s while live
 STATIC_TTL_SECONDS = 60 * 60  # 1 hour is plenty (even 6–12h is fine)
 
@@ -34,6 +38,18 @@ TIMEOUT_SHORT = (3, 6)   # connect, read
 TIMEOUT_MED = (3, 8)
 TIMEOUT_LONG = (3, 12)
 
+# In-memory static_player_info, per gw_key:
+#   {"digest", "points_key", "blob", "stamp"}
+# The base blob (build_player_info over bootstrap) is rebuilt only when the
+# bootstrap content hash changes; a GW blob only when that hash or its
+# global-points key (event_updated) changes. Blobs are shared — read-only.
+_BASE_BLOB: tuple[str, dict] | None = None
+_PLAYER_BLOBS: dict[int, dict] = {}
+_PLAYER_BLOB_LOCK = threading.Lock()
+# DB snapshots are written here, off the request path (one writer, in order)
+_SNAPSHOT_WRITER = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="static-snapshot")
+
 # utils.py
 
 
@@ -78,12 +94,9 @@ def get_json_cached(url, *, timeout=10):
 
 
 def open_conn(path):
-    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
-    # Make SQLite friendlier under parallel requests
-    conn.execute("PRAGMA journal_mode=WAL;")
-    conn.execute("PRAGMA synchronous=NORMAL;")
-    conn.execute("PRAGMA busy_timeout=10000;")  # ms
-    return conn
+    # Standalone connection with the shared PRAGMAs (see modules/db.py);
+    # hot paths lease the thread's pooled connection via get_conn() instead
+    return db_connect(path)
 
 
 # Helper to validate team ID
@@ -118,11 +131,17 @@ def validate_team_id(team_id, max_users):
 
 # Helper to fetch `MAX_USERS`
 def get_max_users():
-    # 1) try DB cache
+    # 1) try process cache, then DB cache
+    boot = bootstrap_cache.current()
+    if boot is not None:
+        return boot.data.get("total_players") or 11_000_000
     try:
-        conn = open_conn(DATABASE)
-        row = conn.execute(
-            "SELECT data FROM static_data WHERE key='bootstrap'").fetchone()
+        conn = get_conn(DATABASE)
+        try:
+            row = conn.execute(
+                "SELECT data FROM static_data WHERE key='bootstrap'").fetchone()
+        finally:
+            release(conn)
         if row:
             return json.loads(row[0]).get("total_players") or 11_000_000
     except Exception:
@@ -134,7 +153,16 @@ def get_max_users():
 # Helper to fetch current gameweek
 
 
-def get_event_status(force: bool = False):
+def get_event_status(force: bool = False) -> dict:
+    """
+    This process's view of /event-status/ (re-polled at most every 30s).
+    Request handlers read the shared copy in modules/event_watch.py instead.
+    """
+    with _ES_LOCK:
+        return dict(_poll_event_status(force))
+
+
+def _poll_event_status(force: bool):
     now = datetime.now(timezone.utc)
 
     # 1) Manual override FIRST
@@ -158,7 +186,7 @@ def get_event_status(force: bool = False):
 
     # 3) Normal fetch + parse
     try:
-        r = HTTP.get(FPL_EVENT_STATUS_URL, timeout=10)
+        r = HTTP.conditional_get(FPL_EVENT_STATUS_URL, timeout=10)
         if r.status_code == 503:
             _ES_CACHE.update({
                 "maintenance": True,
@@ -170,6 +198,12 @@ def get_event_status(force: bool = False):
             return _ES_CACHE
 
         r.raise_for_status()
+
+        # 304 → same payload as last time: same sig, nothing to re-parse
+        if r.not_modified and _ES_CACHE.get("sig"):
+            _ES_CACHE.update({"at": now, "maintenance": False})
+            return _ES_CACHE
+
         js = r.json()
 
         # ---- robust parsing ----
@@ -270,7 +304,8 @@ _last_event_updated = None
 def init_last_event_updated():
     """Initialize _last_event_updated from the DB on startup."""
     global _last_event_updated
-    with sqlite3.connect(DATABASE, check_same_thread=False) as conn:
+    conn = db_connect(DATABASE)
+    try:
         cursor = conn.cursor()
         # Look for the newest last_fetched across all tables
         cursor.execute("""
@@ -291,6 +326,8 @@ def init_last_event_updated():
             _last_event_updated = datetime.fromisoformat(row[0])
         else:
             _last_event_updated = datetime.now(timezone.utc)
+    finally:
+        conn.close()
 
     logger.debug(f"✅ Initialized _last_event_updated={_last_event_updated}")
 
@@ -315,16 +352,36 @@ def get_static_data(
 
     now_utc = datetime.now(timezone.utc)
 
-    conn = open_conn(DATABASE)
-    cur = conn.cursor()
+    conn = get_conn(DATABASE)
+    try:
+        return _get_static_data(
+            conn, force_refresh, current_gw, event_updated, event_updated_iso,
+            now_utc, include_global_points, hydrate_fixtures, fixtures_lookahead)
+    finally:
+        release(conn)
 
-    # 1) Load bootstrap-static (TTL-based, not event-status-based)
-    cur.execute(
-        "SELECT data, last_fetched FROM static_data WHERE key='bootstrap'")
-    row = cur.fetchone()
 
+def _get_static_data(conn, force_refresh, current_gw, event_updated, event_updated_iso,
+                     now_utc, include_global_points, hydrate_fixtures, fixtures_lookahead):
+    cur = conn.cursor()
+
+    # 1) Load bootstrap-static (TTL-based, not event-status-based):
+    #    process memory → SQLite row → network. Parsed once per content change
+    #    (see modules/bootstrap_cache.py).
     need_fetch_static = True
     static_data = None
+    row = None
+
+    boot = bootstrap_cache.current()
+    if boot and not force_refresh and boot.age_seconds(now_utc) < STATIC_TTL_SECONDS:
+        logger.debug(
+            "✅ [get_static_data] bootstrap-static in memory within TTL → using it")
+        static_data = boot.data
+        need_fetch_static = False
+    else:
+        cur.execute(
+            "SELECT data, last_fetched FROM static_data WHERE key='bootstrap'")
+        row = cur.fetchone()
 
     if row and not force_refresh:
         data_str, last_ts = row
@@ -336,36 +393,67 @@ def get_static_data(
         if age < STATIC_TTL_SECONDS:
             logger.debug(
                 "✅ [get_static_data] bootstrap-static within TTL → using cache (no bump)")
-            static_data = json.loads(data_str)
+            static_data = bootstrap_cache.publish_raw(
+                data_str, cached_time).data
             need_fetch_static = False
 
     if need_fetch_static:
         logger.debug(
             "⚠️ [get_static_data] bootstrap-static TTL expired (or no row/force) → fetching")
-        resp = HTTP.get(FPL_STATIC_URL, timeout=TIMEOUT_MED)
+        resp = HTTP.conditional_get(FPL_STATIC_URL, timeout=TIMEOUT_MED)
         resp.raise_for_status()
-        static_data = resp.json()
-        cur.execute(
-            "REPLACE INTO static_data (key, data, last_fetched) VALUES (?, ?, ?)",
-            ("bootstrap", json.dumps(static_data), now_utc.isoformat())
-        )
+        # Raw text is stored as-is (no re-serialisation); on a 304 it is the
+        # replayed body, so publishing it only extends freshness
+        raw = resp.text
+        static_data = bootstrap_cache.publish_raw(raw, now_utc).data
+        if resp.not_modified and row:
+            # 304: the stored row is still current — just extend its freshness
+            logger.debug(
+                "♻️ [get_static_data] bootstrap-static not modified → extending cache")
+            cur.execute(
+                "UPDATE static_data SET last_fetched = ? WHERE key = 'bootstrap'",
+                (now_utc.isoformat(),))
+        else:
+            cur.execute(
+                "REPLACE INTO static_data (key, data, last_fetched) VALUES (?, ?, ?)",
+                ("bootstrap", raw, now_utc.isoformat())
+            )
 
     # 2) Decide key
     gw_key = current_gw if (isinstance(current_gw, int)
                             and current_gw >= 1) else -1
 
-    # 3) Build static blob (derived / denormalised view of bootstrap)
-    static_blob = build_player_info(static_data)
-
-    # 4) Populate global points only when season started AND requested
-    if include_global_points and current_gw != -1:
-        fill_global_points_from_explain(
-            static_blob=static_blob,
-            current_gw=gw_key,
-            event_updated_iso=event_updated_iso,
-            conn=conn,
-            cur=cur
-        )
+    # 3) Static blob (derived / denormalised view of bootstrap), reused from
+    #    memory unless the bootstrap content or the global-points key changed
+    boot = bootstrap_cache.indexes_for(static_data)
+    want_points = bool(include_global_points and current_gw != -1)
+    points_key = event_updated_iso if want_points else None
+    entry = _PLAYER_BLOBS.get(gw_key)
+    rebuild = not (
+        entry and boot.digest and entry["digest"] == boot.digest
+        and (points_key is None or entry["points_key"] == points_key)
+    )
+
+    if rebuild:
+        base_blob = _base_player_blob(boot)
+        static_blob = {pid: dict(row) for pid, row in base_blob.items()}
+
+        # 4) Populate global points only when season started AND requested
+        if want_points:
+            fill_global_points_from_explain(
+                static_blob=static_blob,
+                current_gw=gw_key,
+                event_updated_iso=event_updated_iso,
+                conn=conn,
+                cur=cur
+            )
+        entry = {"digest": boot.digest, "points_key": points_key,
+                 "blob": static_blob, "stamp": now_utc}
+        with _PLAYER_BLOB_LOCK:
+            _PLAYER_BLOBS[gw_key] = entry
+    elif force_refresh:
+        # Re-validated against upstream: same content, fresher stamp
+        entry["stamp"] = max(entry["stamp"], now_utc)
 
     # 4.5) Hydrate fixtures per request (optional, event-aware)
     if hydrate_fixtures and has_request_context():
@@ -385,66 +473,111 @@ def get_static_data(
             logger.warning("[fixtures] hydrate failed: %s", e)
             g.fixtures_cache = {}
 
-    # 5) Snapshot for routes to read (write only when we fetched fresh or first init)
-    should_write_snapshot = bool(need_fetch_static or force_refresh)
-    if not should_write_snapshot:
-        cur.execute(
-            "SELECT 1 FROM static_player_info WHERE gameweek = ?", (gw_key,))
-        if not cur.fetchone():
-            logger.debug(
-                "🆕 [get_static_data] initialising static_player_info row for gw=%s", gw_key)
-            should_write_snapshot = True
-
-    if should_write_snapshot:
-        snapshot_time = now_utc.isoformat()
-        cur.execute("""
-            INSERT OR REPLACE INTO static_player_info (gameweek, data, last_fetched)
-            VALUES (?, ?, ?)
-        """, (gw_key, json.dumps(static_blob), snapshot_time))
-        logger.debug(
-            "💾 [get_static_data] Wrote static_player_info (last_fetched=%s) gw=%s", snapshot_time, gw_key)
+    # 5) Snapshot for other processes (write only when rebuilt or re-validated),
+    #    serialised and written in the background
+    if rebuild or force_refresh:
+        _SNAPSHOT_WRITER.submit(
+            _write_player_snapshot, gw_key, entry["blob"], entry["stamp"].isoformat())
     else:
         logger.debug(
             "🙅 [get_static_data] Skipped writing static_player_info (cache hit; no bump) gw=%s", gw_key)
 
     conn.commit()
-    conn.close()
     logger.debug("🔚 [get_static_data] finished")
     return static_data
 
 
-def prune_stale_data(conn, event_updated):
+def _base_player_blob(boot: bootstrap_cache.Bootstrap) -> dict:
+    """build_player_info() over bootstrap, once per bootstrap content hash."""
+    global _BASE_BLOB
+    base = _BASE_BLOB
+    if base is not None and boot.digest and base[0] == boot.digest:
+        return base[1]
+    logger.debug("🧱 [get_static_data] building player blob (%s)",
+                 boot.digest[:12] or "unpublished")
+    blob = build_player_info(boot.data)
+    if boot.digest:
+        _BASE_BLOB = (boot.digest, blob)
+    return blob
+
+
+def _write_player_snapshot(gw_key: int, blob: dict, stamp_iso: str) -> None:
+    try:
+        conn = get_conn(DATABASE)
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO static_player_info (gameweek, data, last_fetched)
+                VALUES (?, ?, ?)
+            """, (gw_key, codec.encode_for("static_player_info", blob), stamp_iso))
+            conn.commit()
+        finally:
+            release(conn)
+        logger.debug(
+            "💾 [get_static_data] Wrote static_player_info (last_fetched=%s) gw=%s", stamp_iso, gw_key)
+    except Exception as e:
+        logger.warning(
+            "[get_static_data] static_player_info write failed for gw=%s: %s", gw_key, e)
+
+
+def get_player_blob(gw_key: int, event_last_update: datetime | None = None, cur=None) -> dict | None:
     """
-    Delete stale rows from key tables and print comparisons for debugging.
+    Shared static_player_info blob for gw_key if built at/after
+    event_last_update: process memory first, then (with `cur`) the snapshot
+    another process wrote. None when missing or stale. Read-only.
     """
-    tables = ["team_player_info", "mini_league_breakdown_cache",
-              "mini_league_summary_cache" "managers"]
+    entry = _PLAYER_BLOBS.get(gw_key)
+    if entry and (event_last_update is None or entry["stamp"] >= event_last_update):
+        return entry["blob"]
+    if cur is None:
+        return None
 
-    for table in tables:
-        logger.debug(f"🧹 [prune_stale_data] Checking table: {table}")
+    cur.execute(
+        "SELECT data, last_fetched FROM static_player_info WHERE gameweek=?", (gw_key,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    try:
+        stamp = datetime.fromisoformat(row[1])
+    except ValueError:
+        return None
+    if event_last_update is not None and stamp < event_last_update:
+        return None
+    blob = codec.decode(row[0], int_keys=True)
+    with _PLAYER_BLOB_LOCK:
+        cached = _PLAYER_BLOBS.get(gw_key)
+        if cached is None or cached["stamp"] < stamp:
+            _PLAYER_BLOBS[gw_key] = {"digest": None, "points_key": None,
+                                     "blob": blob, "stamp": stamp}
+    return blob
+
+
+def get_bootstrap() -> bootstrap_cache.Bootstrap:
+    """Indexed bootstrap for this process, (re)loaded via get_static_data() when missing or past TTL."""
+    boot = bootstrap_cache.current()
+    if boot is None or boot.age_seconds() >= STATIC_TTL_SECONDS:
+        get_static_data(current_gw=-1, include_global_points=False)
+        boot = bootstrap_cache.current()
+    return boot
 
-        # Show all rows with their timestamps before pruning
-        rows = conn.execute(f"SELECT rowid, * FROM {table}").fetchall()
-        for row in rows:
-            # assuming last_fetched is always last column
-            last_fetched = row[-1]
-            logger.debug(
-                f"   ➡️ Row {row[0]}: last_fetched={last_fetched} vs event_updated={event_updated}")
 
-            # Show whether this row will be deleted
-            if datetime.fromisoformat(last_fetched) < event_updated:
-                logger.debug(
-                    "      ❌ Will be deleted (older than event_updated)")
-            else:
-                logger.debug("      ✅ Will be kept (fresh enough)")
+def prune_stale_data(conn, event_updated):
+    """
+    Delete rows written before `event_updated` from the per-event caches.
+
+    Not part of the periodic cleanup — stale rows are still served while they
+    revalidate; size is governed by modules/retention.py. Kept for manual
+    resets after a bad upstream event.
+    """
+    tables = ["team_player_info", "mini_league_breakdown_cache",
+              "mini_league_summary_cache", "managers"]
 
-        # Perform actual deletion
+    for table in tables:
         deleted = conn.execute(
-            f"DELETE FROM {table} WHERE last_fetched < ?", (event_updated.isoformat(
-            ),)
+            f"DELETE FROM {table} WHERE last_fetched < ?", (event_updated.isoformat(),)
         ).rowcount
         logger.debug(
             f"🗑️ [prune_stale_data] Deleted {deleted} stale rows from {table}")
+    conn.commit()
 
 
 # Fetch static Player’s Detailed Data
@@ -635,6 +768,68 @@ def apply_points_payload(static_blob: dict, payload: dict) -> None:
 # New function to add points per category for points table for player_info_static
 
 
+GLOBAL_POINTS_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS global_points_cache (
+    gameweek     INTEGER PRIMARY KEY,
+    finished     INTEGER NOT NULL DEFAULT 0,
+    data         BLOB NOT NULL,
+    last_fetched TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_global_points_cache_last_fetched ON global_points_cache(last_fetched);
+"""
+
+_GLOBAL_POINTS_SCHEMA_READY = False
+
+
+def ensure_global_points_schema(cur):
+    """Create global_points_cache; the old event_updated-keyed table is dropped (cache only)."""
+    global _GLOBAL_POINTS_SCHEMA_READY
+    if _GLOBAL_POINTS_SCHEMA_READY:
+        return
+    cols = {r[1] for r in cur.execute("PRAGMA table_info(global_points_cache)")}
+    if cols and "gameweek" not in cols:
+        logger.info("[global_points] dropping legacy event_updated-keyed cache")
+        cur.execute("DROP TABLE global_points_cache")
+    cur.executescript(GLOBAL_POINTS_SCHEMA_SQL)
+    _GLOBAL_POINTS_SCHEMA_READY = True
+
+
+def sum_explain_points(live_gws) -> dict[int, dict[str, int]]:
+    """
+    {pid: {field: points}} summed over `live_gws` (LiveGameweek objects).
+
+    Explain points are stored flattened per GW as *_points columns (indexed
+    by element id, named like the fields), so this is a sum of columns.
+    """
+    fields = tuple(EXPLAIN_TO_FIELD.values())
+    totals: dict[str, list[int]] = {f: [] for f in fields}
+    seen: set[int] = set()
+    for live_gw in live_gws:
+        seen.update(live_gw.element_ids)
+        for f in fields:
+            acc, col = totals[f], live_gw.columns[f]
+            if len(acc) < len(col):
+                acc.extend([0] * (len(col) - len(acc)))
+            for pid, pts in enumerate(col):
+                acc[pid] += pts
+    return {pid: {f: totals[f][pid] for f in fields} for pid in sorted(seen)}
+
+
+def add_points_payloads(*payloads: dict) -> dict[int, dict[str, int]]:
+    """Element-wise sum of {pid: {field: points}} payloads (pids as ints, even if stored as str)."""
+    out: dict[int, dict[str, int]] = {}
+    for payload in payloads:
+        for pid, pts in payload.items():
+            pid = int(pid)
+            acc = out.get(pid)
+            if acc is None:
+                out[pid] = dict(pts)
+            else:
+                for fld, val in pts.items():
+                    acc[fld] = acc.get(fld, 0) + val
+    return out
+
+
 def fill_global_points_from_explain(
     *,
     static_blob: dict,
@@ -643,17 +838,23 @@ def fill_global_points_from_explain(
     conn=None,
     cur=None,
     db_path: str | None = None,
-    max_workers: int = 8,
-    request_timeout: int = 6,
 ) -> None:
     """
-    Populate per-player cumulative points by aggregating the 'explain' blocks
-    from /api/event/{gw}/live/ for gw = 1..current_gw.
+    Populate per-player cumulative points by summing the flattened 'explain'
+    points (*_points live columns) of /api/event/{gw}/live/ for
+    gw = 1..current_gw (via the shared live store, so finished GWs are never
+    downloaded again).
 
     If `conn`/`cur` are provided, uses them (no commit/close here).
     Otherwise opens its own connection (requires db_path), and commits/closes.
 
-    Caches the aggregated payload in global_points_cache keyed by event_updated_iso.
+    global_points_cache is keyed by gameweek and holds at most two rows:
+      • finished=1: season totals through the last finished GW — frozen, and
+        extended (never recomputed) when another GW finishes;
+      • finished=0: the live GW's own points, recomputed when its row is older
+        than event_updated_iso.
+    The season total is their sum. Superseded rows are deleted as new ones
+    are written.
     """
     if not current_gw or current_gw < 1:
         logger.debug("[global_points] no current_gw yet → skip")
@@ -664,113 +865,86 @@ def fill_global_points_from_explain(
     if conn is None or cur is None:
         if not db_path:
             db_path = DATABASE
-        conn = open_conn(db_path)  # applies PRAGMAs
+        conn = get_conn(db_path)
         cur = conn.cursor()
         close_after = True
 
-    # Ensure cache table exists
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS global_points_cache (
-            event_updated TEXT PRIMARY KEY,
-            data         TEXT NOT NULL,
-            last_fetched TEXT NOT NULL
-        )
-    """)
-
-    # Cache hit?
-    cur.execute(
-        "SELECT data FROM global_points_cache WHERE event_updated = ?",
-        (event_updated_iso,),
-    )
-    row = cur.fetchone()
-    if row:
-        logger.debug("[global_points] cache hit")
+    try:
+        ensure_global_points_schema(cur)
+        now_iso = datetime.now(timezone.utc).isoformat()
         try:
-            payload = json.loads(row[0])
-            apply_points_payload(static_blob, payload)
-            # Derive counts from points on cache hit
-            for base in static_blob.values():
-                pts_dc = int(base.get("defensive_contribution_points", 0) or 0)
-                base["defensive_contribution_count"] = pts_dc // 2
-        finally:
-            if close_after:
-                conn.commit()
-                conn.close()
-        return
-
-    logger.debug(
-        "[global_points] cache miss → fetching explain for all GWs (1..%d)",
-        current_gw,
-    )
-
-    urls = {
-        gw: f"https://fantasy.premierleague.com/api/event/{gw}/live/"
-        for gw in range(1, current_gw + 1)
-    }
+            event_updated = datetime.fromisoformat(event_updated_iso)
+        except (TypeError, ValueError):
+            event_updated = None
 
-    # pid -> { field -> points }
-    payload: dict[int, dict[str, int]] = {}
-
-    def ensure(pid: int) -> dict[str, int]:
-        if pid not in payload:
-            payload[pid] = {v: 0 for v in EXPLAIN_TO_FIELD.values()}
-        return payload[pid]
-
-    # Use a sensible connect/read timeout; allow caller to tweak read
-    timeout_val = (3, request_timeout)
-
-    # Fetch concurrently
-    from concurrent.futures import ThreadPoolExecutor, as_completed  # local import ok
-    with ThreadPoolExecutor(max_workers=max_workers) as ex:
-        futs = {
-            ex.submit(HTTP.get, url, timeout=timeout_val): gw
-            for gw, url in urls.items()
-        }
+        # 1) Frozen totals through the last finished GW (extend if behind)
+        cur.execute("""
+            SELECT gameweek, data FROM global_points_cache
+            WHERE finished = 1 AND gameweek < ?
+            ORDER BY gameweek DESC LIMIT 1
+        """, (current_gw,))
+        row = cur.fetchone()
+        frozen_gw, frozen = (row[0], codec.decode(row[1], int_keys=True)) if row else (0, {})
+        if frozen_gw < current_gw - 1:
+            todo = range(frozen_gw + 1, current_gw)
+            logger.debug("[global_points] folding finished GWs %s..%s into totals",
+                         todo.start, todo.stop - 1)
+            live_data_map = get_live_gameweeks(
+                cur, todo, FPL_API_BASE, current_gw=current_gw)
+            if len(live_data_map) == len(todo) and all(
+                    gwv.finished for gwv in live_data_map.values()):
+                frozen = add_points_payloads(
+                    frozen, sum_explain_points(live_data_map.values()))
+                frozen_gw = current_gw - 1
+                cur.execute(
+                    "INSERT OR REPLACE INTO global_points_cache (gameweek, finished, data, last_fetched) VALUES (?, 1, ?, ?)",
+                    (frozen_gw, codec.encode_for("global_points_cache", frozen), now_iso),
+                )
+                cur.execute(
+                    "DELETE FROM global_points_cache WHERE finished = 1 AND gameweek < ?", (frozen_gw,))
+            else:
+                # Some finished GW could not be loaded in its final form: don't freeze it
+                frozen = add_points_payloads(
+                    frozen, sum_explain_points(live_data_map.values()))
 
-        for fut in as_completed(futs):
-            gw = futs[fut]
+        # 2) The live GW's own points (recomputed once per event-status change)
+        cur.execute(
+            "SELECT data, last_fetched FROM global_points_cache WHERE gameweek = ? AND finished = 0",
+            (current_gw,))
+        row = cur.fetchone()
+        live_payload = None
+        if row:
             try:
-                resp = fut.result()
-                resp.raise_for_status()
-                data = resp.json()
-            except Exception as e:
-                logger.warning("[global_points] GW %s fetch failed: %s", gw, e)
-                continue
-
-            # Aggregate per element
-            for el in data.get("elements", []) or []:
-                pid = el.get("id")
-                if not isinstance(pid, int):
-                    continue
-                tgt = ensure(pid)
-                # 'explain' is a list of blocks, each with 'stats'
-                for blk in el.get("explain", []) or []:
-                    for s in blk.get("stats", []) or []:
-                        ident = s.get("identifier")
-                        dst = EXPLAIN_TO_FIELD.get(ident)
-                        if not dst:
-                            continue
-                        try:
-                            pts = int(s.get("points", 0) or 0)
-                        except (TypeError, ValueError):
-                            pts = 0
-                        tgt[dst] += pts
-
-    # Persist cache
-    cur.execute(
-        "INSERT OR REPLACE INTO global_points_cache (event_updated, data, last_fetched) VALUES (?, ?, ?)",
-        (event_updated_iso, json.dumps(payload),
-         datetime.now(timezone.utc).isoformat()),
-    )
-
-    if close_after:
-        conn.commit()
-        conn.close()
+                fresh = event_updated is None or datetime.fromisoformat(row[1]) >= event_updated
+            except ValueError:
+                fresh = False
+            if fresh:
+                logger.debug("[global_points] live GW %s cache hit", current_gw)
+                live_payload = codec.decode(row[0], int_keys=True)
+        if live_payload is None:
+            logger.debug("[global_points] live GW %s cache miss → recomputing", current_gw)
+            live_gw = get_live_gameweeks(
+                cur, [current_gw], FPL_API_BASE, current_gw=current_gw).get(current_gw)
+            if live_gw is None:
+                # Not loadable right now: fall back to the previous row, don't cache
+                live_payload = codec.decode(row[0], int_keys=True) if row else {}
+            else:
+                live_payload = sum_explain_points([live_gw])
+                cur.execute(
+                    "INSERT OR REPLACE INTO global_points_cache (gameweek, finished, data, last_fetched) VALUES (?, 0, ?, ?)",
+                    (current_gw, codec.encode_for("global_points_cache", live_payload), now_iso),
+                )
+                cur.execute(
+                    "DELETE FROM global_points_cache WHERE finished = 0 AND gameweek <> ?", (current_gw,))
+    finally:
+        if close_after:
+            conn.commit()
+            release(conn)
 
     # Apply to in-memory blob for immediate use by the request
-    apply_points_payload(static_blob, payload)
+    apply_points_payload(static_blob, add_points_payloads(frozen, live_payload))
 
-    # Derive counts from points on fresh fetch (parity with cache-hit path)
+    # Derive counts from points
     for base in static_blob.values():
         pts_dc = int(base.get("defensive_contribution_points", 0) or 0)
         base["defensive_contribution_count"] = pts_dc // 2
@@ -227,7 +227,13 @@ window.updateBadges = (data) => {
 };
 
 // ─────────────── 6) Mini-league branch ───────────────
-async function fetchMiniLeague(sortBy, sortOrder) {
+// The server answers with cached rows (meta.stale) while it rebuilds them;
+// re-fetch quietly a few times until the fresh copy is in.
+const STALE_POLL_MS = 4000;
+const STALE_POLL_MAX = 5;
+
+async function fetchMiniLeague(sortBy, sortOrder, opts = {}) {
+  const { background = false } = opts;
   const cfg = window.tableConfig;
   if (!cfg || cfg.table !== "mini_league") return false;
 
@@ -235,8 +241,11 @@ async function fetchMiniLeague(sortBy, sortOrder) {
   const loading = document.querySelector(cfg.loadingSelector);
   if (!tbody) return false;
 
-  if (loading) loading.style.display = "block";
-  tbody.style.display = "none";
+  if (!background) {
+    cfg.stalePolls = 0;
+    if (loading) loading.style.display = "block";
+    tbody.style.display = "none";
+  }
 
   // New
   const qs = new URLSearchParams({ max_show: String(cfg.maxShow) });
@@ -309,10 +318,58 @@ async function fetchMiniLeague(sortBy, sortOrder) {
   if (loading) loading.style.display = "none";
   tbody.style.display = "";
 
+  if (data.meta?.stale && (cfg.stalePolls || 0) < STALE_POLL_MAX) {
+    cfg.stalePolls = (cfg.stalePolls || 0) + 1;
+    setTimeout(() => {
+      // fetchMiniLeague reads window.tableConfig synchronously on entry
+      const prev = window.tableConfig;
+      window.tableConfig = cfg;
+      fetchMiniLeague(cfg.sortBy ?? sortBy, cfg.sortOrder ?? sortOrder, {
+        background: true,
+      });
+      window.tableConfig = prev;
+    }, STALE_POLL_MS);
+  }
+
   return true;
 }
 
 // ─────────────── 7) Generic data fetch ─────────────
+// Fields every row renderer reads besides its column keys (matches
+// ROW_FIELDS in modules/aggregate_data.py); cfg.fields adds more
+const ROW_FIELDS = ["photo", "team_code", "team_name", "web_name", "element_type"];
+
+function projectionFields(cfg) {
+  const keys = new Set([...ROW_FIELDS, ...(cfg.fields || [])]);
+  cfg.columns.forEach((col) => col.key && keys.add(col.key));
+  return [...keys];
+}
+
+// "Show more" under paged tables (cfg.pageSize); fetches and appends the next page
+function updateLoadMore(cfg, sortBy, sortOrder, shown, total, page) {
+  const table = document.querySelector(cfg.tbodySelector)?.closest("table");
+  if (!table) return;
+  let btn = document.getElementById("load-more");
+  if (!cfg.pageSize || shown >= total) {
+    if (btn) btn.style.display = "none";
+    return;
+  }
+  if (!btn) {
+    btn = document.createElement("button");
+    btn.id = "load-more";
+    btn.type = "button";
+    btn.className = "btn btn-outline-secondary btn-sm my-2";
+    (table.closest(".table-responsive") || table).insertAdjacentElement(
+      "afterend",
+      btn
+    );
+  }
+  btn.textContent = `Show more (${shown} of ${total})`;
+  btn.style.display = "";
+  btn.onclick = () =>
+    fetchData(sortBy, sortOrder, { page: page + 1, snapPrice: false });
+}
+
 async function fetchData(sortBy, sortOrder, opts = {}) {
   const { snapPrice = true } = opts;
 
@@ -387,10 +444,28 @@ async function fetchData(sortBy, sortOrder, opts = {}) {
     params.max_minutes = maxMin;
   }
 
+  // Only this table's columns, and one page at a time where configured
+  params.fields = projectionFields(cfg).join(",");
+  if (cfg.pageSize) {
+    params.page = opts.page || 1;
+    params.page_size = cfg.pageSize;
+  }
+
   const qs = new URLSearchParams(params);
   const resp = await fetch(`${cfg.url}&${qs}`);
-  const { players, players_images, is_truncated, manager, price_range } =
-    await resp.json();
+  const {
+    players,
+    players_images,
+    is_truncated,
+    manager,
+    price_range,
+    total,
+    page = 1,
+    page_size,
+  } = await resp.json();
+  const count = total ?? players.length;
+  const append = page > 1;
+  const offset = append ? (page - 1) * page_size : 0;
 
   if (price_range && price_range.min != null && price_range.max != null) {
     updatePriceSliderRange(
@@ -401,18 +476,19 @@ async function fetchData(sortBy, sortOrder, opts = {}) {
   }
 
   document.getElementById("entries").textContent =
-    players.length === 1
+    count === 1
       ? "1 entry"
       : ["teams", "talisman"].includes(cfg.table) || !is_truncated
-      ? `${players.length} entries`
-      : players.length === 100
+      ? `${count} entries`
+      : count === 100
       ? "100+ entries"
-      : `${players.length} entries`;
+      : `${count} entries`;
 
-  updateTopPlayersText(players.length, is_truncated, cfg.table);
+  updateTopPlayersText(count, is_truncated, cfg.table);
 
-  tbody.innerHTML = "";
-  players.forEach((p, idx) => {
+  if (!append) tbody.innerHTML = "";
+  players.forEach((p, i) => {
+    const idx = offset + i;
     const tr = document.createElement("tr");
     tr.classList.add(
       "vert-border",
@@ -446,12 +522,15 @@ async function fetchData(sortBy, sortOrder, opts = {}) {
     // NOTE: no per-cell tooltip init needed anymore; delegation handles it
   });
 
-  if (cfg.table === "teams") {
-    updateBadges({ players_images }); // teams table have just club badges
-  } else {
-    updatePlayerImages({ players_images });
+  if (!append) {
+    if (cfg.table === "teams") {
+      updateBadges({ players_images }); // teams table have just club badges
+    } else {
+      updatePlayerImages({ players_images });
+    }
   }
   updateSortIndicator(sortBy, sortOrder);
+  updateLoadMore(cfg, sortBy, sortOrder, offset + players.length, count, page);
 
   if (loading) loading.style.display = "none";
   tbody.style.display = "";
@@ -0,0 +1,43 @@
+# tests/test_aggregate_data.py
+from werkzeug.datastructures import MultiDict
+
+from modules.aggregate_data import MAX_PAGE_SIZE, ROW_FIELDS, paginate_players, project_players
+
+PLAYERS = [{"web_name": f"p{i}", "photo": "x", "team_code": 1, "element_type": 2,
+            "total_points": i, "goals_scored": i % 3, "minutes": 90} for i in range(1200)]
+
+
+def _page(**args):
+    return paginate_players(PLAYERS, MultiDict({k: str(v) for k, v in args.items()}))
+
+
+def test_paginate_without_page_size_returns_everything():
+    rows, total, page, page_size = _page()
+    assert rows is PLAYERS and (total, page, page_size) == (1200, 1, 1200)
+    assert _page(page_size=0)[0] is PLAYERS
+    assert _page(page_size=-5)[0] is PLAYERS
+
+
+def test_paginate_pages_and_bounds():
+    rows, total, page, page_size = _page(page=2, page_size=50)
+    assert [r["web_name"] for r in rows] == [f"p{i}" for i in range(50, 100)]
+    assert (total, page, page_size) == (1200, 2, 50)
+
+    assert _page(page=0, page_size=50)[2] == 1               # clamped to the first page
+    assert _page(page=-3, page_size=50)[0] == PLAYERS[:50]
+    assert _page(page=99, page_size=50)[0] == []             # past the end
+    assert _page(page=24, page_size=50)[0] == PLAYERS[1150:]
+
+    rows, _, _, page_size = _page(page_size=10_000)          # capped
+    assert page_size == MAX_PAGE_SIZE and len(rows) == MAX_PAGE_SIZE
+
+
+def test_project_keeps_requested_fields_row_fields_and_sort_key():
+    args = MultiDict({"fields": "minutes,,missing", "sort_by": "total_points"})
+    rows = project_players(PLAYERS[:2], args)
+    assert set(rows[0]) == set(ROW_FIELDS) - {"team_name"} | {"minutes", "total_points"}
+    assert rows[1]["total_points"] == 1
+
+
+def test_project_without_fields_returns_rows_whole():
+    assert project_players(PLAYERS, MultiDict()) is PLAYERS
@@ -0,0 +1,120 @@
+# tests/test_cache_builders.py
+import sqlite3
+import time
+
+from flask import Flask, url_for
+
+from modules import cache_builders, codec
+
+
+def _wait_for_revalidation(key, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with cache_builders._REVALIDATING_LOCK:
+            if key not in cache_builders._REVALIDATING:
+                return
+        time.sleep(0.01)
+    raise AssertionError("background revalidation did not finish")
+
+
+def test_background_revalidation_writes_row(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "cache.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE mini_league_summary_cache (
+                league_id INTEGER NOT NULL, gameweek INTEGER NOT NULL,
+                max_show INTEGER NOT NULL, data TEXT NOT NULL,
+                last_fetched TEXT NOT NULL, event_gen INTEGER,
+                PRIMARY KEY (league_id, gameweek, max_show))
+        """)
+
+    app = Flask(__name__)
+
+    @app.route("/mini_leagues/<int:league_id>")
+    def mini_leagues(league_id):
+        return ""
+
+    def fake_league(league_id, max_show, **kwargs):
+        # Like build_manager: manager rows link to their national league
+        return [{"entry": 1, "national_league_url": url_for("mini_leagues", league_id=7)}]
+
+    monkeypatch.setattr(cache_builders, "DATABASE", db_path)
+    monkeypatch.setattr(cache_builders, "get_live_points", lambda gw, cur: {})
+    monkeypatch.setattr(cache_builders, "get_team_ids_from_league", fake_league)
+
+    assert cache_builders.revalidate_league_cache(app, "summary", 42, 5, 10, {}, 3)
+    _wait_for_revalidation(("summary", 42, 5, 10, 3))
+
+    with sqlite3.connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT data, event_gen FROM mini_league_summary_cache WHERE league_id = 42"
+        ).fetchone()
+    assert row is not None
+    assert row[1] == 3
+    assert codec.decode(row[0]) == [{"entry": 1, "national_league_url": "/mini_leagues/7"}]
+
+
+def test_rebuild_flights_are_per_generation(tmp_path, monkeypatch):
+    import threading
+
+    db_path = str(tmp_path / "cache.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            CREATE TABLE mini_league_summary_cache (
+                league_id INTEGER NOT NULL, gameweek INTEGER NOT NULL,
+                max_show INTEGER NOT NULL, data TEXT NOT NULL,
+                last_fetched TEXT NOT NULL, event_gen INTEGER,
+                PRIMARY KEY (league_id, gameweek, max_show))
+        """)
+
+    started, release_old = threading.Event(), threading.Event()
+    calls = []
+
+    def fake_league(league_id, max_show, **kwargs):
+        calls.append(len(calls))
+        if len(calls) == 1:           # the generation-1 build is slow
+            started.set()
+            release_old.wait(5)
+            return [{"entry": 1, "gen": 1}]
+        return [{"entry": 1, "gen": 2}]
+
+    monkeypatch.setattr(cache_builders, "get_live_points", lambda gw, cur: {})
+    monkeypatch.setattr(cache_builders, "get_team_ids_from_league", fake_league)
+
+    results = {}
+
+    def rebuild(gen):
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            results[gen] = codec.decode(cache_builders.rebuild_league_summary(
+                conn, 42, 5, 10, {}, event_gen=gen))
+        finally:
+            conn.close()
+
+    old = threading.Thread(target=rebuild, args=(1,))
+    old.start()
+    assert started.wait(5)
+    rebuild(2)                        # must not join the generation-1 flight
+    release_old.set()
+    old.join(5)
+
+    assert results[2] == [{"entry": 1, "gen": 2}]
+    assert len(calls) == 2
+
+
+def test_revalidation_is_queued_again_for_a_newer_generation(monkeypatch):
+    submitted = []
+
+    class _Pool:
+        def submit(self, fn, *args):
+            submitted.append(args[1])   # the job's key; never run
+
+    monkeypatch.setattr(cache_builders, "_REVALIDATOR", _Pool())
+    monkeypatch.setattr(cache_builders, "_REVALIDATING", set())
+
+    app = Flask(__name__)
+    assert cache_builders.revalidate_league_cache(app, "breakdown", 42, 5, 10, {}, 3)
+    assert not cache_builders.revalidate_league_cache(app, "breakdown", 42, 5, 10, {}, 3)
+    # The generation moved while the generation-3 job is still running
+    assert cache_builders.revalidate_league_cache(app, "breakdown", 42, 5, 10, {}, 4)
+    assert submitted == [("breakdown", 42, 5, 10, 3), ("breakdown", 42, 5, 10, 4)]
@@ -0,0 +1,41 @@
+# tests/test_codec.py
+import pickle
+
+import pytest
+
+from modules import codec
+from modules.utils import add_points_payloads, apply_points_payload
+
+POINTS = {5: {"bonus_points": 3, "goals_scored_points": 4}, 12: {"bonus_points": 1}}
+
+
+@pytest.mark.parametrize("name", ["json", "pickle", "pickle+zlib"])
+def test_round_trip_keeps_int_keys(name):
+    assert codec.decode(codec.encode(POINTS, name), int_keys=True) == POINTS
+
+
+def test_json_rows_need_int_keys():
+    assert set(codec.decode(codec.encode(POINTS, "json"))) == {"5", "12"}
+
+
+@pytest.mark.parametrize("name", ["json", "pickle+zlib"])
+def test_global_points_codec_override(name, monkeypatch):
+    monkeypatch.setenv("FPL_CACHE_CODEC", name)
+    stored = codec.encode_for("global_points_cache", POINTS)
+    assert codec.decode(stored, int_keys=True) == POINTS
+
+
+def test_unpickler_refuses_globals():
+    evil = codec.MAGIC + b"p" + pickle.dumps(pickle.loads)
+    with pytest.raises(pickle.UnpicklingError):
+        codec.decode(evil)
+
+
+def test_add_points_payloads_merges_str_and_int_keys():
+    frozen = codec.decode(codec.encode(POINTS, "json"))      # str keys
+    total = add_points_payloads(frozen, {5: {"bonus_points": 2}})
+    assert total == {5: {"bonus_points": 5, "goals_scored_points": 4}, 12: {"bonus_points": 1}}
+
+    blob = {5: {}, 12: {}}
+    apply_points_payload(blob, total)
+    assert blob[5]["bonus_points"] == 5 and blob[12]["bonus_points"] == 1
@@ -0,0 +1,56 @@
+# tests/test_compression.py
+import gzip
+
+import pytest
+from flask import Flask, url_for
+
+from modules import compression
+
+
+@pytest.fixture
+def client(tmp_path):
+    static = tmp_path / "static"
+    (static / "js").mkdir(parents=True)
+    (static / "js" / "app.js").write_text("console.log('hi');\n" * 200)
+    (static / "logo.png").write_bytes(b"\x89PNG")
+    secret = tmp_path / "secret"
+    secret.mkdir()
+    (secret / "x.js").write_text("secret")
+
+    app = Flask(__name__, static_folder=str(static))
+    compression.init_app(app)
+    with app.test_request_context("/"):
+        app.config["APP_JS_URL"] = url_for("static", filename="js/app.js")
+    return app.test_client()
+
+
+@pytest.mark.parametrize("path", [
+    "/static/..%2fsecret%2fx.js",
+    "/static/../secret/x.js",
+    "/static/js/..%2f..%2fsecret%2fx.js",
+    "/static/..%5csecret%5cx.js",
+])
+def test_static_rejects_paths_outside_the_folder(client, path):
+    resp = client.get(path)
+    assert resp.status_code == 404
+    assert b"secret" not in resp.data
+
+
+def test_static_serves_hashed_precompressed_asset(client):
+    url = client.application.config["APP_JS_URL"]
+    assert "?v=" in url
+
+    resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "immutable" in resp.headers["Cache-Control"]
+    assert gzip.decompress(resp.data) == b"console.log('hi');\n" * 200
+
+    again = client.get(url, headers={"Accept-Encoding": "gzip",
+                                     "If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_static_falls_back_for_other_files(client):
+    assert client.get("/static/logo.png").data == b"\x89PNG"
+    assert client.get("/static/missing.js").status_code == 404
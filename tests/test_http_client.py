@@ -0,0 +1,51 @@
+# tests/test_http_client.py
+from modules import http_client
+from modules.http_client import RATE_LIMITS, TokenBucket, endpoint_class
+
+GUNICORN_TIMEOUT = 30
+
+
+def _cold_wait(kind: str, requests: int) -> float:
+    """Queue wait of the last of `requests` taken at once from a full bucket."""
+    bucket = TokenBucket(kind, *RATE_LIMITS[kind])
+    return max(bucket._reserve() for _ in range(requests))
+
+
+def test_cold_breakdown_fits_in_a_worker_timeout():
+    # 50 managers × 38 GWs of picks, a season of /live/, the managers' entries
+    assert _cold_wait("picks", 50 * 38) < GUNICORN_TIMEOUT - 5
+    assert _cold_wait("live", 38) == 0
+    assert _cold_wait("entry", 50) < 5
+
+
+def test_endpoint_classes():
+    api = "https://fantasy.premierleague.com/api"
+    assert endpoint_class(f"{api}/entry/1/event/3/picks/") == "picks"
+    assert endpoint_class(f"{api}/event/3/live/") == "live"
+    assert endpoint_class(f"{api}/entry/1/history/") == "entry"
+    assert endpoint_class(f"{api}/elsewhere/") == "other"
+
+
+def test_rate_limits_env_override(monkeypatch):
+    monkeypatch.setenv("FPL_RATE_LIMITS", "picks=10:20, live=2:4,bogus")
+    limits = http_client._rate_limits_from_env()
+    assert limits["picks"] == (10.0, 20)
+    assert limits["live"] == (2.0, 4)
+    assert limits["league"] == RATE_LIMITS["league"]
+
+
+def test_sqlite_bucket_shares_budget_and_penalty(tmp_path):
+    from modules.http_client import SQLiteTokenBucket
+
+    path = str(tmp_path / "limits.db")
+    a = SQLiteTokenBucket("picks", 1.0, 2, path)
+    b = SQLiteTokenBucket("picks", 1.0, 2, path)   # e.g. another worker
+
+    assert a._reserve() == 0 and b._reserve() == 0
+    assert b._reserve() > 0.9                      # the shared burst is spent
+    assert a._connect() is a._connect()            # one connection per thread
+
+    # A penalty recorded before the bucket's first reserve is not lost
+    c = SQLiteTokenBucket("live", 1.0, 2, path)
+    c.penalize(30)
+    assert c._reserve() > 25
@@ -0,0 +1,48 @@
+# tests/test_live_cache.py
+import sqlite3
+
+import pytest
+
+from modules import live_cache
+
+
+def _payload(bonus):
+    return {"elements": [{"id": 5, "stats": {"minutes": 90, "bonus": bonus,
+                                             "total_points": 6 + bonus}}]}
+
+
+@pytest.fixture
+def cur(tmp_path, monkeypatch):
+    monkeypatch.setattr(live_cache, "_MEM", {})
+    monkeypatch.setattr(live_cache, "_SCHEMA_READY", False)
+    conn = sqlite3.connect(str(tmp_path / "live.db"))
+    yield conn.cursor()
+    conn.close()
+
+
+def test_snapshot_taken_while_live_is_refetched_once_when_final(cur, monkeypatch):
+    fetches = []
+
+    def fake_fetch(urls, timeout=None):
+        fetches.append(list(urls))
+        bonus = 0 if len(fetches) == 1 else 3   # bonus lands after the first fetch
+        return {url: _payload(bonus) for url in fetches[-1]}
+
+    monkeypatch.setattr(live_cache, "fetch_json_many", fake_fetch)
+
+    # GW 3 while it is live: stored unfinished, no bonus yet
+    gwv = live_cache.get_live_gameweek(cur, 3, current_gw=3)
+    assert not gwv.finished and gwv.value("bonus", 5) == 0
+
+    # GW 4 is current: the live-era snapshot is not trusted as final
+    live_cache._MEM.clear()
+    gwv = live_cache.get_live_gameweek(cur, 3, current_gw=4)
+    assert len(fetches) == 2
+    assert gwv.finished and gwv.value("bonus", 5) == 3
+    assert cur.execute(
+        "SELECT finished FROM live_gameweeks WHERE gameweek = 3").fetchone() == (1,)
+
+    # ...and from then on it is frozen
+    live_cache._MEM.clear()
+    assert live_cache.get_live_gameweek(cur, 3, current_gw=5).value("bonus", 5) == 3
+    assert len(fetches) == 2
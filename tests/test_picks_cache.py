@@ -0,0 +1,69 @@
+# tests/test_picks_cache.py
+import sqlite3
+from datetime import datetime, timezone
+
+import pytest
+
+from modules import picks_cache
+
+
+class _Resp:
+    status_code = 200
+
+    def __init__(self, picks):
+        self._picks = picks
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"picks": self._picks}
+
+
+@pytest.fixture
+def cur(tmp_path, monkeypatch):
+    monkeypatch.setattr(picks_cache, "_SCHEMA_READY", False)
+    monkeypatch.setattr(picks_cache.retention, "touch", lambda *a: None)
+    conn = sqlite3.connect(str(tmp_path / "picks.db"))
+    picks_cache.ensure_schema(conn.cursor())
+    yield conn.cursor()
+    conn.close()
+
+
+def test_live_era_row_is_refetched_once_when_final(cur, monkeypatch):
+    # GW 3 stored while live: the captain had not been auto-subbed yet
+    live = picks_cache._pack([{"element": 1, "multiplier": 2, "position": 1, "is_captain": True}])
+    cur.execute("INSERT INTO picks VALUES (9, 3, ?, 0, ?)",
+                (live, datetime.now(timezone.utc).isoformat()))
+
+    fetches = []
+    final = [{"element": 1, "multiplier": 0, "position": 1, "is_captain": True},
+             {"element": 2, "multiplier": 2, "position": 2, "is_captain": False}]
+
+    def fake_fetch(urls, timeout=None):
+        fetches.append(list(urls))
+        return {url: _Resp(final) for url in fetches[-1]}
+
+    monkeypatch.setattr(picks_cache, "fetch_many", fake_fetch)
+
+    picks = picks_cache.get_picks_many(cur, [9], [3], current_gw=4)
+    assert len(fetches) == 1
+    assert picks[(9, 3)][1]["multiplier"] == 2
+    assert not picks.unfinished
+    assert cur.execute("SELECT finished FROM picks WHERE entry_id = 9").fetchone() == (1,)
+
+    # Stored finished: served from the row from now on
+    assert picks_cache.get_picks_many(cur, [9], [3], current_gw=5)[(9, 3)] == picks[(9, 3)]
+    assert len(fetches) == 1
+
+
+def test_failed_refetch_serves_stale_row_as_unfinished(cur, monkeypatch):
+    live = picks_cache._pack([{"element": 1, "multiplier": 2, "position": 1, "is_captain": True}])
+    cur.execute("INSERT INTO picks VALUES (9, 3, ?, 0, ?)",
+                (live, datetime.now(timezone.utc).isoformat()))
+    monkeypatch.setattr(picks_cache, "fetch_many",
+                        lambda urls, timeout=None: {u: RuntimeError("down") for u in urls})
+
+    picks = picks_cache.get_picks_many(cur, [9], [3], current_gw=4)
+    assert picks[(9, 3)][0]["multiplier"] == 2
+    assert picks.unfinished == {(9, 3)}
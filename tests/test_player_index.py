@@ -0,0 +1,60 @@
+# tests/test_player_index.py
+import random
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from modules import player_index
+from modules.aggregate_data import filter_and_sort_players
+
+
+def _blob():
+    rnd = random.Random(1)
+    blob = {}
+    for pid in range(1, 401):
+        blob[pid] = {
+            "web_name": f"p{pid}", "photo": "x", "team_code": rnd.randint(1, 20),
+            "element_type": rnd.randint(1, 4),
+            "minutes": rnd.choice([0, 0, 90, 180, rnd.randint(0, 3000)]),
+            "now_cost": rnd.randint(38, 150),
+            "total_points": rnd.randint(-2, 200),
+            "goals_scored": rnd.randint(0, 5),
+            "selected_by_percent": str(round(rnd.random() * 50, 1)),
+            "yellow_cards_points": -rnd.randint(0, 3),
+            "goals_performance": round(rnd.uniform(-3, 3), 2),
+        }
+    team = {pid: {"total_points_team": rnd.randint(-2, 50),
+                  "goals_scored_team": rnd.randint(0, 3),
+                  "yellow_cards_points_team": -rnd.randint(0, 2)}
+            for pid in rnd.sample(range(1, 401), 30)}
+    return blob, team
+
+
+BLOB, TEAM = _blob()
+FILTERS = [
+    {},
+    {"selected_positions": "2,3"},
+    {"min_cost": "5.0", "max_cost": "9.5", "min_minutes": "90", "max_minutes": "2000"},
+]
+
+
+@pytest.mark.parametrize("table", ["summary", "players", "defence", "talisman"])
+@pytest.mark.parametrize("sort_by", [
+    None, "total_points", "selected_by_percent", "yellow_cards_points",
+    "goals_performance", "total_points_team", "yellow_cards_points_team",
+])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("extra", FILTERS)
+def test_sorted_player_ids_matches_filter_and_sort_players(table, sort_by, order, extra):
+    args = MultiDict({"table": table, "order": order, **extra,
+                      **({"sort_by": sort_by} if sort_by else {})})
+    expected, _images, truncated, price_range = filter_and_sort_players(
+        {pid: dict(row) for pid, row in BLOB.items()}, TEAM, args)
+
+    index = player_index.index_for(BLOB)
+    pids, got_range, got_truncated = player_index.sorted_player_ids(index, TEAM, args)
+    rows = player_index.player_rows(index, TEAM, pids, table)
+
+    assert [r["web_name"] for r in rows] == [r["web_name"] for r in expected]
+    assert (got_range, got_truncated) == (price_range, truncated)
+    assert [dict(r) for r in rows[:3]] == [dict(r) for r in expected[:3]]
@@ -0,0 +1,51 @@
+# tests/test_response_cache.py
+import pytest
+from flask import Flask, g, jsonify, request
+
+from modules import response_cache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(response_cache.bootstrap_cache, "current", lambda: None)
+    response_cache.clear()
+    app = Flask(__name__)
+    app.calls = {"view": 0, "hit": 0}
+
+    @app.before_request
+    def generation():
+        g.event_gen = int(request.headers.get("X-Gen", 1))
+
+    @app.route("/table")
+    @response_cache.cached(on_hit=lambda: app.calls.__setitem__("hit", app.calls["hit"] + 1))
+    def table():
+        app.calls["view"] += 1
+        if request.args.get("stale"):
+            g.response_cacheable = False
+        return jsonify(rows=list(range(10)))
+
+    return app.test_client()
+
+
+def test_hits_and_304(client):
+    first = client.get("/table?_=1")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    assert client.get("/table?_=2").data == first.data      # cache busters ignored
+    assert client.get("/table", headers={"If-None-Match": etag}).status_code == 304
+    assert client.application.calls == {"view": 1, "hit": 2}
+
+
+def test_generation_change_misses(client):
+    client.get("/table")
+    client.get("/table", headers={"X-Gen": "2"})
+    assert client.application.calls["view"] == 2
+
+
+def test_opt_out_and_refresh_bypass(client):
+    client.get("/table?stale=1")
+    client.get("/table?stale=1")
+    client.get("/table")
+    client.get("/table?refresh=1")
+    assert client.application.calls["view"] == 4